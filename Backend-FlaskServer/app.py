@@ -1,35 +1,128 @@
 # Standard libraries
+import json
 import logging
+import time
+import uuid
 
 # Third-party libraries
 import nltk
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-import gensim.downloader as api
 
 
 # Local application imports
-from components.DownloadContent import (download_common_crawl_data, get_cdx_records, get_text_from_link)
-from components.PreProcess_Text import (clean_texts, extract_keywords, preprocess_text,
+from components.Corpus import get_corpus
+from components.DownloadContent import download_urls, new_download_dir
+from components.JobQueue import QueueFullError, get_job_queue
+from components.Metrics import (REQUEST_SECONDS, current_request_timings, register_collector, render_metrics,
+                                start_request)
+from components.PreProcess_Text import (clean_texts, extract_keywords,
                                         segment_text_by_sentences, split_into_segments)
-from components.SearchWeb import query_clean_results
+from components.Profiler import profiled
+from components.ResultStore import get_result_store
+from components.SearchWeb import query_clean_results, search_stats
+from components.SemanticIndex import load_semantic_index, sync_semantic_index
 from components.Similarity import (TFID, calculate_cosine_similarity, 
                                    calculate_cosine_similarity_model)
+from components.WarcReader import ingest_warc_files
 from components.utils import (check_request_data, extract_keywords_from_text, 
-                              process_all_paragraphs)
+                              iter_plagiarism_check, run_batch_check, run_plagiarism_check,
+                              store_submission, submission_document_ids)
+from components.WordVectors import load_word_vectors
 
 #Download necessary data
 nltk.download('punkt')
 
-word_vectors = api.load("word2vec-google-news-300")
-#word_vectors = api.load("glove-wiki-gigaword-50")
-#word_vectors = api.load("fasttext-wiki-news-subwords-300")
-
-sentence_similarities = []
-your_text = ""
+# Memory-mapped, converted on first start (see components/WordVectors.py)
+word_vectors = load_word_vectors()
+load_semantic_index(word_vectors)
+#word_vectors = load_word_vectors(name="glove-wiki-gigaword-50")
+#word_vectors = load_word_vectors(name="fasttext-wiki-news-subwords-300")
 
 app = Flask(__name__)
 CORS(app)
+app.config["READY"] = False
+
+WARM_UP_TEXT = ("The mitochondria is the powerhouse of the cell. It produces most of the chemical energy needed "
+                "to power the biochemical reactions of the cell, stored in adenosine triphosphate.")
+
+def warm_up():
+    """
+    Runs a small text through every scoring stage so lazily loaded resources (NLTK corpora, RAKE, the
+    scikit-learn code paths and the pages of the word vector table it touches) are loaded before the
+    server reports ready. Run by `serve.py` in the master process, before the workers are forked, so they
+    share what it loaded.
+    """
+    sentences = list(segment_text_by_sentences(WARM_UP_TEXT))
+    clean_sentences = clean_texts(sentences)
+    extract_keywords(WARM_UP_TEXT)
+    TFID(clean_sentences[0], clean_sentences[1:], True)
+    calculate_cosine_similarity_model(clean_sentences[0], clean_sentences[1:], word_vectors, True)
+    app.config["READY"] = True
+
+@app.before_request
+def start_request_timing():
+    start_request()
+
+@app.after_request
+def add_request_timing(response):
+    """
+    Adds the stage timings of the request as a Server-Timing header and records its duration.
+    For streamed responses only the work done before streaming started is included.
+    """
+    timings = current_request_timings()
+    if timings is not None:
+        response.headers["Server-Timing"] = timings.server_timing()
+        REQUEST_SECONDS.observe(time.perf_counter() - timings.start, endpoint=request.endpoint or "unknown", status=response.status_code)
+    return response
+
+def service_metrics():
+    """
+    Prometheus collector for the background job queue.
+    """
+    return [(f"jobs_{status}", "gauge", f"Background checks {status}.", count)
+            for status, count in get_job_queue().stats().items()]
+
+def result_store_metrics():
+    """
+    Prometheus collector for the result store, which serve.py shares between its workers.
+    """
+    return [("result_store_entries", "gauge", "Checks kept for /sentence_similarities.", get_result_store().stats()["entries"])]
+
+register_collector(service_metrics)
+register_collector(result_store_metrics, shared=True)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """
+    Route: '/metrics'
+    Method: GET
+
+    Metrics of this server process in the Prometheus text format:
+    - plagiarism_stage_seconds{stage}: Histogram of the time spent in each stage (keywords, search,
+      search_cache, cse_request, corpus_search, semantic_search, clean_texts, vectorizer_fit,
+      tfidf_scoring, word2vec_scoring).
+    - http_request_duration_seconds{endpoint,status}: Histogram of the request durations.
+    - plagiarism_checks_total, plagiarism_escalations_total: Their ratio is the word2vec escalation rate.
+    - search_cache_hits_total, search_cache_misses_total and the search query coalescing counters.
+    - result_store_entries and jobs_<status> gauges.
+    With the pre-forked server (serve.py) the metrics of every worker process are merged, whichever
+    worker answers the scrape (see `render_metrics`).
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/ready', methods=['GET'])
+def ready_route():
+    """
+    Route: '/ready'
+    Method: GET
+
+    Readiness probe: Status Code 200 with {"ready": true} once the models are loaded and warmed up
+    (see `warm_up`), Status Code 503 with {"ready": false} before.
+    """
+    if not app.config["READY"]:
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True})
 
 @app.route('/extract_keywords', methods=['GET']) 
 def extract_keywords_route():
@@ -116,6 +209,33 @@ def search_content():
     
     return jsonify({"results": results})
 
+@app.route('/search_stats', methods=['GET'])
+def search_stats_route():
+    """
+    Endpoint reporting the search counters of this server process.
+
+    URL: /search_stats
+    Method: GET
+
+    Responses:
+    1. Successful request:
+        {
+            "cache": {
+                "enabled": <false if caching is disabled (empty SEARCH_CACHE_PATH), then no other keys>,
+                "hits": <number of queries answered from the cache>,
+                "misses": <number of queries sent to Google CSE>,
+                "entries": <number of cached queries>
+            },
+            "single_flight": {
+                "executed": <queries that looked up the cache or queried Google CSE>,
+                "coalesced": <queries that waited for an identical query already in flight>,
+                "in_flight": <queries currently running>
+            }
+        }
+       Status Code: 200
+    """
+    return jsonify(search_stats())
+
 @app.route('/cosine-similarity', methods=['POST'])
 def cosine_similarity_route(data=None):
     """
@@ -205,6 +325,7 @@ def cosine_similarity_route(data=None):
     return jsonify(results[0])
 
 @app.route('/cosine-similarity-model', methods=['POST'])
+@profiled
 def cosine_similarity_model_route(data=None):
     """
     Route: '/cosine-similarity-model'
@@ -299,11 +420,15 @@ def download_text_route():
 
     Expected Input:
     - urls (list): A list of URLs from which the data is to be downloaded.
+    - ingest (bool, optional): Also add the text of the downloaded pages to the local corpus. Default is false.
 
     Expected Output:
     1. Successful Request:
     {
-        "message": "Data download completed."
+        "message": "Data download completed.",
+        "download_id": <id of the download directory>,
+        "manifest": [<status of each URL, see `download_urls`>],
+        "ingested": {"files", "records", "documents", "duplicates", "skipped", "errors"} (only with `ingest`)
     }
 
     2. If the `urls` field is not provided, is not a list, or is an empty list:
@@ -314,15 +439,23 @@ def download_text_route():
 
     3. If errors are encountered during processing:
     {
-        "errors": [<list of error messages for each failed URL>]
+        "errors": [<list of error messages for each failed URL>],
+        "download_id": <id of the download directory>,
+        "manifest": [<status of each URL>]
     }
     Status Code: 500
 
     Notes:
     - The function uses the Common Crawl database to fetch data related to each URL.
     - If the URL's record is not found in the Common Crawl database (CDX), an error message is added for that URL.
-    - For each URL, data is saved in a unique .warc.gz file named in the format "data_<index>.warc.gz", where <index> represents the index of the URL in the list.
-    - If any URL fails to be processed, an error message is logged, and the processing continues for the next URL.
+    - Each request downloads into its own directory, `DOWNLOAD_DIR/<download_id>` (`DOWNLOAD_DIR` defaults to
+      `Backend-FlaskServer/downloads`). For each URL, data is saved in a unique .warc.gz file named in the format
+      "data_<index>.warc.gz", where <index> represents the index of the URL in the list, and its status is
+      appended to `manifest.jsonl` in the same directory.
+    - Up to `DOWNLOAD_WORKERS` (default 8) URLs are looked up and downloaded concurrently over a shared
+      connection pool, and each record is streamed to disk in chunks.
+    - With `ingest`, the paragraph text of every HTML page downloaded is added to the corpus (see `ingest_warc`).
+    - If any URL fails to be processed, an error message is logged, and the processing continues for the other URLs.
     - All encountered errors during processing are aggregated and returned in the `errors` list of the JSON response.
     """
 
@@ -336,30 +469,24 @@ def download_text_route():
     
     urls = data['urls']
 
-    print("Urls are", urls)
-    
-    errors = []
-    for i, url in enumerate(urls):
-        try:
-            file_name = f"data_{i}.warc.gz"
-            record = get_cdx_records(url)
-            print("Record is", record)
-            if not record:
-                errors.append(f"No CDX record found for URL: {url}")
-                continue
-
-            download_common_crawl_data(record, file_name)
-            logging.info(f"Data saved to {file_name}")
-        except Exception as e:
-            errors.append(f"Error processing URL {url}: {str(e)}")
-            logging.error(f"Failed to process {url}. Reason: {str(e)}")
+    download_id, out_dir = new_download_dir()
+    manifest = download_urls(urls, out_dir)
+    logging.info(f"Downloaded {sum(entry['status'] == 'downloaded' for entry in manifest)} of {len(urls)} URLs to {out_dir}")
 
+    response = {"download_id": download_id, "manifest": manifest}
+    if data.get('ingest'):
+        corpus = get_corpus()
+        response['ingested'] = ingest_warc_files([out_dir], corpus)
+        sync_semantic_index(corpus)
+
+    errors = [entry['error'] for entry in manifest if entry['error']]
     if errors:
-        return jsonify({"errors": errors}), 500
+        return jsonify({"errors": errors, **response}), 500
 
-    return jsonify({"message": "Data download completed."}), 200
+    return jsonify({"message": "Data download completed.", **response}), 200
 
 @app.route('/find_plagiarism', methods=['POST'])
+@profiled
 def find_plagiarism_route():
     """
     Route: '/find_plagiarism'
@@ -373,10 +500,14 @@ def find_plagiarism_route():
 
     Expected Input:
     - text (string): The content that needs to be checked for potential plagiarism.
+    - submitter (string, optional): Id of the student submitting the text. With `CORPUS_STORE_SUBMISSIONS`, their
+                                    own earlier submissions are not reported as sources.
+    - stream (bool, optional): Stream the results as NDJSON (also enabled by the `?stream=1` query parameter).
 
     Expected Output:
     1. Successful Request:
     {
+        "check_id": <id to read the per-sentence results with `/sentence_similarities` and `/your_text`>,
         "results": [<list of processed data for each segment of the text>],
         "similarity": <maximum similarity score observed across all segments>,
         "max_similarity": <same as "similarity">,
@@ -388,6 +519,15 @@ def find_plagiarism_route():
     }
     Status Code: 200
 
+    With `stream`, the response is `application/x-ndjson`, one JSON record per line, sent as soon as it is available:
+    {"type": "paragraph", "pass": "tfidf", "paragraph_index": <i>, "paragraph": <processed data of the segment>,
+     "average_similarity": <...>, "max_similarity": <...>, "sentence_similarities": [<per sentence scores>]}
+    {"type": "error", "pass": "tfidf", "paragraph_index": <i>, "error_message": <...>}
+    {"type": "escalation", "tfidf_max_similarity": <...>, "threshold": 0.3}
+    (the paragraph and error records again, with "pass": "word2vec", if the check escalated)
+    {"type": "summary", "similarity": <...>, "max_similarity": <...>, "average_similarity": <...>,
+     "SortedUrls": <...>, "escalated": <bool>, "check_id": <...>, "errors": [<only if any>]}
+
     2. If the `text` field is not provided:
     {
         "error": "Text not provided"
@@ -431,60 +571,305 @@ def find_plagiarism_route():
     if not data or 'text' not in data:
         return jsonify({"error": "Text not provided"}), 400
         
-    paragraphs = split_into_segments(data["text"], 150, 3)
+    if data.get("stream") or request.args.get("stream", "").lower() in ("1", "true", "yes"):
+        paragraphs = split_into_segments(data["text"], 150, 3)
+        check_id = uuid.uuid4().hex
+
+        def generate():
+            excluded = submission_document_ids(data.get("submitter"), check_id)
+            for record in iter_plagiarism_check(paragraphs, word_vectors, exclude_document_ids=excluded):
+                if record['type'] == 'summary':
+                    # Store the text passed in by the user and its results for /sentence_similarities and /your_text
+                    get_result_store().put(data["text"], record['sentence_similarities'], check_id)
+                    # Paragraph results were already streamed, the summary only carries the totals
+                    record = {key: value for key, value in record.items() if key not in ('results', 'sentence_similarities')}
+                    record['check_id'] = check_id
+                    if not record['errors']:
+                        del record['errors']
+                yield json.dumps(record, default=float) + "\n"
+
+            store_submission(data["text"], data.get("submitter"), check_id)
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    # Process via TFIDF, then word2vec if the TFIDF exceeds 30% similarity (see iter_plagiarism_check)
+    response_data = run_plagiarism_check(data["text"], word_vectors, submitter=data.get("submitter"))
 
-    processed_data = []
-    errors = []
-    all_sorted_similarities = []
-    topNLinks = []
-    max_similarity_overall = 0 
-    total_similarities = 0 
-    total_paragraphs_processed = 0
-    global_search_data = []
-    global sentence_similarities
-    global your_text
+    return jsonify(response_data)
 
-    # Store the text passed in by the user
-    your_text = data["text"]
+@app.route('/find_plagiarism/batch', methods=['POST'])
+def find_plagiarism_batch_route():
+    """
+    Route: '/find_plagiarism/batch'
+    Method: POST
 
-    # Process via TFIDF
-    processed_data, max_similarity_overall, total_similarities, total_paragraphs_processed, all_sorted_similarities, global_search_data, sentence_similarities, errors = process_all_paragraphs(paragraphs)
+    Checks many documents in one call (e.g. a class set of essays). Identical keyword queries are searched
+    once, and every document is scored against the pooled candidates of the whole batch and against the other
+    documents of the batch, linked as `batch://<index in documents>`, with one shared TF-IDF model (see `run_batch_check`).
 
-    # If the TFIDF exceeds 30% similarity check with the word2vec model
-    if max_similarity_overall > 0.3:
-        processed_data, max_similarity_overall, total_similarities, total_paragraphs_processed, all_sorted_similarities, global_search_data,  sentence_similarities, errors = process_all_paragraphs(paragraphs, use_model=True, word_vectors=word_vectors, input_search_data=global_search_data)
+    Requirements:
+    - The `documents` field must be provided and should be a non-empty list.
 
-    average_similarity_overall = total_similarities / total_paragraphs_processed if total_paragraphs_processed else 0
+    Expected Input:
+    - documents (list): Each item is a dictionary with a `text`, an optional `id` echoed in its result and an
+                        optional `submitter` (see `/find_plagiarism`).
 
-    seen_links = set()
-    topNLinks = []
+    Expected Output:
+    1. Successful Request:
+    {
+        "results": [{"id": <id if given>, "check_id": <id for `/sentence_similarities`>, "similarity": <...>,
+                     "max_similarity": <...>, "average_similarity": <...>, "SortedUrls": <...>,
+                     "escalated": <bool>, "errors": [<only if any>]}, ...],
+        "stats": {"documents": <count>, "unique_segments": <count>, "queries": <searches made>, "candidates": <pool size>}
+    }
 
-    for item in sorted(all_sorted_similarities, key=lambda x: x['similarity'], reverse=True):
-        if item['link'] not in seen_links:
-            topNLinks.append(item)
-            seen_links.add(item['link'])
-        if len(topNLinks) == 5:
-            break
+    2. If the `documents` field is not provided, is not a list, or is an empty list, or a document has no text:
+    {
+        "error": <error message detailing the missing or incorrect data>
+    }
+    Status Code: 400
+    """
+    data = request.json
+    required_fields = {
+        'documents': list
+    }
+    error = check_request_data(data, required_fields)
+    if error:
+        return error
 
-    response_data = {"results": processed_data, "similarity": max_similarity_overall, "max_similarity": max_similarity_overall, "SortedUrls": topNLinks}
-    if errors:
-        response_data['errors'] = errors
+    if not all(isinstance(document, dict) and document.get('text') for document in data['documents']):
+        return jsonify({"error": "Every document needs a text"}), 400
 
+    response_data = run_batch_check([document['text'] for document in data['documents']], word_vectors,
+                                    submitters=[document.get('submitter') for document in data['documents']])
+    for document, result in zip(data['documents'], response_data['results']):
+        if 'id' in document:
+            result['id'] = document['id']
 
     return jsonify(response_data)
 
+@app.route('/jobs/find_plagiarism', methods=['POST'])
+def submit_plagiarism_job_route():
+    """
+    Route: '/jobs/find_plagiarism'
+    Method: POST
+
+    Queues a `/find_plagiarism` check to run in the background and returns immediately. Poll
+    `/jobs/<job_id>` for its progress and fetch the result from `/jobs/<job_id>/result`.
+
+    Requirements:
+    - The `text` field must be provided and should be a non-empty string.
+
+    Expected Input:
+    - text (string): The content to check.
+    - submitter (string, optional): Id of the student submitting the text, see `/find_plagiarism`.
+
+    Expected Output:
+    1. Successful Request:
+    {
+        "job_id": <id of the job>,
+        "status": "queued"
+    }
+    Status Code: 202
+
+    2. If the `text` field is not provided:
+    {
+        "error": "Text not provided"
+    }
+    Status Code: 400
+
+    3. If too many checks are already queued (JOB_MAX_QUEUED):
+    {
+        "error": <error message>
+    }
+    Status Code: 503
+    """
+    data = request.json
+    if not data or not data.get('text'):
+        return jsonify({"error": "Text not provided"}), 400
+
+    try:
+        job_id = get_job_queue().submit(lambda progress, text, submitter: run_plagiarism_check(text, word_vectors, progress, submitter=submitter),
+                                        data["text"], data.get("submitter"))
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_route(job_id):
+    """
+    Route: '/jobs/<job_id>'
+    Method: GET
+
+    Reports the status of a background check.
+
+    Expected Output:
+    1. Known job:
+    {
+        "job_id": <id of the job>,
+        "status": "queued" | "running" | "done" | "failed",
+        "progress": {"done": <segments scored>, "total": <segments to score, grows if the check escalates to word2vec>},
+        "created": <timestamp>, "started": <timestamp or null>, "finished": <timestamp or null>,
+        "error": <error message, only if failed>
+    }
+
+    2. Unknown or expired job:
+    {
+        "error": "Unknown job_id"
+    }
+    Status Code: 404
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+
+    response_data = {key: job[key] for key in ('job_id', 'status', 'progress', 'created', 'started', 'finished')}
+    if job['error']:
+        response_data['error'] = job['error']
+    return jsonify(response_data)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result_route(job_id):
+    """
+    Route: '/jobs/<job_id>/result'
+    Method: GET
+
+    Returns the result of a finished background check, in the same format as `/find_plagiarism`.
+    While the check is queued or running, returns its status with Status Code 202. A failed check
+    returns its error with Status Code 500, an unknown or expired one Status Code 404.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    if job['status'] == 'failed':
+        return jsonify({"error": job['error']}), 500
+    if job['status'] != 'done':
+        return jsonify({"job_id": job_id, "status": job['status'], "progress": job['progress']}), 202
+
+    return jsonify(job['result'])
+
+@app.route('/corpus/documents', methods=['POST'])
+def add_corpus_documents_route():
+    """
+    Route: '/corpus/documents'
+    Method: POST
+
+    This endpoint ingests source texts into the local corpus that `/find_plagiarism` can check against
+    without web search (see the CANDIDATE_SOURCES environment variable).
+
+    Requirements:
+    - The `documents` field must be provided and should be a non-empty list.
+
+    Expected Input:
+    - documents (list): Each item is a dictionary with a `text` and optional `title` and `link`.
+
+    Expected Output:
+    1. Successful Request:
+    {
+        "document_ids": [<corpus id of each document>],
+        "corpus": {"documents": <count>, "passages": <count>}
+    }
+
+    2. If the `documents` field is not provided, is not a list, or is an empty list, or a document has no text:
+    {
+        "error": <error message detailing the missing or incorrect data>
+    }
+    Status Code: 400
+    """
+    data = request.json
+    required_fields = {
+        'documents': list
+    }
+    error = check_request_data(data, required_fields)
+    if error:
+        return error
+
+    if not all(isinstance(document, dict) and document.get('text') for document in data['documents']):
+        return jsonify({"error": "Every document needs a text"}), 400
+
+    corpus = get_corpus()
+    document_ids = [corpus.add_document(document['text'], title=document.get('title', ''), link=document.get('link', ''))[0]
+                    for document in data['documents']]
+    sync_semantic_index(corpus)
+
+    return jsonify({"document_ids": document_ids, "corpus": corpus.stats()})
+
 @app.route('/sentence_similarities', methods=['GET'])
 def get_sentences_route():
-    response_data = { "sentence_similarities": sentence_similarities }
-    return response_data
+    """
+    Route: '/sentence_similarities'
+    Method: GET
+
+    Returns the per-sentence similarities of a check, optionally one page at a time.
+
+    Query Parameters:
+    - check_id (str): The `check_id` returned by `/find_plagiarism`.
+    - offset (int, optional): Index of the first sentence. Default is 0.
+    - limit (int, optional): Maximum number of sentences, at least 0. Default returns all of them.
+
+    Expected Output:
+    1. Successful Request:
+    {
+        "check_id": <id of the check>,
+        "total": <number of sentences in the check>,
+        "offset": <offset>,
+        "sentence_similarities": [<sentence records in the requested range>]
+    }
+
+    2. If `check_id` is missing or `limit` is negative:
+    {
+        "error": <error message>
+    }
+    Status Code: 400
+
+    3. If the check is unknown or has expired:
+    {
+        "error": "Unknown check_id"
+    }
+    Status Code: 404
+    """
+    check_id = request.args.get("check_id")
+    if not check_id:
+        return jsonify({"error": "check_id not provided"}), 400
+
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit < 0:
+        return jsonify({"error": "limit must not be negative"}), 400
+
+    found_id, total, records = get_result_store().sentence_page(check_id, offset, limit)
+    if records is None:
+        return jsonify({"error": "Unknown check_id"}), 404
+
+    # The records are stored serialized, so the page is assembled without re-encoding them
+    body = '{"check_id": %s, "total": %d, "offset": %d, "sentence_similarities": [%s]}' % (
+        json.dumps(found_id), total, offset, ",".join(records))
+    return Response(body, mimetype='application/json')
 
 @app.route('/your_text', methods=['GET'])
 def get_your_text_route():
-    response_data = { "your_text": your_text }
+    """
+    Route: '/your_text'
+    Method: GET
+
+    Returns the text submitted for a check (query parameter `check_id`, as returned by `/find_plagiarism`).
+    Responds 400 if `check_id` is missing and 404 if the check is unknown or has expired.
+    """
+    check_id = request.args.get("check_id")
+    if not check_id:
+        return jsonify({"error": "check_id not provided"}), 400
+
+    found_id, text = get_result_store().get_text(check_id)
+    if found_id is None:
+        return jsonify({"error": "Unknown check_id"}), 404
+
+    response_data = { "check_id": found_id, "your_text": text }
     return response_data
 
 
 
 if __name__ == '__main__':
+    warm_up()
     app.run(debug=True)
     app.debug = True
\ No newline at end of file
@@ -0,0 +1,290 @@
+"""
+Benchmark suite for the hot paths of the Flask server.
+
+Times the text preprocessing, keyword extraction and similarity functions, and `process_all_paragraphs`
+end to end against the stub search API (`benchmarks.stub_search_server`), on synthetic documents from
+one sentence to about 50 pages. The word vector scorer runs on a small synthetic embedding model, so no
+model download is needed.
+
+Results are written as JSON and can be compared against a previous run saved as a baseline:
+    python -m benchmarks.run_benchmarks --output benchmarks/baseline.json
+    ... change something ...
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+
+Usage (from Backend-FlaskServer/):
+    python -m benchmarks.run_benchmarks [--sizes sentence,page,50pages] [--only TFID,clean_texts]
+                                        [--repeat 3] [--output results.json] [--baseline baseline.json]
+                                        [--threshold 1.10]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+import numpy as np
+from gensim.models import KeyedVectors
+
+from benchmarks.stub_search_server import SNIPPET_WORDS, start_stub_server
+
+
+# Approximate character counts, a page being ~3000 characters
+SIZES = {
+    "sentence": 120,
+    "paragraph": 800,
+    "page": 3000,
+    "10pages": 30000,
+    "50pages": 150000,
+}
+
+VOCABULARY = SNIPPET_WORDS + ["the", "of", "and", "in", "is", "was", "which", "research", "study", "results",
+                              "method", "analysis", "data", "model", "theory", "evidence", "observed",
+                              "measured", "significant", "increase", "decrease", "between", "during",
+                              "students", "history", "economic", "policy", "climate", "temperature",
+                              "population", "development", "government", "century", "report", "scientists",
+                              "January 1, 2020", "12/31/99", "2020-01-01"]
+
+
+def synthetic_document(size, seed=0):
+    """
+    Build roughly `size` characters of text made of sentences of 8 to 20 words, in paragraphs of 5 sentences.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+
+    paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+    return "\n\n".join(paragraphs)
+
+
+def synthetic_snippets(count=30, seed=1):
+    """
+    Build search-result-sized target texts.
+    """
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(25)) for _ in range(count)]
+
+
+def synthetic_word_vectors(vector_size=300, seed=0):
+    """
+    Build a small gensim KeyedVectors over the benchmark vocabulary (lemmatized and raw forms).
+    """
+    from components.PreProcess_Text import clean_text
+
+    keys = sorted({word for phrase in VOCABULARY for word in phrase.lower().split()} |
+                  {word for phrase in VOCABULARY for word in clean_text(phrase).split()})
+    rng = np.random.default_rng(seed)
+
+    word_vectors = KeyedVectors(vector_size)
+    word_vectors.add_vectors(keys, rng.standard_normal((len(keys), vector_size)).astype(np.float32))
+    return word_vectors
+
+
+def ensure_nltk_data():
+    """
+    Download the NLTK data the text preprocessing needs, which app.py otherwise fetches at startup, and exit
+    with a clear message if some of it is still missing (e.g. without network access).
+    """
+    import nltk
+    from nltk.tokenize import punkt
+
+    resources = {"punkt": "tokenizers/punkt", "stopwords": "corpora/stopwords", "wordnet": "corpora/wordnet"}
+    if hasattr(punkt, "PunktTokenizer"):  # NLTK 3.8.2 and later tokenize with the punkt_tab tables
+        resources["punkt_tab"] = "tokenizers/punkt_tab/english"
+
+    missing = []
+    for package, resource in resources.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            if not nltk.download(package, quiet=True):
+                missing.append(package)
+
+    if missing:
+        sys.exit(f"Missing NLTK data: {', '.join(missing)}. Install it with "
+                 f"`python -m nltk.downloader {' '.join(missing)}` and run the benchmarks again.")
+
+
+def build_benchmarks(word_vectors):
+    """
+    Returns:
+    - dict: Benchmark name -> setup function taking the document text and returning the callable to time.
+            Preparing the inputs (e.g. splitting into sentences) is done by the setup, outside the timing.
+    """
+    from components.PreProcess_Text import (clean_dates, clean_texts, extract_keywords, preprocess_text,
+                                            segment_text_by_sentences, split_into_segments)
+    from components.Similarity import TFID, calculate_cosine_similarity_model
+    from components.utils import process_all_paragraphs
+
+    snippets = clean_texts(synthetic_snippets())
+
+    def clean_document(text):
+        return " ".join(clean_texts(list(segment_text_by_sentences(text))))
+
+    def bench_preprocess_text(text):
+        return lambda: preprocess_text(text)
+
+    def bench_clean_texts(text):
+        sentences = list(segment_text_by_sentences(text))
+        return lambda: clean_texts(sentences)
+
+    def bench_clean_dates(text):
+        return lambda: clean_dates(text)
+
+    def bench_extract_keywords(text):
+        return lambda: extract_keywords(text)
+
+    def bench_tfid(text):
+        clean = clean_document(text)
+        return lambda: TFID(clean, snippets, True)
+
+    def bench_cosine_similarity_model(text):
+        clean = clean_document(text)
+        return lambda: calculate_cosine_similarity_model(clean, snippets, word_vectors, True)
+
+    def bench_process_all_paragraphs(text):
+        paragraphs = split_into_segments(text, 150, 3)
+        return lambda: process_all_paragraphs(paragraphs)
+
+    return {
+        "preprocess_text": bench_preprocess_text,
+        "clean_texts": bench_clean_texts,
+        "clean_dates": bench_clean_dates,
+        "extract_keywords": bench_extract_keywords,
+        "TFID": bench_tfid,
+        "calculate_cosine_similarity_model": bench_cosine_similarity_model,
+        "process_all_paragraphs": bench_process_all_paragraphs,
+    }
+
+
+def time_call(fn, repeat):
+    """
+    Time `fn` `repeat` times, silencing the progress prints of the pipeline.
+
+    Returns:
+    - list of float: Wall clock seconds of each call.
+    """
+    timings = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the ratio of each result to its baseline.
+
+    Returns:
+    - list of str: The benchmarks slower than `threshold` times their baseline.
+    """
+    baseline_times = {(entry["benchmark"], entry["size"]): entry["best_s"] for entry in baseline["results"]}
+    regressions = []
+
+    for entry in results:
+        key = (entry["benchmark"], entry["size"])
+        if key not in baseline_times:
+            continue
+        ratio = entry["best_s"] / baseline_times[key] if baseline_times[key] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{key[0]}[{key[1]}]")
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{key[0]:<36} {key[1]:<10} {baseline_times[key] * 1000:>10.2f} ms -> {entry['best_s'] * 1000:>10.2f} ms  x{ratio:.2f}{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma separated subset of {', '.join(SIZES)}")
+    parser.add_argument("--only", default=None, help="comma separated benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions, best and median are reported")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub search API latency in seconds")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="compare against a previous --output file")
+    parser.add_argument("--threshold", type=float, default=1.10, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    ensure_nltk_data()
+
+    # Point the search client at the stub API, without the on-disk cache so every run really searches
+    server, endpoint = start_stub_server(latency=args.latency)
+    os.environ["GOOGLE_CSE_ENDPOINT"] = endpoint
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("GOOGLE_CSE_ID", "benchmark")
+    os.environ["SEARCH_CACHE_PATH"] = ""
+    os.environ["CANDIDATE_SOURCES"] = "web"
+
+    benchmarks = build_benchmarks(synthetic_word_vectors())
+    names = args.only.split(",") if args.only else list(benchmarks)
+    sizes = args.sizes.split(",")
+
+    results = []
+    for size in sizes:
+        text = synthetic_document(SIZES[size])
+        for name in names:
+            timings = time_call(benchmarks[name](text), args.repeat)
+            results.append({
+                "benchmark": name,
+                "size": size,
+                "chars": len(text),
+                "best_s": min(timings),
+                "median_s": statistics.median(timings),
+                "repeat": args.repeat
+            })
+            print(f"{name:<36} {size:<10} best {min(timings) * 1000:>10.2f} ms  median {statistics.median(timings) * 1000:>10.2f} ms")
+
+    server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared to {args.baseline} (commit {baseline['meta'].get('commit')}):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over x{args.threshold}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
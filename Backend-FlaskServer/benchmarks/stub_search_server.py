@@ -0,0 +1,96 @@
+"""
+Local stub of the Google Custom Search JSON API.
+
+Answers `GET /customsearch/v1?q=...&start=...` with the same JSON shape as Google CSE (an `items` list
+of `snippet`, `link` and `title`), generated deterministically from the query so repeated runs return
+the same results. Point the Flask server at it with
+    GOOGLE_CSE_ENDPOINT=http://127.0.0.1:<port>/customsearch/v1
+
+Usage (from Backend-FlaskServer/):
+    python -m benchmarks.stub_search_server [--port 8765] [--latency 0.05]
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+SNIPPET_WORDS = ["solar", "system", "planet", "comet", "asteroid", "orbit", "sun", "moon", "gravity",
+                 "galaxy", "star", "telescope", "astronomy", "mass", "light", "energy", "space", "earth"]
+
+
+def stub_results(query, start, results_per_page=10):
+    """
+    Build a CSE-shaped response for a query, reusing words of the query so snippets overlap with it.
+    """
+    seed = int(hashlib.sha1(f"{query}|{start}".encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    query_words = [word for word in query.replace(" OR ", " ").split() if word] or SNIPPET_WORDS
+
+    items = []
+    for i in range(results_per_page):
+        words = [rng.choice(query_words if rng.random() < 0.5 else SNIPPET_WORDS) for _ in range(25)]
+        items.append({
+            "snippet": " ".join(words).capitalize() + ".",
+            "link": f"https://example.com/{seed % 1000}/{start + i}",
+            "title": f"Result {start + i} for {query[:40]}"
+        })
+    return {"kind": "customsearch#search", "items": items}
+
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(parsed.query)
+        query = params.get("q", [""])[0]
+        start = int(params.get("start", ["1"])[0])
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        body = json.dumps(stub_results(query, start)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, latency=0.0):
+    """
+    Start the stub server in a background thread.
+
+    Parameters:
+    - port (int, optional): Port to listen on, 0 picks a free one.
+    - latency (float, optional): Seconds to wait before answering, to mimic the real API.
+
+    Returns:
+    - tuple: (server, endpoint URL). Call `server.shutdown()` to stop it.
+    """
+    handler = type("Handler", (StubSearchHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/customsearch/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the Google Custom Search JSON API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each answer")
+    args = parser.parse_args()
+
+    server, endpoint = start_stub_server(args.port, args.latency)
+    print(f"Stub search API listening on {endpoint}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,248 @@
+import threading
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """
+    L2-normalize the rows of a matrix as float32, leaving zero rows at zero.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour index (inverted file) for cosine similarity, in pure NumPy.
+
+    Vectors are normalized and assigned to the nearest of `n_lists` centroids found by spherical k-means.
+    A query only scans the lists of its `nprobe` nearest centroids: raising `nprobe` trades latency for
+    recall, up to an exact search when nprobe == n_lists.
+
+    Until enough vectors have been added to train the centroids (`train_size`, default 40 per list), the
+    index searches its vectors exhaustively. Vectors can be added at any time.
+
+    Searches may run concurrently with `add` and `train`. A search takes a snapshot of the lists under a
+    short lock and scans it outside the lock. Training builds the lists aside and publishes them at once,
+    so a search never sees a half-trained index.
+
+    Parameters:
+    - dim (int): Vector dimension.
+    - n_lists (int, optional): Number of inverted lists (centroids). Default is 256.
+    - nprobe (int, optional): Default number of lists scanned per query. Default is 8.
+    - train_size (int, optional): Number of vectors that triggers training. Default is 40 * n_lists.
+    """
+
+    def __init__(self, dim, n_lists=256, nprobe=8, train_size=None):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.train_size = train_size or 40 * n_lists
+        self.centroids = None
+
+        # Untrained vectors (exhaustive search) and per-list vectors once trained
+        self._pending_ids = []
+        self._pending_vectors = []
+        self._list_ids = None
+        self._list_vectors = None
+        self._list_sizes = None
+        self._lock = threading.Lock()
+        self._training = False
+
+    def __len__(self):
+        with self._lock:
+            return self._len()
+
+    def _len(self):
+        pending = sum(len(ids) for ids in self._pending_ids)
+        return pending + (int(self._list_sizes.sum()) if self._list_sizes is not None else 0)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def add(self, ids, vectors):
+        """
+        Insert vectors.
+
+        Parameters:
+        - ids (list of int): Id returned by `search` for each vector.
+        - vectors (ndarray): Matrix of shape (len(ids), dim).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = normalize_rows(vectors)
+        if not len(ids):
+            return
+
+        with self._lock:
+            if self.is_trained:
+                self._assign(self.centroids, self._list_ids, self._list_vectors, self._list_sizes, ids, vectors)
+                return
+
+            self._pending_ids.append(ids)
+            self._pending_vectors.append(vectors)
+            start_training = not self._training and self._len() >= self.train_size
+
+        if start_training:
+            self.train()
+
+    def _assign(self, centroids, list_ids, list_vectors, list_sizes, ids, vectors):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for list_id in np.unique(assignments):
+            members = assignments == list_id
+            self._append(list_ids, list_vectors, list_sizes, list_id, ids[members], vectors[members])
+
+    def _append(self, list_ids, list_vectors, list_sizes, list_id, ids, vectors):
+        # Rows below the list size are never written again (growing copies them to new arrays), so the
+        # views handed out by `search` stay valid
+        size = list_sizes[list_id]
+        capacity = len(list_ids[list_id])
+        if size + len(ids) > capacity:
+            new_capacity = max(2 * capacity, size + len(ids), 16)
+            grown_ids = np.empty(new_capacity, dtype=np.int64)
+            grown_vectors = np.empty((new_capacity, self.dim), dtype=np.float32)
+            grown_ids[:size] = list_ids[list_id][:size]
+            grown_vectors[:size] = list_vectors[list_id][:size]
+            list_ids[list_id] = grown_ids
+            list_vectors[list_id] = grown_vectors
+
+        list_ids[list_id][size:size + len(ids)] = ids
+        list_vectors[list_id][size:size + len(ids)] = vectors
+        list_sizes[list_id] = size + len(ids)
+
+    def train(self, iterations=10, seed=0):
+        """
+        Find the centroids with spherical k-means over the vectors added so far and distribute them
+        into the inverted lists.
+
+        Parameters:
+        - iterations (int, optional): k-means iterations. Default is 10.
+        - seed (int, optional): Seed of the initial centroid sample.
+        """
+        with self._lock:
+            if self.is_trained or self._training:
+                return
+            self._training = True
+            pending_ids = list(self._pending_ids)
+            pending_vectors = list(self._pending_vectors)
+
+        try:
+            self._train(pending_ids, pending_vectors, iterations, seed)
+        finally:
+            with self._lock:
+                self._training = False
+
+    def _train(self, pending_ids, pending_vectors, iterations, seed):
+        ids = np.concatenate(pending_ids) if pending_ids else np.empty(0, dtype=np.int64)
+        vectors = np.concatenate(pending_vectors) if pending_vectors else np.empty((0, self.dim), dtype=np.float32)
+        if len(ids) < self.n_lists:
+            raise ValueError(f"Need at least {self.n_lists} vectors to train, got {len(ids)}")
+
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            empty = np.bincount(assignments, minlength=self.n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        # Fill the lists aside, then publish them with the centroids in one step
+        list_ids = [np.empty(0, dtype=np.int64) for _ in range(self.n_lists)]
+        list_vectors = [np.empty((0, self.dim), dtype=np.float32) for _ in range(self.n_lists)]
+        list_sizes = np.zeros(self.n_lists, dtype=np.int64)
+        self._assign(centroids, list_ids, list_vectors, list_sizes, ids, vectors)
+
+        with self._lock:
+            # Vectors added while training
+            for late_ids, late_vectors in zip(self._pending_ids[len(pending_ids):], self._pending_vectors[len(pending_ids):]):
+                self._assign(centroids, list_ids, list_vectors, list_sizes, late_ids, late_vectors)
+            self._list_ids, self._list_vectors, self._list_sizes = list_ids, list_vectors, list_sizes
+            self._pending_ids, self._pending_vectors = [], []
+            self.centroids = centroids
+
+    def search(self, query, k=10, nprobe=None):
+        """
+        Find the vectors most similar to a query.
+
+        Parameters:
+        - query (ndarray): Query vector of size dim.
+        - k (int, optional): Number of neighbours. Default is 10.
+        - nprobe (int, optional): Lists to scan; defaults to the index's `nprobe`.
+
+        Returns:
+        - list of tuple: (id, cosine similarity) pairs, most similar first.
+        """
+        query = normalize_rows(query)[0]
+        if not query.any():
+            return []
+
+        with self._lock:
+            candidate_ids = list(self._pending_ids)
+            candidate_vectors = list(self._pending_vectors)
+
+            if self.is_trained:
+                nprobe = min(nprobe or self.nprobe, self.n_lists)
+                probed = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                for list_id in probed:
+                    size = self._list_sizes[list_id]
+                    candidate_ids.append(self._list_ids[list_id][:size])
+                    candidate_vectors.append(self._list_vectors[list_id][:size])
+
+        if not candidate_ids:
+            return []
+        ids = np.concatenate(candidate_ids)
+        if not len(ids):
+            return []
+        scores = np.concatenate(candidate_vectors) @ query
+
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def save(self, path):
+        """
+        Save the index to a `.npz` file.
+        """
+        with self._lock:
+            if self.is_trained:
+                sizes = self._list_sizes.copy()
+                ids = np.concatenate([self._list_ids[i][:sizes[i]] for i in range(self.n_lists)])
+                vectors = np.concatenate([self._list_vectors[i][:sizes[i]] for i in range(self.n_lists)])
+                centroids = self.centroids
+            else:
+                sizes = np.zeros(0, dtype=np.int64)
+                ids = np.concatenate(self._pending_ids) if self._pending_ids else np.empty(0, dtype=np.int64)
+                vectors = np.concatenate(self._pending_vectors) if self._pending_vectors else np.empty((0, self.dim), dtype=np.float32)
+                centroids = np.empty((0, self.dim), dtype=np.float32)
+
+        with open(path, "wb") as f:
+            np.savez(f, dim=self.dim, n_lists=self.n_lists, nprobe=self.nprobe, train_size=self.train_size,
+                     centroids=centroids, sizes=sizes, ids=ids, vectors=vectors)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index written by `save`.
+        """
+        with np.load(path) as data:
+            index = cls(int(data["dim"]), int(data["n_lists"]), int(data["nprobe"]), int(data["train_size"]))
+            ids, vectors, sizes = data["ids"], data["vectors"], data["sizes"]
+
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+                offsets = np.concatenate([[0], np.cumsum(sizes)])
+                index._list_ids = [ids[offsets[i]:offsets[i + 1]].copy() for i in range(index.n_lists)]
+                index._list_vectors = [vectors[offsets[i]:offsets[i + 1]].copy() for i in range(index.n_lists)]
+                index._list_sizes = sizes.astype(np.int64)
+            elif len(ids):
+                index._pending_ids = [ids]
+                index._pending_vectors = [vectors]
+
+        return index
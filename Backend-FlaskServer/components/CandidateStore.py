@@ -0,0 +1,46 @@
+class CandidateStore:
+    """
+    Request-scoped store of the per-paragraph work done by the TF-IDF pass of a plagiarism check.
+
+    When the TF-IDF similarity is high enough to escalate to word2vec, the second pass looks every
+    paragraph up here and reuses its keywords, search results, cleaned sentences, cleaned search
+    results and fitted TF-IDF model, so only the embedding scores are computed again.
+
+    Each entry is a dictionary with the keys:
+    - 'paragraph_data' (dict): The paragraph, its keywords and raw search results.
+    - 'clean_sentences' (list): The cleaned sentences of the paragraph.
+    - 'clean_search_data' (list): The search results with cleaned content.
+    - 'vectorizer' (TfidfVectorizer): The TF-IDF model fitted on the sentences and search results.
+    - 'input_vectors', 'target_vectors' (sparse matrix): TF-IDF rows of the sentences and search results.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def __contains__(self, paragraph_index):
+        return paragraph_index in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, paragraph_index, entry):
+        """
+        Store the first pass results of a paragraph.
+
+        Parameters:
+        - paragraph_index (int): Position of the paragraph in the checked text.
+        - entry (dict): The paragraph's candidates, see the class docstring.
+        """
+        self._entries[paragraph_index] = entry
+
+    def get(self, paragraph_index):
+        """
+        Fetch the first pass results of a paragraph.
+
+        Parameters:
+        - paragraph_index (int): Position of the paragraph in the checked text.
+
+        Returns:
+        - dict: The stored entry, or None if the paragraph has not been processed (or failed).
+        """
+        return self._entries.get(paragraph_index)
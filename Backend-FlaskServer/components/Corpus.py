@@ -0,0 +1,386 @@
+import os
+import math
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import Counter
+
+from components.Fingerprint import FingerprintIndex
+from components.PreProcess_Text import clean_texts, segment_text_by_sentences
+
+
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "corpus.sqlite3")
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def split_into_passages(text, passage_sentences=3):
+    """
+    Splits a document into passages of a few consecutive sentences, comparable in size to a search snippet.
+
+    Parameters:
+    - text (str): The document text.
+    - passage_sentences (int, optional): Number of sentences per passage. Default is 3.
+
+    Returns:
+    - List[str]: The passages, in document order.
+    """
+    sentences = [sentence for sentence in segment_text_by_sentences(text) if sentence.strip()]
+    return [' '.join(sentences[i:i + passage_sentences]) for i in range(0, len(sentences), passage_sentences)]
+
+
+class CorpusIndex:
+    """
+    Persistent inverted index over past submissions and ingested source texts.
+
+    Documents are split into passages (see `split_into_passages`), normalized with `clean_texts` and their
+    term frequencies stored as postings in SQLite. Each passage is also winnowed into a `FingerprintIndex`
+    kept in the same database. `search` first takes the passages sharing verbatim fingerprints with the
+    query, then fills up with passages ranked by BM25 over the postings of the query terms only, and
+    returns them in the same shape as web search results so they can be scored alongside (or instead of)
+    Google CSE snippets. BM25 is summed and ranked inside SQLite, and each thread searches through its own
+    read connection, so concurrent paragraph searches do not wait for each other.
+
+    Parameters:
+    - path (str): SQLite database file. Its directory is created if needed.
+    - passage_sentences (int, optional): Number of sentences per indexed passage. Default is 3.
+    - min_shared_fingerprints (int, optional): Fingerprints a passage must share with the query to count as
+                                               a verbatim match. Default is 2.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, path, passage_sentences=3, min_shared_fingerprints=2):
+        self.path = path
+        self.passage_sentences = passage_sentences
+        self.min_shared_fingerprints = min_shared_fingerprints
+        self.fingerprints = FingerprintIndex(path)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._local = threading.local()
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY, source TEXT NOT NULL, title TEXT, link TEXT,
+                    digest TEXT UNIQUE NOT NULL, created REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS passages (
+                    id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL, position INTEGER NOT NULL,
+                    content TEXT NOT NULL, length INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL, passage_id INTEGER NOT NULL, tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, passage_id)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS submissions (
+                    id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL, submitter TEXT, check_id TEXT,
+                    created REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS submissions_document ON submissions (document_id);
+                CREATE INDEX IF NOT EXISTS submissions_submitter ON submissions (submitter);
+                CREATE INDEX IF NOT EXISTS submissions_check ON submissions (check_id);
+                CREATE TABLE IF NOT EXISTS stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 0), passages INTEGER NOT NULL, total_length INTEGER NOT NULL);
+                INSERT OR IGNORE INTO stats (id, passages, total_length) VALUES (0, 0, 0);
+            """)
+            self._pid = os.getpid()
+        return self._connection
+
+    def _read_connection(self):
+        # Searches only read, and WAL lets them run alongside each other and alongside a write
+        local = self._local
+        if getattr(local, 'connection', None) is None or local.pid != os.getpid():
+            with self._lock:
+                self._connect()  # Creates the tables on first use
+            local.connection = sqlite3.connect(self.path, check_same_thread=False)
+            local.pid = os.getpid()
+        return local.connection
+
+    def add_document(self, text, title="", link="", source="source"):
+        """
+        Index a document. Documents already in the corpus (same text) are not indexed twice.
+
+        Parameters:
+        - text (str): The raw document text.
+        - title (str, optional): Title reported with matching passages.
+        - link (str, optional): Link reported with matching passages. Defaults to `corpus://<source>/<id>`.
+        - source (str, optional): Kind of document, e.g. "submission" or "source". Default is "source".
+
+        Returns:
+        - tuple: (id of the new or existing document, True if the document was added, False if it was
+                 already in the corpus)
+        """
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        passages = split_into_passages(text, self.passage_sentences)
+        clean_passages = clean_texts(passages)
+
+        indexed_passages = []
+
+        with self._lock:
+            connection = self._connect()
+            existing = connection.execute("SELECT id FROM documents WHERE digest = ?", (digest,)).fetchone()
+            if existing:
+                return existing[0], False
+
+            with connection:
+                document_id = connection.execute(
+                    "INSERT INTO documents (source, title, link, digest, created) VALUES (?, ?, ?, ?, ?)",
+                    (source, title, link, digest, time.time())).lastrowid
+                if not link:
+                    connection.execute("UPDATE documents SET link = ? WHERE id = ?",
+                                       (f"corpus://{source}/{document_id}", document_id))
+
+                for position, (passage, clean_passage) in enumerate(zip(passages, clean_passages)):
+                    terms = Counter(clean_passage.split())
+                    length = sum(terms.values())
+                    if not length:
+                        continue
+
+                    passage_id = connection.execute(
+                        "INSERT INTO passages (document_id, position, content, length) VALUES (?, ?, ?, ?)",
+                        (document_id, position, passage, length)).lastrowid
+                    connection.executemany("INSERT INTO postings (term, passage_id, tf) VALUES (?, ?, ?)",
+                                           [(term, passage_id, tf) for term, tf in terms.items()])
+                    connection.execute("UPDATE stats SET passages = passages + 1, total_length = total_length + ? WHERE id = 0",
+                                       (length,))
+                    indexed_passages.append((passage_id, passage))
+
+        for passage_id, passage in indexed_passages:
+            self.fingerprints.add(passage_id, passage)
+
+        return document_id, True
+
+    def add_submission(self, text, submitter=None, check_id=None):
+        """
+        Index a checked text and record who submitted it.
+
+        The text is indexed once (see `add_document`), but every submission of it gets its own row, so
+        identical texts from different submitters stay distinguishable (see `find_own_submissions`).
+
+        Parameters:
+        - text (str): The raw submitted text.
+        - submitter (str, optional): Id of the student or client that submitted the text.
+        - check_id (str, optional): Id of the check the text was submitted with.
+
+        Returns:
+        - int: The id of the (new or existing) document.
+        """
+        document_id, _ = self.add_document(text, title="Previous submission", source="submission")
+        with self._lock:
+            with self._connect() as connection:
+                connection.execute("INSERT INTO submissions (document_id, submitter, check_id, created) VALUES (?, ?, ?, ?)",
+                                   (document_id, submitter, check_id, time.time()))
+        return document_id
+
+    def search(self, text, top_k=10, exclude_document_ids=()):
+        """
+        Retrieve the passages most similar to a text.
+
+        Parameters:
+        - text (str): The raw query text, e.g. a paragraph being checked.
+        - top_k (int, optional): Number of passages to return. Default is 10.
+        - exclude_document_ids (iterable of int, optional): Documents to leave out of the results, e.g. an
+                                                            earlier copy of the text being checked.
+
+        Returns:
+        - list of dict: The passages sharing the most verbatim fingerprints with the text, then the best
+                        remaining passages in descending BM25 score, shaped like web search results:
+                        {'content': <passage>, 'link': <document link>, 'title': <document title>,
+                         'score': <BM25 score>, 'verbatim_matches': <shared fingerprints>, 'document_id': <document id>,
+                         'passage_id': <passage id>}
+        """
+        verbatim = {match['document_id']: match['shared'] for match in self.fingerprints.query(text, self.min_shared_fingerprints)}
+
+        terms = set(clean_texts([text])[0].split())
+        if not terms and not verbatim:
+            return []
+
+        excluded = tuple(set(exclude_document_ids))
+        connection = self._read_connection()
+        passage_count, total_length = connection.execute("SELECT passages, total_length FROM stats WHERE id = 0").fetchone()
+        if not passage_count:
+            return []
+        average_length = total_length / passage_count
+
+        idf = {}
+        if terms:
+            placeholders = ",".join("?" * len(terms))
+            for term, df in connection.execute(
+                    f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", tuple(terms)):
+                idf[term] = math.log(1 + (passage_count - df + 0.5) / (df + 0.5))
+
+        scores = dict.fromkeys(verbatim, 0.0)
+        if idf:
+            # The verbatim matches come first whatever their score, so only top_k others are needed
+            scores.update(self._bm25(connection, idf, average_length, excluded, limit=top_k))
+            if verbatim:
+                scores.update(self._bm25(connection, idf, average_length, excluded, passage_ids=list(verbatim)))
+
+        # Verbatim fingerprint matches first, most shared fingerprints first, then by BM25 score
+        ranking = sorted(scores.items(), key=lambda item: (verbatim.get(item[0], 0), item[1]), reverse=True)
+
+        results = []
+        for passage_id, score in ranking:
+            content, document_id, title, link = connection.execute(
+                "SELECT passages.content, documents.id, documents.title, documents.link FROM passages "
+                "JOIN documents ON documents.id = passages.document_id WHERE passages.id = ?", (passage_id,)).fetchone()
+            if document_id in excluded:
+                continue
+            results.append({'content': content, 'link': link, 'title': title, 'score': score,
+                            'verbatim_matches': verbatim.get(passage_id, 0), 'document_id': document_id,
+                            'passage_id': passage_id})
+            if len(results) == top_k:
+                break
+
+        return results
+
+    def _bm25(self, connection, idf, average_length, exclude_document_ids=(), passage_ids=None, limit=None):
+        """
+        Score passages with BM25 inside SQLite, over the postings of the query terms only.
+
+        Parameters:
+        - connection (sqlite3.Connection): Connection to read with.
+        - idf (dict): IDF of each query term found in the corpus.
+        - average_length (float): Average passage length in terms.
+        - exclude_document_ids (tuple of int, optional): Documents whose passages are not scored.
+        - passage_ids (list of int, optional): Only score these passages.
+        - limit (int, optional): Only return the best `limit` passages.
+
+        Returns:
+        - dict: Passage id -> BM25 score.
+        """
+        params = [value for item in idf.items() for value in item]
+        params += [self.k1 + 1, self.k1, self.b, self.b, average_length]
+        sql = (f"WITH query (term, idf) AS (VALUES {','.join(['(?, ?)'] * len(idf))}) "
+               "SELECT postings.passage_id, "
+               "SUM(query.idf * postings.tf * ? / (postings.tf + ? * (1 - ? + ? * passages.length / ?))) AS score "
+               "FROM query JOIN postings ON postings.term = query.term "
+               "JOIN passages ON passages.id = postings.passage_id")
+
+        conditions = []
+        if exclude_document_ids:
+            conditions.append(f"passages.document_id NOT IN ({','.join('?' * len(exclude_document_ids))})")
+            params += exclude_document_ids
+        if passage_ids is not None:
+            conditions.append(f"postings.passage_id IN ({','.join('?' * len(passage_ids))})")
+            params += passage_ids
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        sql += " GROUP BY postings.passage_id ORDER BY score DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return dict(connection.execute(sql, params))
+
+    def find_own_submissions(self, submitter=None, check_id=None):
+        """
+        Look up the submitted documents that only a given submitter, or a given check, has submitted.
+
+        A document that anyone else also submitted is not returned, so a text copied from another
+        submitter is still found even when its copy is identical.
+
+        Parameters:
+        - submitter (str, optional): Id of the submitter.
+        - check_id (str, optional): Id of the check.
+
+        Returns:
+        - list of int: The ids of the documents.
+        """
+        if submitter is None and check_id is None:
+            return []
+
+        own = "(COALESCE(submissions.submitter = ?, 0) OR COALESCE(submissions.check_id = ?, 0))"
+        return [row[0] for row in self._read_connection().execute(
+            "SELECT submissions.document_id FROM submissions "
+            "JOIN documents ON documents.id = submissions.document_id AND documents.source = 'submission' "
+            "WHERE submissions.document_id IN "
+            "(SELECT document_id FROM submissions WHERE submitter = ? OR check_id = ?) "
+            f"GROUP BY submissions.document_id HAVING MIN({own}) = 1",
+            (submitter, check_id, submitter, check_id))]
+
+    def get_passages(self, passage_ids):
+        """
+        Fetch passages by id, shaped like `search` results (without the scores).
+
+        Parameters:
+        - passage_ids (list of int): The passages to fetch.
+
+        Returns:
+        - list of dict: The passages found, in the order of passage_ids.
+        """
+        passages = {}
+        with self._lock:
+            connection = self._connect()
+            for start in range(0, len(passage_ids), 500):
+                chunk = list(passage_ids[start:start + 500])
+                placeholders = ",".join("?" * len(chunk))
+                for passage_id, content, document_id, title, link in connection.execute(
+                        "SELECT passages.id, passages.content, documents.id, documents.title, documents.link FROM passages "
+                        f"JOIN documents ON documents.id = passages.document_id WHERE passages.id IN ({placeholders})", chunk):
+                    passages[passage_id] = {'content': content, 'link': link, 'title': title,
+                                            'document_id': document_id, 'passage_id': passage_id}
+
+        return [passages[passage_id] for passage_id in passage_ids if passage_id in passages]
+
+    def iter_passages(self, after_id=0, batch_size=1000):
+        """
+        Iterate over the indexed passages in id (i.e. insertion) order.
+
+        Parameters:
+        - after_id (int, optional): Only yield passages with a greater id. Default is 0 (all passages).
+        - batch_size (int, optional): Passages read per query.
+
+        Yields:
+        - tuple: (passage id, raw passage content)
+        """
+        while True:
+            with self._lock:
+                rows = self._connect().execute("SELECT id, content FROM passages WHERE id > ? ORDER BY id LIMIT ?",
+                                               (after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            after_id = rows[-1][0]
+
+    def max_passage_id(self):
+        """
+        Returns:
+        - int: The id of the most recently indexed passage, 0 if the corpus is empty.
+        """
+        return self._read_connection().execute("SELECT COALESCE(MAX(id), 0) FROM passages").fetchone()[0]
+
+    def stats(self):
+        """
+        Returns:
+        - dict: Number of indexed documents and passages.
+        """
+        with self._lock:
+            connection = self._connect()
+            documents = connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            passages = connection.execute("SELECT passages FROM stats WHERE id = 0").fetchone()[0]
+        return {"documents": documents, "passages": passages}
+
+
+def get_corpus():
+    """
+    Return the process wide corpus index, creating it on first use.
+
+    Environment Variables:
+    - CORPUS_PATH: SQLite file of the corpus. Defaults to `data/corpus.sqlite3`.
+
+    Returns:
+    - CorpusIndex: The corpus.
+    """
+    global _corpus
+
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = CorpusIndex(os.environ.get("CORPUS_PATH", DEFAULT_CORPUS_PATH))
+        return _corpus
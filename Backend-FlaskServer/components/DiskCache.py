@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+
+
+def default_cache_path(file_name):
+    """
+    Build the path of a cache database inside the `CACHE_DIR` directory (defaults to `Backend-FlaskServer/cache`).
+    """
+    return os.path.join(os.environ.get("CACHE_DIR", DEFAULT_CACHE_DIR), file_name)
+
+
+class DiskCache:
+    """
+    Persistent key/value cache stored in SQLite, with a time-to-live and a least-recently-used size cap.
+
+    Values are stored as JSON. The connection is opened lazily and reopened after a fork, so a cache
+    created at import time can be shared by pre-forked worker processes.
+
+    Parameters:
+    - path (str): SQLite database file. Its directory is created if needed.
+    - ttl (float, optional): Seconds an entry stays valid. None keeps entries until they are evicted.
+    - max_entries (int, optional): Maximum number of entries; the least recently used are evicted first.
+                                   None means unbounded.
+    """
+
+    def __init__(self, path, ttl=None, max_entries=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key, default=None):
+        """
+        Look a key up, counting a hit or a miss.
+
+        Parameters:
+        - key (str): The cache key.
+        - default (optional): Value returned on a miss. Default is None.
+
+        Returns:
+        - The cached value, or `default` if the key is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.misses += 1
+                return default
+
+            connection.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def get_many(self, keys):
+        """
+        Look several keys up with one query per 500 keys, counting a hit or a miss for each.
+
+        Parameters:
+        - keys (list of str): The cache keys.
+
+        Returns:
+        - dict: Cached value of each key found and not expired. Missing keys are left out.
+        """
+        now = time.time()
+        found = {}
+        expired = []
+        with self._lock:
+            connection = self._connect()
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start:start + 500])
+                placeholders = ",".join("?" * len(chunk))
+                for key, value, created in connection.execute(
+                        f"SELECT key, value, created FROM cache WHERE key IN ({placeholders})", chunk):
+                    if self.ttl is not None and now - created > self.ttl:
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(value)
+
+            with connection:
+                connection.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in expired])
+                connection.executemany("UPDATE cache SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def set(self, key, value):
+        """
+        Store a JSON serializable value, evicting the least recently used entries past `max_entries`.
+
+        Parameters:
+        - key (str): The cache key.
+        - value: The value to store.
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO cache (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                               (key, json.dumps(value), now, now))
+
+            if self.max_entries is not None:
+                overflow = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    connection.execute("DELETE FROM cache WHERE key IN "
+                                       "(SELECT key FROM cache ORDER BY last_access ASC LIMIT ?)", (overflow,))
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters.
+        """
+        with self._lock:
+            self._connect().execute("DELETE FROM cache")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+        - dict: Hit and miss counters of this process and the number of stored entries.
+        """
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
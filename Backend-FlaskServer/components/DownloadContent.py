@@ -1,31 +1,308 @@
-import requests
+import os
 import json
-from functools import lru_cache
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 
-@lru_cache(maxsize=None)
+from components.DiskCache import DiskCache, default_cache_path
+from components.Metrics import register_collector
+
+DEFAULT_INDEX_URL = "http://index.commoncrawl.org/collinfo.json"
+DEFAULT_DATA_URL = "https://commoncrawl.s3.amazonaws.com/"
+DEFAULT_DOWNLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "downloads")
+
+_crawl_client = None
+_cdx_cache = None
+_latest_index = None
+_cdx_lookups = 0
+_init_lock = threading.Lock()
+_latest_index_lock = threading.Lock()
+
+
+class CommonCrawlClient:
+    """
+    HTTP client for the Common Crawl index (CDX) service and WARC archives.
+
+    Requests go through one pooled keep-alive session shared by all the download threads, with a
+    per-call timeout and a bounded number of retries with exponential backoff on connection errors and
+    429/5xx responses (the index service throttles bursts with 503s). WARC records are fetched with a
+    ranged request and streamed to disk in chunks, so a download never holds the record in memory.
+
+    Parameters (all default to environment variables):
+    - index_url (str, optional): Collection info URL listing the crawls, `COMMONCRAWL_INDEX_URL`.
+    - data_url (str, optional): Base URL of the WARC files, `COMMONCRAWL_DATA_URL`.
+    - timeout (float, optional): Seconds per HTTP call (to connect and between chunks), `DOWNLOAD_TIMEOUT`. Defaults to 30.
+    - retries (int, optional): Retries per request, `DOWNLOAD_RETRIES`. Defaults to 3.
+    - backoff (float, optional): Backoff factor in seconds between retries, `DOWNLOAD_BACKOFF`. Defaults to 1.
+    - pool_size (int, optional): Kept-alive connections per host, `DOWNLOAD_WORKERS`. Defaults to 8.
+    """
+
+    def __init__(self, index_url=None, data_url=None, timeout=None, retries=None, backoff=None, pool_size=None):
+        self.index_url = index_url or os.environ.get("COMMONCRAWL_INDEX_URL", DEFAULT_INDEX_URL)
+        self.data_url = data_url or os.environ.get("COMMONCRAWL_DATA_URL", DEFAULT_DATA_URL)
+        self.timeout = timeout if timeout is not None else float(os.environ.get("DOWNLOAD_TIMEOUT", 30))
+        self.pool_size = pool_size or int(os.environ.get("DOWNLOAD_WORKERS", 8))
+
+        retry = Retry(total=retries if retries is not None else int(os.environ.get("DOWNLOAD_RETRIES", 3)),
+                      backoff_factor=backoff if backoff is not None else float(os.environ.get("DOWNLOAD_BACKOFF", 1)),
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET"]),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def latest_index(self):
+        """
+        Returns:
+        - str: The CDX API endpoint of the most recent crawl.
+        """
+        response = self.session.get(self.index_url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()[0]['cdx-api']
+
+    def cdx_records(self, index, url, limit=1):
+        """
+        Look a URL up in a CDX index.
+
+        Parameters:
+        - index (str): CDX API endpoint, e.g. from `latest_index`.
+        - url (str): The URL to look up.
+        - limit (int, optional): The maximum number of records to fetch. Defaults to 1.
+
+        Returns:
+        - list of dict: The CDX records of the URL, empty if the crawl does not have it.
+        """
+        params = {
+            "url": url,
+            "output": "json",
+            "limit": limit
+        }
+        response = self.session.get(index, params=params, timeout=self.timeout)
+        if response.status_code == 404:  # The index answers 404 when it has no capture of the URL
+            return []
+        response.raise_for_status()
+        return [json.loads(line) for line in response.content.strip().split(b"\n") if line]
+
+    def download_record(self, record, out_file, chunk_size=64 * 1024):
+        """
+        Stream one WARC record to a file.
+
+        The record is written to `<out_file>.part` in chunks of `chunk_size` bytes and renamed once
+        complete, so an interrupted download never leaves a truncated `out_file` behind. The part file
+        is removed if the download fails.
+
+        Parameters:
+        - record (dict): CDX record with 'offset', 'length', and 'filename'.
+        - out_file (str): File path to save the WARC record.
+        - chunk_size (int, optional): Bytes read and written at a time. Defaults to 64 KiB.
+
+        Returns:
+        - int: The number of bytes written.
+
+        Raises:
+        - requests.RequestException: If the request fails, or the server ignores the range and would send
+                                     the whole multi-gigabyte archive.
+        - IOError: If fewer bytes than the record length were received.
+        """
+        offset, length = int(record['offset']), int(record['length'])
+        headers = {
+            "Range": f"bytes={offset}-{offset+length-1}"
+        }
+
+        with self.session.get(self.data_url + record['filename'], headers=headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise requests.RequestException(f"Range request not honoured (status {response.status_code})")
+
+            written = 0
+            part_file = out_file + ".part"
+            try:
+                with open(part_file, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        written += len(chunk)
+
+                if written != length:
+                    raise IOError(f"Received {written} of {length} bytes")
+            except BaseException:
+                # A dropped connection, a full disk or an interrupt must not leave the partial file behind
+                if os.path.exists(part_file):
+                    os.remove(part_file)
+                raise
+
+        os.replace(part_file, out_file)
+        return written
+
+
+def get_crawl_client():
+    """
+    Return the process wide `CommonCrawlClient`, creating it on first use (and again after a fork, since
+    pooled connections cannot be shared between processes).
+
+    Returns:
+    - CommonCrawlClient: The shared client.
+    """
+    global _crawl_client
+
+    with _init_lock:
+        if _crawl_client is None or _crawl_client[0] != os.getpid():
+            _crawl_client = (os.getpid(), CommonCrawlClient())
+        return _crawl_client[1]
+
+
+def get_cdx_cache():
+    """
+    Return the process wide CDX record cache, creating it on first use.
+
+    The records of a URL in a given crawl never change, so they are cached for long, keyed by the
+    index endpoint and the URL. URLs the crawl does not have are cached too.
+
+    Environment Variables:
+    - CDX_CACHE_PATH: SQLite file of the cache. Defaults to `cache/cdx_cache.sqlite3`; an empty value disables caching.
+    - CDX_CACHE_TTL: Seconds a cached lookup stays valid. Defaults to 2592000 (30 days).
+    - CDX_CACHE_MAX_ENTRIES: Number of cached URLs kept, least recently used are evicted. Defaults to 200000.
+
+    Returns:
+    - DiskCache: The cache, or None if caching is disabled.
+    """
+    global _cdx_cache
+
+    path = os.environ.get("CDX_CACHE_PATH", default_cache_path("cdx_cache.sqlite3"))
+    if not path:
+        return None
+
+    with _init_lock:
+        if _cdx_cache is None:
+            _cdx_cache = DiskCache(path,
+                                   ttl=float(os.environ.get("CDX_CACHE_TTL", 30 * 86400)),
+                                   max_entries=int(os.environ.get("CDX_CACHE_MAX_ENTRIES", 200000)))
+        return _cdx_cache
+
+
+def cdx_metrics():
+    """
+    Prometheus collector (see `Metrics.register_collector`) for the CDX record cache and index lookups.
+    """
+    metrics = [("cdx_lookups_total", "counter", "URLs looked up in the Common Crawl index service.", _cdx_lookups)]
+    # Only report a cache this process already uses, a metrics scrape should not create one
+    cache = _cdx_cache
+    if cache is not None:
+        metrics += [
+            ("cdx_cache_hits_total", "counter", "URL lookups answered from the CDX record cache.", cache.hits),
+            ("cdx_cache_misses_total", "counter", "URL lookups not found in the CDX record cache.", cache.misses),
+        ]
+    return metrics
+
+
+register_collector(cdx_metrics)
+
+
 def get_latest_index():
     """
     Retrieve the latest CDX (Common Data eXchange) index endpoint from Common Crawl's collection info.
 
-    This function is memoized using an LRU cache for performance optimization.
+    The endpoint is memoized and fetched again once it is older than `CDX_INDEX_REFRESH` seconds
+    (default 86400), so a long-running server picks up new crawls. If the refresh fails, the previous
+    endpoint keeps being used.
 
     Returns:
     - str: The endpoint URL for the latest CDX index.
     - None: In case of request error or inability to fetch the index.
     """
-    cdx_url = "http://index.commoncrawl.org/collinfo.json"
-    try:
-        colls = requests.get(cdx_url).json()
-        return colls[0]['cdx-api']
-    except requests.RequestException:
-        print("Error fetching the latest index.")
-        return None
+    global _latest_index
+
+    with _latest_index_lock:
+        if _latest_index is not None and time.time() - _latest_index[0] < float(os.environ.get("CDX_INDEX_REFRESH", 86400)):
+            return _latest_index[1]
+
+        try:
+            _latest_index = (time.time(), get_crawl_client().latest_index())
+        except (requests.RequestException, ValueError, LookupError):
+            print("Error fetching the latest index.")
+            if _latest_index is None:
+                return None
+            # Keep the previous endpoint, and only retry after another refresh interval
+            _latest_index = (time.time(), _latest_index[1])
+        return _latest_index[1]
+
+
+def cdx_cache_key(index, url):
+    return f"{index} {url}"
+
+
+def resolve_urls(urls, limit=1, workers=None):
+    """
+    Look several URLs up in the latest CDX index.
+
+    Duplicate URLs are looked up once. The cached lookups of all the URLs are read in one batch (see
+    `get_cdx_cache`), and only the remaining URLs are sent to the index service, up to `workers` at a
+    time over the shared pooled session. Their results are then cached, including URLs with no capture.
+
+    Parameters:
+    - urls (list of str): The URLs to look up.
+    - limit (int, optional): The maximum number of records to fetch per URL. Defaults to 1.
+    - workers (int, optional): Concurrent index requests, `DOWNLOAD_WORKERS`. Defaults to 8.
+
+    Returns:
+    - dict: URL -> list of its CDX records (empty if the crawl does not have it), or None if the lookup
+            failed or the latest index isn't available.
+    """
+    global _cdx_lookups
+
+    unique_urls = list(dict.fromkeys(urls))
+    latest_index = get_latest_index()
+    if not latest_index:
+        return {url: None for url in unique_urls}
+
+    cache = get_cdx_cache()
+    resolved = {}
+    if cache is not None:
+        cached = cache.get_many([cdx_cache_key(latest_index, url) for url in unique_urls])
+        for url in unique_urls:
+            entry = cached.get(cdx_cache_key(latest_index, url))
+            # Fewer records than the entry's limit means the lookup found all the records of the URL
+            if entry is not None and (entry['limit'] >= limit or len(entry['records']) < entry['limit']):
+                resolved[url] = entry['records'][:limit]
+
+    client = get_crawl_client()
+
+    def lookup(url):
+        try:
+            return client.cdx_records(latest_index, url, limit)
+        except (requests.RequestException, ValueError):  # ValueError: the index answered with invalid JSON
+            print(f"Error fetching CDX records for {url}.")
+            return None
+
+    missing = [url for url in unique_urls if url not in resolved]
+    if missing:
+        workers = workers or int(os.environ.get("DOWNLOAD_WORKERS", 8))
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing)), thread_name_prefix="cdx") as executor:
+            for url, records in zip(missing, executor.map(lookup, missing)):
+                with _init_lock:
+                    _cdx_lookups += 1
+                resolved[url] = records
+                if records is not None and cache is not None:
+                    cache.set(cdx_cache_key(latest_index, url), {'limit': limit, 'records': records})
+
+    return resolved
+
 
 def get_cdx_records(url, limit=1):
     """
     Get the latest CDX (Common Data eXchange) record for a given URL using a remote index service.
 
+    Lookups are cached on disk (see `resolve_urls`).
+
     Parameters:
     - url (str): The target URL for which the CDX records are fetched.
     - limit (int, optional): The maximum number of records to fetch. Defaults to 1.
@@ -34,56 +311,109 @@ def get_cdx_records(url, limit=1):
     - dict: The latest CDX record for the provided URL, parsed from JSON.
     - None: If no record is found, an error occurs, or the latest index isn't available.
     """
-    latest_index = get_latest_index()
-    if not latest_index:
-        return None
-    
-    params = {
-        "url": url,
-        "output": "json",
-        "limit": limit
-    }
-
-    try:
-        response = requests.get(latest_index, params=params)
-        response.raise_for_status()  # This will raise an HTTPError if the HTTP request returned an unsuccessful status code.
-        records = [json.loads(line) for line in response.content.strip().split(b"\n")]
-        return records[0] if records else None
-    except requests.RequestException:
-        print(f"Error fetching CDX records for {url}.")
-        return None
+    records = resolve_urls([url], limit)[url]
+    return records[0] if records else None
 
 
 def download_common_crawl_data(record, out_file):
     """
     Download a WARC record from Common Crawl based on the CDX record and save it to an output file.
 
+    The record is streamed to disk through the shared client (see `CommonCrawlClient.download_record`).
+
     Parameters:
     - record (dict): CDX record with 'offset', 'length', and 'filename'.
     - out_file (str): File path to save the WARC record.
+
+    Returns:
+    - int: The number of bytes written.
     """
-    offset, length = int(record['offset']), int(record['length'])
-    warc_url = record['filename']
+    return get_crawl_client().download_record(record, out_file)
 
-    headers = {
-        "Range": f"bytes={offset}-{offset+length-1}"
-    }
 
-    response = requests.get(f"https://commoncrawl.s3.amazonaws.com/{warc_url}", headers=headers)
+def download_urls(urls, out_dir, workers=None, progress=None):
+    """
+    Download the latest Common Crawl capture of each URL, several URLs at a time.
 
-    with open(out_file, "wb") as f:
-        f.write(response.content)
+    The URLs are first looked up in the latest CDX index together (see `resolve_urls`, which answers
+    known URLs from the CDX cache). Then the WARC record of each URL is streamed to
+    `<out_dir>/data_<index>.warc.gz`, `index` being the position of the URL in `urls`. Lookups and
+    downloads of up to `workers` URLs run concurrently over the shared pooled session. As each URL
+    finishes, its status is appended to `<out_dir>/manifest.jsonl`, so the manifest of a long download
+    can be followed while it runs and tells which URLs to retry after a crash.
 
-if __name__ == "__main__":
-    target_url = "https://www.example.com/"  # Replace with your URL
-    records = get_cdx_records(target_url)
+    Parameters:
+    - urls (list of str): The URLs to download.
+    - out_dir (str): Directory the archives and the manifest are written to. Created if needed.
+    - workers (int, optional): URLs processed concurrently, `DOWNLOAD_WORKERS`. Defaults to 8.
+    - progress (callable, optional): Called as `progress(done, total)` after each URL.
+
+    Returns:
+    - list of dict: One manifest entry per URL, in the order of `urls`, with the keys:
+        - 'index' (int), 'url' (str)
+        - 'status' (str): "downloaded", "not_found" (no capture in the index) or "failed".
+        - 'file' (str): Name of the archive in `out_dir`, None unless downloaded.
+        - 'bytes' (int): Size of the archive, None unless downloaded.
+        - 'record' (dict): 'filename', 'offset' and 'length' of the WARC record, if found.
+        - 'error' (str): The error message of a failed URL, otherwise None.
+    """
+    workers = workers or int(os.environ.get("DOWNLOAD_WORKERS", 8))
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.jsonl")
+    manifest_lock = threading.Lock()
+
+    resolved = resolve_urls(urls, workers=workers)
+    client = get_crawl_client()
+
+    def download(index, url):
+        entry = {'index': index, 'url': url, 'status': 'failed', 'file': None, 'bytes': None, 'record': None, 'error': None}
+        try:
+            records = resolved[url]
+            if records is None:
+                raise requests.RequestException("CDX lookup failed")
+            if not records:
+                entry['status'] = 'not_found'
+                entry['error'] = f"No CDX record found for URL: {url}"
+                return entry
+
+            record = records[0]
+            entry['record'] = {key: record.get(key) for key in ('filename', 'offset', 'length')}
+            file_name = f"data_{index}.warc.gz"
+            entry['bytes'] = client.download_record(record, os.path.join(out_dir, file_name))
+            entry['file'] = file_name
+            entry['status'] = 'downloaded'
+        except Exception as e:
+            entry['error'] = f"Error processing URL {url}: {str(e)}"
+            logging.error(f"Failed to process {url}. Reason: {str(e)}")
+        return entry
+
+    manifest = [None] * len(urls)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls))), thread_name_prefix="download") as executor:
+        futures = [executor.submit(download, index, url) for index, url in enumerate(urls)]
+        for done, future in enumerate(as_completed(futures), 1):
+            entry = future.result()
+            manifest[entry['index']] = entry
+            with manifest_lock, open(manifest_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            if progress:
+                progress(done, len(urls))
+
+    return manifest
+
+
+def new_download_dir(base_dir=None):
+    """
+    Create a fresh directory for one batch of downloads inside `DOWNLOAD_DIR` (defaults to
+    `Backend-FlaskServer/downloads`), so concurrent batches never overwrite each other's files.
+
+    Returns:
+    - tuple: (batch id, directory path).
+    """
+    batch_id = uuid.uuid4().hex
+    path = os.path.join(base_dir or os.environ.get("DOWNLOAD_DIR", DEFAULT_DOWNLOAD_DIR), batch_id)
+    os.makedirs(path, exist_ok=True)
+    return batch_id, path
 
-    if records:
-        first_record = records[0]
-        download_common_crawl_data(first_record, "data.warc.gz")
-        print(f"Data saved to data.warc.gz")
-    else:
-        print(f"No data found for {target_url}")
 
 def get_text_from_link(url):
     """
@@ -106,9 +436,30 @@ def get_text_from_link(url):
     # Parse the content using BeautifulSoup
     soup = BeautifulSoup(response.content, 'html.parser')
 
-    # Extract text from the page
+    return extract_paragraph_text(soup)
+
+
+def extract_paragraph_text(soup):
+    """
+    Extract the text of a parsed HTML page from its <p> tags.
+
+    Parameters:
+    - soup (BeautifulSoup): The parsed page.
+
+    Returns:
+    - str: The text of the paragraphs, joined with spaces.
+    """
     # Here we're considering all the text inside <p> tags, but you can adjust based on your requirements.
     paragraphs = soup.find_all('p')
-    text = ' '.join(paragraph.text for paragraph in paragraphs)
+    return ' '.join(paragraph.text for paragraph in paragraphs)
 
-    return text
+
+if __name__ == "__main__":
+    target_url = "https://www.example.com/"  # Replace with your URL
+    record = get_cdx_records(target_url)
+
+    if record:
+        download_common_crawl_data(record, "data.warc.gz")
+        print(f"Data saved to data.warc.gz")
+    else:
+        print(f"No data found for {target_url}")
@@ -0,0 +1,225 @@
+import os
+import string
+import hashlib
+import sqlite3
+import threading
+from collections import deque, defaultdict
+
+from components.PreProcess_Text import preprocess_text
+
+
+HASH_MODULUS = (1 << 61) - 1
+HASH_BASE = 1000003
+
+
+def fingerprint_tokens(text):
+    """
+    The token stream fingerprints are computed over: `preprocess_text` tokens without punctuation tokens.
+
+    Parameters:
+    - text (str): The raw text.
+
+    Returns:
+    - List[str]: The normalized tokens.
+    """
+    return [token for token in preprocess_text(text) if token.strip(string.punctuation)]
+
+
+def token_hash(token):
+    """
+    Stable 60-bit hash of a token (Python's `hash` is salted per process, so it cannot be stored).
+    """
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big') % HASH_MODULUS
+
+
+def kgram_hashes(tokens, k=5):
+    """
+    Hashes every k-gram of consecutive tokens with a rolling (Karp-Rabin) hash, in time linear in the
+    number of tokens.
+
+    Parameters:
+    - tokens (list of str): The token stream.
+    - k (int, optional): Number of tokens per k-gram. Default is 5.
+
+    Returns:
+    - List[int]: Hash of the k-gram starting at each position (len(tokens) - k + 1 values, or none if
+                 there are fewer than k tokens).
+    """
+    if len(tokens) < k:
+        return []
+
+    token_hashes = [token_hash(token) for token in tokens]
+    leading_power = pow(HASH_BASE, k - 1, HASH_MODULUS)
+
+    current = 0
+    for value in token_hashes[:k]:
+        current = (current * HASH_BASE + value) % HASH_MODULUS
+
+    hashes = [current]
+    for i in range(k, len(token_hashes)):
+        current = ((current - token_hashes[i - k] * leading_power) * HASH_BASE + token_hashes[i]) % HASH_MODULUS
+        hashes.append(current)
+
+    return hashes
+
+
+def winnow(hashes, window=4):
+    """
+    Selects fingerprints from k-gram hashes with robust winnowing (Schleimer, Wilkerson and Aiken, the
+    algorithm behind MOSS).
+
+    The minimum hash of every window of `window` consecutive hashes is selected (the rightmost one on ties),
+    and each selected occurrence is recorded once. Any match of at least window + k - 1 tokens is
+    guaranteed to share a fingerprint. Runs in linear time with a monotonic queue.
+
+    Parameters:
+    - hashes (list of int): k-gram hashes, as returned by `kgram_hashes`.
+    - window (int, optional): Window size. Default is 4.
+
+    Returns:
+    - List[tuple]: (hash, position) pairs, position being the index of the k-gram in the token stream.
+    """
+    if not hashes:
+        return []
+    if len(hashes) <= window:
+        position = min(range(len(hashes)), key=lambda i: (hashes[i], -i))
+        return [(hashes[position], position)]
+
+    fingerprints = []
+    candidates = deque()
+    last_selected = -1
+
+    for i, value in enumerate(hashes):
+        while candidates and hashes[candidates[-1]] >= value:
+            candidates.pop()
+        candidates.append(i)
+
+        if candidates[0] <= i - window:
+            candidates.popleft()
+
+        if i >= window - 1 and candidates[0] != last_selected:
+            last_selected = candidates[0]
+            fingerprints.append((hashes[last_selected], last_selected))
+
+    return fingerprints
+
+
+def fingerprint(text, k=5, window=4):
+    """
+    Computes the winnowed fingerprints of a text.
+
+    Parameters:
+    - text (str): The raw text.
+    - k (int, optional): Tokens per k-gram. Default is 5.
+    - window (int, optional): Winnowing window. Default is 4.
+
+    Returns:
+    - List[tuple]: (hash, position) pairs, see `winnow`.
+    """
+    return winnow(kgram_hashes(fingerprint_tokens(text), k), window)
+
+
+class FingerprintIndex:
+    """
+    Persistent hash -> (document, position) index of winnowed fingerprints, stored in SQLite.
+
+    Finding the indexed documents that share fingerprints with a text costs one fingerprinting pass over
+    the text plus an indexed lookup per fingerprint, i.e. roughly linear in the text length and independent
+    of the corpus size, which makes it a cheap first-stage filter ahead of the vector scorers.
+
+    Parameters:
+    - path (str): SQLite database file. Its directory is created if needed.
+    - k (int, optional): Tokens per k-gram. Default is 5.
+    - window (int, optional): Winnowing window. Default is 4.
+    """
+
+    def __init__(self, path, k=5, window=4):
+        self.path = path
+        self.k = k
+        self.window = window
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    hash INTEGER NOT NULL, document_id INTEGER NOT NULL, position INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS fingerprints_hash ON fingerprints (hash);
+            """)
+            self._pid = os.getpid()
+        return self._connection
+
+    def add(self, document_id, text):
+        """
+        Index the fingerprints of a document.
+
+        Parameters:
+        - document_id (int): Id reported by `query` for this document.
+        - text (str): The raw document text.
+
+        Returns:
+        - int: Number of fingerprints stored.
+        """
+        fingerprints = fingerprint(text, self.k, self.window)
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany("INSERT INTO fingerprints (hash, document_id, position) VALUES (?, ?, ?)",
+                                       [(value, document_id, position) for value, position in fingerprints])
+
+        return len(fingerprints)
+
+    def query(self, text, min_shared=1, exclude_document_ids=()):
+        """
+        Find the indexed documents sharing fingerprints with a text, and where.
+
+        Parameters:
+        - text (str): The raw query text.
+        - min_shared (int, optional): Minimum number of shared fingerprints to report a document. Default is 1.
+        - exclude_document_ids (iterable of int, optional): Documents to leave out of the results.
+
+        Returns:
+        - list of dict: One entry per matching document, most shared fingerprints first:
+                        {'document_id': <id>, 'shared': <number of distinct query fingerprints found>,
+                         'coverage': <shared / number of query fingerprints>,
+                         'matches': [(<query token position>, <document token position>), ...]}
+        """
+        fingerprints = fingerprint(text, self.k, self.window)
+        if not fingerprints:
+            return []
+
+        query_positions = defaultdict(list)
+        for value, position in fingerprints:
+            query_positions[value].append(position)
+
+        excluded = set(exclude_document_ids)
+        matches = defaultdict(list)
+        shared = defaultdict(set)
+        hashes = list(query_positions)
+
+        with self._lock:
+            connection = self._connect()
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for value, document_id, position in connection.execute(
+                        f"SELECT hash, document_id, position FROM fingerprints WHERE hash IN ({placeholders})", chunk):
+                    if document_id in excluded:
+                        continue
+                    shared[document_id].add(value)
+                    matches[document_id].extend((query_position, position) for query_position in query_positions[value])
+
+        results = [{
+            'document_id': document_id,
+            'shared': len(values),
+            'coverage': len(values) / len(query_positions),
+            'matches': sorted(matches[document_id])
+        } for document_id, values in shared.items() if len(values) >= min_shared]
+
+        return sorted(results, key=lambda x: x['shared'], reverse=True)
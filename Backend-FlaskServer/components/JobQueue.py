@@ -0,0 +1,182 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from components.DiskCache import DiskCache
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+class QueueFullError(Exception):
+    """
+    Raised by `JobQueue.submit` when too many jobs are already waiting.
+    """
+
+
+class JobQueue:
+    """
+    In-memory queue of background jobs run by a pool of worker threads.
+
+    A job is a function called as `fn(progress, *args, **kwargs)`, where `progress(done, total)` reports
+    how far it got. Submitting returns a job id immediately; the job's status ("queued", "running",
+    "done" or "failed"), progress and result are then read with `get`. Finished jobs are kept for `ttl`
+    seconds, and at most `max_finished` of them are kept.
+
+    The worker pool is created lazily and again after a fork, so a queue created at import time can be
+    shared by pre-forked worker processes. Each process runs the jobs submitted to it; with a `shared`
+    cache every status change is also written there, so any process can report on any job.
+
+    Parameters:
+    - workers (int, optional): Number of jobs run concurrently. Default is 2.
+    - max_queued (int, optional): Maximum number of jobs waiting for a worker. Default is 100.
+    - max_finished (int, optional): Maximum number of finished jobs kept. Default is 1000.
+    - ttl (float, optional): Seconds a finished job stays readable. Default is 3600.
+    - shared (DiskCache, optional): Cache the job snapshots are published to.
+    """
+
+    def __init__(self, workers=2, max_queued=100, max_finished=1000, ttl=3600, shared=None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.ttl = ttl
+        self.shared = shared
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue a job.
+
+        Parameters:
+        - fn (callable): The job, called as `fn(progress, *args, **kwargs)`.
+
+        Returns:
+        - str: The job id.
+
+        Raises:
+        - QueueFullError: If `max_queued` jobs are already waiting.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'progress': {'done': 0, 'total': None},
+            'result': None,
+            'error': None,
+            'created': time.time(),
+            'started': None,
+            'finished': None
+        }
+
+        with self._lock:
+            self._expire()
+            if sum(1 for queued in self._jobs.values() if queued['status'] == 'queued') >= self.max_queued:
+                raise QueueFullError(f"{self.max_queued} jobs are already queued")
+            self._jobs[job_id] = job
+            self._get_executor().submit(self._run, job, fn, args, kwargs)
+
+        self._publish(job)
+        return job_id
+
+    def _publish(self, job):
+        if self.shared is not None:
+            self.shared.set(job['job_id'], job)
+
+    def _run(self, job, fn, args, kwargs):
+        def progress(done, total=None):
+            job['progress'] = {'done': done, 'total': total}
+            self._publish(job)
+
+        job['started'] = time.time()
+        job['status'] = 'running'
+        self._publish(job)
+        try:
+            job['result'] = fn(progress, *args, **kwargs)
+            job['status'] = 'done'
+        except Exception as e:
+            logging.exception(f"Job {job['job_id']} failed")
+            job['error'] = str(e)
+            job['status'] = 'failed'
+        finally:
+            job['finished'] = time.time()
+            self._publish(job)
+
+    def _expire(self):
+        now = time.time()
+        finished = [job_id for job_id, job in self._jobs.items() if job['finished'] is not None]
+        overflow = len(finished) - self.max_finished
+        for job_id in finished:
+            if overflow > 0 or now - self._jobs[job_id]['finished'] > self.ttl:
+                del self._jobs[job_id]
+                overflow -= 1
+
+    def get(self, job_id):
+        """
+        Look a job up.
+
+        Parameters:
+        - job_id (str): The id returned by `submit`.
+
+        Returns:
+        - dict: A snapshot of the job with the keys 'job_id', 'status', 'progress', 'result', 'error',
+                'created', 'started' and 'finished', or None if the job is unknown or has expired.
+        """
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+
+        # Submitted to another worker process
+        return self.shared.get(job_id) if self.shared is not None else None
+
+    def stats(self):
+        """
+        Returns:
+        - dict: Number of jobs per status.
+        """
+        with self._lock:
+            counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+
+def get_job_queue():
+    """
+    Return the process wide job queue, creating it on first use.
+
+    Environment Variables:
+    - JOB_WORKERS: Number of checks run concurrently in the background. Defaults to 2.
+    - JOB_MAX_QUEUED: Maximum number of checks waiting for a worker. Defaults to 100.
+    - JOB_RESULT_TTL: Seconds a finished check stays readable. Defaults to 3600.
+    - JOB_STORE_PATH: If set, job snapshots are also written to this SQLite file so that every worker
+                      process of the server can report on every job. Set by `serve.py` with several workers.
+
+    Returns:
+    - JobQueue: The job queue.
+    """
+    global _job_queue
+
+    with _job_queue_lock:
+        if _job_queue is None:
+            ttl = float(os.environ.get("JOB_RESULT_TTL", 3600))
+            shared = DiskCache(os.environ["JOB_STORE_PATH"], ttl=ttl) if os.environ.get("JOB_STORE_PATH") else None
+            _job_queue = JobQueue(workers=int(os.environ.get("JOB_WORKERS", 2)),
+                                  max_queued=int(os.environ.get("JOB_MAX_QUEUED", 100)),
+                                  ttl=ttl, shared=shared)
+        return _job_queue
@@ -0,0 +1,374 @@
+import os
+import glob
+import json
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+_collectors = []
+_metrics = []
+_snapshot_lock = threading.Lock()
+_last_snapshot = None
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, rendered in the Prometheus text format.
+
+    Parameters:
+    - name (str): Metric name.
+    - documentation (str): HELP text.
+    - label_names (tuple of str, optional): Names of the labels passed to `inc`.
+    """
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, snapshots):
+        values = {}
+        for snapshot in snapshots:
+            for key, value in snapshot:
+                values[tuple(key)] = values.get(tuple(key), 0) + value
+        return values
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Histogram with fixed cumulative buckets and optional labels, rendered in the Prometheus text format.
+
+    Parameters:
+    - name (str): Metric name.
+    - documentation (str): HELP text.
+    - label_names (tuple of str, optional): Names of the labels passed to `observe`.
+    - buckets (tuple of float, optional): Upper bounds of the buckets, in increasing order.
+    """
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(series['buckets']), series['sum'], series['count']] for key, series in self._series.items()]
+
+    def merge(self, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for key, buckets, total, count in snapshot:
+                series = merged.setdefault(tuple(key), {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+                series['buckets'] = [a + b for a, b in zip(series['buckets'], buckets)]
+                series['sum'] += total
+                series['count'] += count
+        return merged
+
+    def render(self, series_by_key=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        if series_by_key is None:
+            with self._lock:
+                series_by_key = {key: {**series, 'buckets': list(series['buckets'])} for key, series in self._series.items()}
+        for key, series in sorted(series_by_key.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', '+Inf')])} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series['count']}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("plagiarism_stage_seconds", "Time spent in each stage of a plagiarism check.", ("stage",))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to handle an HTTP request.", ("endpoint", "status"))
+CHECKS_TOTAL = Counter("plagiarism_checks_total", "Plagiarism checks run (TF-IDF passes).")
+ESCALATIONS_TOTAL = Counter("plagiarism_escalations_total", "Plagiarism checks escalated to the word2vec pass.")
+
+
+class RequestTimings:
+    """
+    Per-request totals of the stage timings, for the Server-Timing header. Stages running on several
+    threads at once (e.g. one search per paragraph) are summed, so a stage total can exceed the wall time.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def server_timing(self):
+        """
+        Returns:
+        - str: The value of a Server-Timing header, stage durations and the total in milliseconds.
+        """
+        with self._lock:
+            entries = [f"{name};dur={duration * 1000:.1f}" for name, duration in self.durations.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+def start_request():
+    """
+    Start collecting the stage timings of the current request.
+
+    Work submitted to thread pools during the request is attributed to it as long as it runs in a copy of
+    the submitting context (`contextvars.copy_context().run`).
+
+    Returns:
+    - RequestTimings: The timings of the request.
+    """
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+def current_request_timings():
+    """
+    Returns:
+    - RequestTimings: The timings of the request being handled, or None outside of a request.
+    """
+    return _request_timings.get()
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block as a stage: the duration is added to the `plagiarism_stage_seconds` histogram and to the
+    Server-Timing totals of the current request, if any.
+
+    Parameters:
+    - name (str): Stage name, e.g. "search" or "vectorizer_fit".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.add(name, duration)
+
+
+def register_collector(collector, shared=False):
+    """
+    Register a function called on every scrape, returning extra metrics computed from other components'
+    statistics (cache hit counters, queue sizes).
+
+    Parameters:
+    - collector (callable): Returns a list of (name, type, documentation, value) tuples, type being
+                            "counter" or "gauge".
+    - shared (bool, optional): The metrics describe state shared by every process (e.g. a SQLite store),
+                               so with `METRICS_DIR` they are only read in the process serving the scrape
+                               instead of being summed over the processes. Default is False.
+    """
+    _collectors.append((collector, shared))
+
+
+def _collect(shared):
+    return [list(metric) for collector, collector_shared in _collectors if collector_shared == shared for metric in collector()]
+
+
+def _snapshot_path(pid):
+    return os.path.join(os.environ["METRICS_DIR"], f"metrics-{pid}.json")
+
+
+def write_metrics_snapshot():
+    """
+    Write the metrics of this process to `METRICS_DIR/metrics-<pid>.json`, where `render_metrics` of any
+    process of the server reads them. Does nothing if `METRICS_DIR` is not set or nothing changed.
+    """
+    global _last_snapshot
+
+    if not os.environ.get("METRICS_DIR"):
+        return
+
+    data = json.dumps({'metrics': {metric.name: metric.snapshot() for metric in _metrics}, 'collected': _collect(False)})
+    with _snapshot_lock:
+        if data == _last_snapshot:
+            return
+        path = _snapshot_path(os.getpid())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        _last_snapshot = data
+
+
+def start_metrics_writer(interval=None):
+    """
+    Start a daemon thread writing the metrics of this process with `write_metrics_snapshot` every
+    `interval` seconds (`METRICS_WRITE_INTERVAL`, default 1). Called in every worker process of serve.py.
+
+    The counters and histograms are reset first, as a forked worker inherits the values recorded by its
+    parent (e.g. while warming up), which would otherwise be counted once per worker.
+    """
+    global _last_snapshot
+
+    if not os.environ.get("METRICS_DIR"):
+        return
+
+    for metric in _metrics:
+        metric.reset()
+    _last_snapshot = None
+    interval = interval or float(os.environ.get("METRICS_WRITE_INTERVAL", 1))
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_metrics_snapshot()
+            except (OSError, ValueError) as e:
+                logging.error(f"Failed to write the metrics snapshot. Reason: {str(e)}")
+
+    threading.Thread(target=run, name="metrics-writer", daemon=True).start()
+
+
+def mark_process_dead(pid):
+    """
+    Keep the counters and histograms of a process that exited, so the merged counters never go down, and
+    drop its gauges. Called by the serve.py master for every worker that exits.
+
+    Parameters:
+    - pid (int): The exited process.
+    """
+    if not os.environ.get("METRICS_DIR"):
+        return
+
+    path = _snapshot_path(pid)
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return
+
+    snapshot['collected'] = [metric for metric in snapshot['collected'] if metric[1] != "gauge"]
+    # A new process may get the same pid, so the snapshot is kept under a name it will not overwrite
+    dead_path = _snapshot_path(f"{pid}-exited-{time.time_ns()}")
+    with open(dead_path + ".tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(dead_path + ".tmp", dead_path)
+    os.remove(path)
+
+
+def _read_snapshots():
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(os.environ["METRICS_DIR"], "metrics-*.json"))):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except FileNotFoundError:  # Replaced by `mark_process_dead` meanwhile
+            continue
+    return snapshots
+
+
+def _render_collected(collected):
+    lines = []
+    for name, metric_type, documentation, value in collected:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+    return lines
+
+
+def render_metrics():
+    """
+    Render every metric in the Prometheus text exposition format (version 0.0.4).
+
+    With `METRICS_DIR` set (by serve.py with several workers), every process writes its metrics there (see
+    `write_metrics_snapshot`) and the snapshots of all of them are merged, like the multiprocess mode of
+    prometheus_client: counters and histograms are summed over every process that ever ran, and gauges
+    over the running ones. Otherwise the metrics of this process are rendered.
+
+    Returns:
+    - str: The exposition text.
+    """
+    if not os.environ.get("METRICS_DIR"):
+        lines = []
+        for metric in _metrics:
+            lines.extend(metric.render())
+        lines.extend(_render_collected(_collect(False) + _collect(True)))
+        return "\n".join(lines) + "\n"
+
+    write_metrics_snapshot()
+    snapshots = _read_snapshots()
+
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render(metric.merge(snapshot['metrics'].get(metric.name, []) for snapshot in snapshots)))
+
+    collected = {}
+    for snapshot in snapshots:
+        for name, metric_type, documentation, value in snapshot['collected']:
+            if name in collected:
+                collected[name][3] += value
+            else:
+                collected[name] = [name, metric_type, documentation, value]
+    lines.extend(_render_collected(list(collected.values()) + _collect(True)))
+
+    return "\n".join(lines) + "\n"
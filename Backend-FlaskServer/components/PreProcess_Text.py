@@ -1,6 +1,7 @@
 import nltk
 import string
 import re
+from functools import lru_cache
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 from nltk.tokenize import sent_tokenize
@@ -12,6 +13,84 @@ nltk.download('punkt')
 nltk.download('stopwords')
 nltk.download('wordnet')
 
+
+class TextNormalizer:
+    """
+    Precompiled text normalizer shared by `preprocess_text`, `clean_text` and `extract_keywords`.
+
+    The stopword set, punctuation translation table and lemmatizer are built once. Lowercasing, stopword
+    removal and lemmatization then happen in a single pass over the tokens, with lemmas memoized in a
+    bounded LRU cache since the same words repeat across sentences and search snippets.
+
+    Parameters:
+    - language (str, optional): Stopword language. Default is 'english'.
+    - cache_size (int, optional): Maximum number of memoized lemmas. Default is 100000.
+    """
+
+    def __init__(self, language='english', cache_size=100000):
+        self.stop_words = frozenset(stopwords.words(language))
+        self.punctuation_table = str.maketrans('', '', string.punctuation)
+        self.lemmatize = lru_cache(maxsize=cache_size)(WordNetLemmatizer().lemmatize)
+
+        # WordNet is loaded lazily on the first lookup; do it now rather than inside a request
+        self.lemmatize('warmup')
+
+    def normalize_tokens(self, tokens):
+        """
+        Lowercase the tokens, drop stopwords and lemmatize what remains.
+
+        Parameters:
+        - tokens (iterable of str): Tokens to normalize.
+
+        Returns:
+        - List[str]: The normalized tokens.
+        """
+        stop_words = self.stop_words
+        lemmatize = self.lemmatize
+        return [lemmatize(word) for word in map(str.lower, tokens) if word not in stop_words]
+
+    def preprocess(self, text):
+        """
+        Tokenize with NLTK's word tokenizer and normalize the tokens. Punctuation tokens are kept.
+        """
+        return self.normalize_tokens(word_tokenize(text))
+
+    def clean(self, text):
+        """
+        Strip punctuation, split on whitespace, normalize the tokens and join them back into a string.
+        """
+        return ' '.join(self.normalize_tokens(text.translate(self.punctuation_table).split()))
+
+    def lemmatize_phrase(self, phrase):
+        """
+        Lemmatize each word of a whitespace separated phrase, without removing stopwords.
+        """
+        return ' '.join(map(self.lemmatize, phrase.split()))
+
+
+normalizer = TextNormalizer()
+
+# Regular expressions to detect various date formats
+DATE_PATTERNS = [
+    r'\bJan(?:uary)? \d{1,2}, \d{4}\b',
+    r'\bFeb(?:ruary)? \d{1,2}, \d{4}\b',
+    r'\bMar(?:ch)? \d{1,2}, \d{4}\b',
+    r'\bApr(?:il)? \d{1,2}, \d{4}\b',
+    r'\bMay \d{1,2}, \d{4}\b',
+    r'\bJun(?:e)? \d{1,2}, \d{4}\b',
+    r'\bJul(?:y)? \d{1,2}, \d{4}\b',
+    r'\bAug(?:ust)? \d{1,2}, \d{4}\b',
+    r'\bSep(?:tember)? \d{1,2}, \d{4}\b',
+    r'\bOct(?:ober)? \d{1,2}, \d{4}\b',
+    r'\bNov(?:ember)? \d{1,2}, \d{4}\b',
+    r'\bDec(?:ember)? \d{1,2}, \d{4}\b',
+    r'\b\d{1,2}/\d{1,2}/\d{2,4}\b',
+    r'\b\d{2,4}-\d{1,2}-\d{1,2}\b'
+]
+
+# All the formats compiled into one alternation so a text is scanned once
+DATE_PATTERN = re.compile('|'.join(f'(?:{pattern})' for pattern in DATE_PATTERNS))
+
 def preprocess_text(text):
     """
     Preprocess the given text to make it suitable for text analysis.
@@ -29,21 +108,7 @@ def preprocess_text(text):
     - List[str]: A list of preprocessed and cleaned tokens.
     """
         
-    # Tokenize
-    tokens = word_tokenize(text)
-    
-    # Convert to lowercase
-    tokens = [word.lower() for word in tokens]
-    
-    # Remove stopwords
-    stop_words = set(stopwords.words('english'))
-    tokens = [word for word in tokens if word not in stop_words]
-    
-    # Lemmatize
-    lemmatizer = WordNetLemmatizer()
-    tokens = [lemmatizer.lemmatize(word) for word in tokens]
-    
-    return tokens
+    return normalizer.preprocess(text)
 
 def generate_ngrams(text, n):
     """
@@ -89,18 +154,13 @@ def extract_keywords(text, max_keywords=5):
     Returns:
     - List[str]: 3-grams generated from the lemmatized keyword phrases.
     """
-    r = Rake()
+    r = Rake(stopwords=normalizer.stop_words)
     r.extract_keywords_from_text(text)
     
     ranked_phrases = r.get_ranked_phrases()[:max_keywords]
     
     # Lemmatizing the results
-    lemmatizer = WordNetLemmatizer()
-    lemmatized_phrases = []
-    for phrase in ranked_phrases:
-        words = phrase.split()
-        lemmatized_words = [lemmatizer.lemmatize(word) for word in words]
-        lemmatized_phrases.append(' '.join(lemmatized_words))
+    lemmatized_phrases = [normalizer.lemmatize_phrase(phrase) for phrase in ranked_phrases]
         
     all_ngrams = []
     for phrase in lemmatized_phrases:
@@ -124,21 +184,7 @@ def clean_text(text):
     - str: The cleaned and preprocessed version of the input text.
     """
         
-    # Initialize the lemmatizer
-    lemmatizer = WordNetLemmatizer()
-
-    # Remove punctuation
-    text_no_punctuation = ''.join([char for char in text if char not in string.punctuation])
-    # Convert to lowercase
-    text_lowercase = text_no_punctuation.lower()
-
-    # Remove stop words
-    words = text_lowercase.split()
-    words_without_stopwords = [word for word in words if word not in set(stopwords.words('english'))]
-    lemmatized_words = [lemmatizer.lemmatize(word) for word in words_without_stopwords]
-    clean_text = ' '.join(lemmatized_words)
-    
-    return clean_text.replace("\xa0", "")
+    return normalizer.clean(text).replace("\xa0", "")
 
 
 def clean_dates(text):
@@ -156,35 +202,10 @@ def clean_dates(text):
     
     Note:
     The function uses regular expressions for date pattern recognition and may not capture 
-    all possible date variations. 
+    all possible date variations. All of `DATE_PATTERNS` are matched in a single pass.
     """
         
-    # Regular expression to detect various date formats
-    date_patterns = [
-        r'\bJan(?:uary)? \d{1,2}, \d{4}\b',
-        r'\bFeb(?:ruary)? \d{1,2}, \d{4}\b',
-        r'\bMar(?:ch)? \d{1,2}, \d{4}\b',
-        r'\bApr(?:il)? \d{1,2}, \d{4}\b',
-        r'\bMay \d{1,2}, \d{4}\b',
-        r'\bJun(?:e)? \d{1,2}, \d{4}\b',
-        r'\bJul(?:y)? \d{1,2}, \d{4}\b',
-        r'\bAug(?:ust)? \d{1,2}, \d{4}\b',
-        r'\bSep(?:tember)? \d{1,2}, \d{4}\b',
-        r'\bOct(?:ober)? \d{1,2}, \d{4}\b',
-        r'\bNov(?:ember)? \d{1,2}, \d{4}\b',
-        r'\bDec(?:ember)? \d{1,2}, \d{4}\b',
-        r'\b\d{1,2}/\d{1,2}/\d{2,4}\b',
-        r'\b\d{2,4}-\d{1,2}-\d{1,2}\b'
-    ]
-
-    # Find all date tokens
-    date_tokens = [match.group(0) for pattern in date_patterns for match in re.finditer(pattern, text)]
-    
-    # Remove date tokens from the text
-    for date_token in date_tokens:
-        text = text.replace(date_token, '', 1)  # Only remove one occurrence at a time
-    
-    return text.strip()
+    return DATE_PATTERN.sub('', text).strip()
 
 def clean_texts(texts):
     """
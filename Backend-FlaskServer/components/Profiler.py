@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import uuid
+import functools
+import threading
+from collections import Counter
+
+from flask import make_response, request
+
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profiles")
+
+# Innermost frames of threads that are idle rather than working for a request
+IDLE_FRAMES = {
+    ("thread.py", "_worker"),          # ThreadPoolExecutor worker waiting for a task
+    ("selectors.py", "select"),        # server loop waiting for connections
+    ("socketserver.py", "serve_forever"),
+}
+
+
+class SamplingProfiler:
+    """
+    Statistical wall clock profiler sampling the Python stacks of every thread.
+
+    A background thread reads `sys._current_frames()` every `interval` seconds and counts each stack, so
+    the cost is independent of how many functions the profiled code calls and it covers the paragraph
+    worker threads as well as the request thread. Idle threads (see `IDLE_FRAMES`) are skipped; busy
+    threads of concurrent requests are sampled too.
+
+    The result is written in the collapsed stack format ("thread;outer;...;inner count" per line) read
+    by flamegraph.pl, speedscope and inferno.
+
+    Parameters:
+    - interval (float, optional): Seconds between samples. Default is 0.005.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+                if not stack or stack[0] in IDLE_FRAMES:
+                    continue
+
+                # Pool threads are numbered per pool, so only keep the name of the pool
+                thread_name = names.get(thread_id, "thread").rsplit("_", 1)[0]
+                self.samples[(thread_name,) + tuple(f"{function} ({file_name})" for file_name, function in reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self):
+        """
+        Returns:
+        - str: The samples in the collapsed stack format.
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+    def save(self, directory, name):
+        """
+        Write the collapsed stacks to `<directory>/<name>-<timestamp>-<id>.collapsed`.
+
+        Returns:
+        - str: The path of the written file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.collapsed")
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        return path
+
+
+def profiling_requested():
+    """
+    Check whether the current Flask request asked to be profiled.
+
+    Environment Variables:
+    - PROFILER_ENABLED: Profiling is only possible when this is set to 1/true/yes.
+    - PROFILER_TOKEN: If set, the request must present this value.
+
+    A request asks for a profile with the `X-Profile` header, or the `profile` query parameter, set to
+    the token (or to 1/true/yes when no token is configured).
+
+    Returns:
+    - bool: True if the request should be profiled.
+    """
+    if os.environ.get("PROFILER_ENABLED", "").lower() not in ("1", "true", "yes"):
+        return False
+
+    value = request.headers.get("X-Profile") or request.args.get("profile")
+    if not value:
+        return False
+
+    token = os.environ.get("PROFILER_TOKEN")
+    if token:
+        return value == token
+    return value.lower() in ("1", "true", "yes")
+
+
+def profiled(view):
+    """
+    Decorator for Flask views: runs a `SamplingProfiler` around the view when `profiling_requested`, saves
+    the profile in `PROFILE_DIR` (defaults to `Backend-FlaskServer/profiles`) and names the file in the
+    `X-Profile-File` response header. `PROFILER_INTERVAL` sets the sampling interval in seconds
+    (default 0.005). Streamed responses are only profiled up to the start of the stream.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiling_requested():
+            return view(*args, **kwargs)
+
+        profiler = SamplingProfiler(float(os.environ.get("PROFILER_INTERVAL", 0.005))).start()
+        try:
+            response = make_response(view(*args, **kwargs))
+        finally:
+            profiler.stop()
+            path = profiler.save(os.environ.get("PROFILE_DIR", DEFAULT_PROFILE_DIR), view.__name__)
+
+        response.headers["X-Profile-File"] = os.path.basename(path)
+        return response
+
+    return wrapper
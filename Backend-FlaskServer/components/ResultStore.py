@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+from components.DiskCache import DiskCache
+
+
+_result_store = None
+_result_store_lock = threading.Lock()
+
+
+class ResultStore:
+    """
+    Bounded in-memory store of finished plagiarism checks, keyed by check id.
+
+    Each check keeps the submitted text and its per-sentence similarities. The sentence records are
+    serialized to JSON once when the check is stored, so reading them (in full or a page at a time)
+    only joins the stored strings instead of rebuilding and re-serializing the whole result list.
+
+    Checks are evicted least recently used first once there are more than `max_entries` of them or their
+    serialized size exceeds `max_bytes`, and expire `ttl` seconds after they were stored.
+
+    Parameters:
+    - max_entries (int, optional): Maximum number of stored checks. Default is 100.
+    - ttl (float, optional): Seconds a check stays readable. None keeps checks until they are evicted.
+    - max_bytes (int, optional): Cap on the total serialized size of the stored checks. Default is 64 MiB.
+    """
+
+    def __init__(self, max_entries=100, ttl=3600, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, text, sentence_similarities, check_id=None):
+        """
+        Store a finished check.
+
+        Parameters:
+        - text (str): The text that was checked.
+        - sentence_similarities (list of dict): The per-sentence similarities of the check.
+        - check_id (str, optional): Id to store the check under. A new one is generated by default.
+
+        Returns:
+        - str: The check id.
+        """
+        check_id = check_id or uuid.uuid4().hex
+        records = [json.dumps(record, default=float) for record in sentence_similarities]
+        entry = {
+            'text': text,
+            'records': records,
+            'created': time.time(),
+            'size': len(text) + sum(len(record) for record in records)
+        }
+
+        with self._lock:
+            if check_id in self._entries:
+                self.size -= self._entries.pop(check_id)['size']
+            self._entries[check_id] = entry
+            self.size += entry['size']
+
+            # Always keep the newest check, even if it alone is over the byte cap
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted['size']
+
+        return check_id
+
+    def _get(self, check_id):
+        entry = self._entries.get(check_id)
+        if entry is None:
+            return None, None
+
+        if self.ttl is not None and time.time() - entry['created'] > self.ttl:
+            self.size -= self._entries.pop(check_id)['size']
+            return None, None
+
+        self._entries.move_to_end(check_id)
+        return check_id, entry
+
+    def get_text(self, check_id):
+        """
+        Parameters:
+        - check_id (str): The check to read.
+
+        Returns:
+        - tuple: (check id, checked text), or (None, None) if the check is unknown or expired.
+        """
+        with self._lock:
+            check_id, entry = self._get(check_id)
+            return check_id, entry['text'] if entry else None
+
+    def sentence_page(self, check_id, offset=0, limit=None):
+        """
+        Read a range of the sentence similarities of a check.
+
+        Parameters:
+        - check_id (str): The check to read.
+        - offset (int, optional): Index of the first sentence. Default is 0.
+        - limit (int, optional): Maximum number of sentences. Default returns all remaining sentences.
+
+        Returns:
+        - tuple: (check id, total number of sentences, list of JSON serialized sentence records), or
+                 (None, 0, None) if the check is unknown or expired.
+        """
+        with self._lock:
+            check_id, entry = self._get(check_id)
+            if entry is None:
+                return None, 0, None
+
+            records = entry['records']
+            end = len(records) if limit is None else offset + limit
+            return check_id, len(records), records[offset:end]
+
+    def stats(self):
+        """
+        Returns:
+        - dict: Number of stored checks and their total serialized size in bytes.
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size}
+
+
+class SharedResultStore:
+    """
+    `ResultStore` kept in a `DiskCache` (SQLite) instead of process memory, so every worker process of a
+    pre-forked server reads the checks stored by the others. Same interface as `ResultStore`; the byte cap
+    does not apply.
+
+    Parameters:
+    - cache (DiskCache): The cache holding the checks.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def put(self, text, sentence_similarities, check_id=None):
+        check_id = check_id or uuid.uuid4().hex
+        records = [json.dumps(record, default=float) for record in sentence_similarities]
+        self.cache.set(check_id, {'text': text, 'records': records})
+        return check_id
+
+    def _get(self, check_id):
+        entry = self.cache.get(check_id) if check_id else None
+        return (check_id, entry) if entry is not None else (None, None)
+
+    def get_text(self, check_id):
+        check_id, entry = self._get(check_id)
+        return check_id, entry['text'] if entry else None
+
+    def sentence_page(self, check_id, offset=0, limit=None):
+        check_id, entry = self._get(check_id)
+        if entry is None:
+            return None, 0, None
+
+        records = entry['records']
+        end = len(records) if limit is None else offset + limit
+        return check_id, len(records), records[offset:end]
+
+    def stats(self):
+        return {"entries": self.cache.stats()["entries"]}
+
+
+def get_result_store():
+    """
+    Return the process wide result store, creating it on first use.
+
+    Environment Variables:
+    - RESULT_STORE_MAX_ENTRIES: Maximum number of stored checks. Defaults to 100.
+    - RESULT_STORE_TTL: Seconds a check stays readable. Defaults to 3600.
+    - RESULT_STORE_MAX_BYTES: Cap on the serialized size of the stored checks. Defaults to 64 MiB.
+    - RESULT_STORE_PATH: If set, checks are kept in this SQLite file (see `SharedResultStore`), shared by
+                         all the worker processes of the server. Set by `serve.py` with several workers.
+
+    Returns:
+    - ResultStore or SharedResultStore: The result store.
+    """
+    global _result_store
+
+    with _result_store_lock:
+        if _result_store is None and os.environ.get("RESULT_STORE_PATH"):
+            _result_store = SharedResultStore(DiskCache(os.environ["RESULT_STORE_PATH"],
+                                                        ttl=float(os.environ.get("RESULT_STORE_TTL", 3600)),
+                                                        max_entries=int(os.environ.get("RESULT_STORE_MAX_ENTRIES", 100))))
+        elif _result_store is None:
+            _result_store = ResultStore(max_entries=int(os.environ.get("RESULT_STORE_MAX_ENTRIES", 100)),
+                                        ttl=float(os.environ.get("RESULT_STORE_TTL", 3600)),
+                                        max_bytes=int(os.environ.get("RESULT_STORE_MAX_BYTES", 64 * 1024 * 1024)))
+        return _result_store
@@ -1,7 +1,226 @@
 import os
-import json
-import urllib.request
-import urllib.parse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from components.DiskCache import DiskCache, default_cache_path
+from components.Metrics import register_collector, stage
+from components.SingleFlight import SingleFlight
+
+DEFAULT_SEARCH_ENDPOINT = "https://www.googleapis.com/customsearch/v1"
+
+_search_cache = None
+_search_client = None
+_search_flight = SingleFlight()
+_init_lock = threading.Lock()
+
+
+def search_cache_key(tokens):
+    """
+    Normalize query tokens into a cache key.
+
+    The key is the sorted set of lowercased, whitespace-normalized tokens, so the same keyword n-grams
+    produce the same key whatever their order or duplication.
+
+    Parameters:
+    - tokens (list of str): The query tokens.
+
+    Returns:
+    - str: The cache key.
+    """
+    return "\n".join(sorted({" ".join(token.lower().split()) for token in tokens}))
+
+
+def get_search_cache():
+    """
+    Return the process wide search results cache, creating it on first use.
+
+    Environment Variables:
+    - SEARCH_CACHE_PATH: SQLite file of the cache. Defaults to `cache/search_cache.sqlite3`; an empty value disables caching.
+    - SEARCH_CACHE_TTL: Seconds a cached result stays valid. Defaults to 86400 (one day).
+    - SEARCH_CACHE_MAX_ENTRIES: Number of cached queries kept, least recently used are evicted. Defaults to 50000.
+
+    Returns:
+    - DiskCache: The cache, or None if caching is disabled.
+    """
+    global _search_cache
+
+    path = os.environ.get("SEARCH_CACHE_PATH", default_cache_path("search_cache.sqlite3"))
+    if not path:
+        return None
+
+    with _init_lock:
+        if _search_cache is None:
+            _search_cache = DiskCache(path,
+                                      ttl=float(os.environ.get("SEARCH_CACHE_TTL", 86400)),
+                                      max_entries=int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 50000)))
+        return _search_cache
+
+
+def search_cache_stats():
+    """
+    Returns:
+    - dict: Hit/miss counters and size of the search results cache, or {"enabled": False} if it is disabled.
+    """
+    cache = get_search_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+def search_stats():
+    """
+    Returns:
+    - dict: Counters of the search results cache (see `search_cache_stats`) and of the in-process coalescing
+            of identical queries, in this server process.
+    """
+    return {"cache": search_cache_stats(), "single_flight": _search_flight.stats()}
+
+
+def search_metrics():
+    """
+    Prometheus collector (see `Metrics.register_collector`) for the search cache and query coalescing counters.
+    """
+    metrics = []
+    # Only report a cache this process already uses, a metrics scrape should not create one
+    cache = _search_cache
+    if cache is not None:
+        metrics += [
+            ("search_cache_hits_total", "counter", "Search queries answered from the search results cache.", cache.hits),
+            ("search_cache_misses_total", "counter", "Search queries not found in the search results cache.", cache.misses),
+        ]
+    flight = _search_flight.stats()
+    metrics += [
+        ("search_queries_executed_total", "counter", "Search queries run (after coalescing).", flight["executed"]),
+        ("search_queries_coalesced_total", "counter", "Search queries answered by an identical in-flight query.", flight["coalesced"]),
+        ("search_queries_in_flight", "gauge", "Search queries currently running.", flight["in_flight"]),
+    ]
+    return metrics
+
+
+register_collector(search_metrics)
+
+
+class SearchClient:
+    """
+    HTTP client for the Google Custom Search Engine (CSE) JSON API.
+
+    Requests go through one pooled keep-alive session, with a per-call timeout and a bounded number of
+    retries with exponential backoff on connection errors and 429/5xx responses. When several pages are
+    requested they are fetched in parallel.
+
+    Parameters (all default to environment variables):
+    - endpoint (str, optional): Search endpoint URL, `GOOGLE_CSE_ENDPOINT`. Defaults to the Google CSE API;
+                                point it at a local stub server that mimics the CSE JSON shape for testing.
+    - api_key (str, optional): `GOOGLE_API_KEY`.
+    - cse_id (str, optional): `GOOGLE_CSE_ID`.
+    - timeout (float, optional): Seconds per HTTP call, `SEARCH_TIMEOUT`. Defaults to 10.
+    - retries (int, optional): Retries per page, `SEARCH_RETRIES`. Defaults to 2.
+    - backoff (float, optional): Backoff factor in seconds between retries, `SEARCH_BACKOFF`. Defaults to 0.5.
+    - pool_size (int, optional): Kept-alive connections and parallel page fetches, `SEARCH_POOL_SIZE`. Defaults to 10.
+    """
+
+    def __init__(self, endpoint=None, api_key=None, cse_id=None, timeout=None, retries=None, backoff=None, pool_size=None):
+        self.endpoint = endpoint or os.environ.get("GOOGLE_CSE_ENDPOINT", DEFAULT_SEARCH_ENDPOINT)
+        self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")
+        self.cse_id = cse_id or os.environ.get("GOOGLE_CSE_ID")
+        self.timeout = timeout if timeout is not None else float(os.environ.get("SEARCH_TIMEOUT", 10))
+        self.pool_size = pool_size or int(os.environ.get("SEARCH_POOL_SIZE", 10))
+
+        retry = Retry(total=retries if retries is not None else int(os.environ.get("SEARCH_RETRIES", 2)),
+                      backoff_factor=backoff if backoff is not None else float(os.environ.get("SEARCH_BACKOFF", 0.5)),
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET"]),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch_page(self, query, page):
+        """
+        Fetch one page of results.
+
+        Parameters:
+        - query (str): The combined search query.
+        - page (int): Zero based page number. Google CSE returns 10 results per page.
+
+        Returns:
+        - dict: The decoded JSON response.
+        """
+        params = {
+            "q": query,
+            "key": self.api_key,
+            "cx": self.cse_id,
+            "start": 1 + (page * 10)  # Google results start index at 1
+        }
+        response = self.session.get(self.endpoint, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, tokens, pages=1):
+        """
+        Search for the tokens combined with OR and return the parsed results of every page, in page order.
+
+        Parameters:
+        - tokens (list of str): List of keywords to form the search query.
+        - pages (int, optional): Number of search result pages to fetch. Defaults to 1.
+
+        Returns:
+        - list of dict: The content, link and title of each result.
+        - None: In case of an error while parsing the results.
+        """
+        # Combine query tokens into one query
+        combined_query = " OR ".join(tokens)
+
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=min(pages, self.pool_size)) as executor:
+                results_pages = list(executor.map(lambda page: self.fetch_page(combined_query, page), range(pages)))
+        else:
+            results_pages = [self.fetch_page(combined_query, page) for page in range(pages)]
+
+        # Store all the content
+        contents = []
+
+        # Extract the content from the results
+        try:
+            for results in results_pages:
+                items = results.get('items', [])
+                for ele in items:
+                    content = ele.get('snippet', '')
+                    link = ele.get('link', '')
+                    title = ele.get('title', '')
+                    contents.append({
+                        'content': content,
+                        'link': link,
+                        'title': title
+                    })
+        except:
+            return None
+
+        return contents
+
+
+def get_search_client():
+    """
+    Return the process wide `SearchClient`, creating it on first use (and again after a fork, since
+    pooled connections cannot be shared between processes).
+
+    Returns:
+    - SearchClient: The shared client.
+    """
+    global _search_client
+
+    with _init_lock:
+        if _search_client is None or _search_client[0] != os.getpid():
+            _search_client = (os.getpid(), SearchClient())
+        return _search_client[1]
+
 
 def search_google_content(tokens, pages=1):
     """
@@ -29,53 +248,13 @@ def search_google_content(tokens, pages=1):
     Environment Variables:
     - GOOGLE_API_KEY: The API key for accessing Google CSE.
     - GOOGLE_CSE_ID: The Custom Search Engine ID.
+    - See `SearchClient` for the endpoint, timeout, retry and connection pool settings.
 
     Notes:
     - Google CSE API provides up to 10 results per page, so the start index for each page is calculated accordingly.
+    - Requests go through the shared pooled client from `get_search_client`; pages are fetched in parallel.
     """
-    GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-    GOOGLE_CSE_ID = os.environ.get("GOOGLE_CSE_ID")
-
-    # Combine query tokens into one query
-    combined_query = " OR ".join(tokens)
-
-    # Encode the text to UTF-8
-    try:
-        combined_query = combined_query.encode('utf-8')
-    except:
-        pass
-
-    # URL encode the query
-    query = urllib.parse.quote_plus(combined_query)
-
-    # Store all the content
-    contents = []
-
-    # Fetch results page by page
-    for page in range(pages):
-        start_index = 1 + (page * 10)  # Google results start index at 1
-        base_url = f"https://www.googleapis.com/customsearch/v1?q={query}&key={GOOGLE_API_KEY}&cx={GOOGLE_CSE_ID}&start={start_index}"
-        request = urllib.request.Request(base_url, headers={'User-Agent': 'Mozilla/5.0'})
-        response = urllib.request.urlopen(request)
-        results = json.load(response)
-
-        # Extract the content from the results
-        try:
-            items = results.get('items', [])
-            for ele in items:
-                content = ele.get('snippet', '')
-                link = ele.get('link', '')
-                title = ele.get('title', '')
-                contents.append({
-                    'content': content,
-                    'link': link,
-                    'title': title
-                })
-        except:
-            return None
-
-    return contents
-
+    return get_search_client().search(tokens, pages)
 
 
 def query_clean_results(text):
@@ -101,8 +280,32 @@ def query_clean_results(text):
 
     Notes:
     - The function leverages the `search_google_content` function to perform the actual query.
+    - Results are cached on disk keyed by `search_cache_key`, see `get_search_cache`.
+    - Identical queries issued concurrently (overlapping paragraphs, simultaneous submissions) are coalesced:
+      only one of them looks up the cache and queries CSE, the others wait for and share its result.
     """
-    raw_contents = search_google_content(text)
+    return _search_flight.do(search_cache_key(text), fetch_clean_results, text)
+
+
+def fetch_clean_results(text):
+    """
+    Look the query up in the search results cache, querying Google CSE on a miss. See `query_clean_results`.
+    """
+    cache = get_search_cache()
+    cache_key = search_cache_key(text)
+
+    if cache is not None:
+        with stage("search_cache"):
+            cached_contents = cache.get(cache_key)
+        if cached_contents is not None:
+            return cached_contents
+
+    with stage("cse_request"):
+        raw_contents = search_google_content(text)
+
+    # None means the results could not be parsed, which is not worth remembering
+    if cache is not None and raw_contents is not None:
+        cache.set(cache_key, raw_contents)
 
     if not raw_contents:
         return []
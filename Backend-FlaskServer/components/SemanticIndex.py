@@ -0,0 +1,249 @@
+import os
+import json
+import fcntl
+import pickle
+import argparse
+import threading
+from collections import defaultdict
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from components.ANNIndex import IVFIndex
+from components.PreProcess_Text import clean_texts, segment_text_by_sentences
+from components.Similarity import tfidf_weighted_embeddings, vocabulary_embeddings
+
+
+DEFAULT_SEMANTIC_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "semantic_index")
+
+_semantic_index = None
+
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class SemanticIndex:
+    """
+    Approximate nearest-neighbour index over the sentences of the local corpus, for finding paraphrased
+    candidates that keyword search misses.
+
+    Every sentence of every corpus passage is embedded the way `tokens_to_vector_with_tfidf` does it (word
+    vectors weighted by TF-IDF, here with an IDF fitted on the corpus) and inserted in an `IVFIndex` under
+    its passage id. A query embeds the sentences of a paragraph and returns the passages holding their
+    nearest neighbours.
+
+    Each process (e.g. each pre-forked server worker) holds its own copy of the index. Before searching,
+    the index catches up with passages that other processes added to the shared corpus (see
+    `sync_semantic_index`), so all workers return the same results.
+
+    Parameters:
+    - path (str): Directory the index is saved in.
+    - model: Word embedding model providing vector representations.
+    - vectorizer (TfidfVectorizer): TF-IDF model fitted on the corpus.
+    - ann (IVFIndex): The nearest-neighbour index.
+    - last_passage_id (int, optional): Highest corpus passage id already indexed.
+    """
+
+    def __init__(self, path, model, vectorizer, ann, last_passage_id=0):
+        self.path = path
+        self.model = model
+        self.vectorizer = vectorizer
+        self.ann = ann
+        self.last_passage_id = last_passage_id
+        self.embeddings = vocabulary_embeddings(vectorizer, model)
+        self.unsaved = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, corpus, model, path=None, n_lists=256, nprobe=8, max_features=50000):
+        """
+        Fit the corpus TF-IDF model and index every passage of the corpus.
+
+        Parameters:
+        - corpus (CorpusIndex): The corpus to index.
+        - model: Word embedding model providing vector representations.
+        - path (str, optional): Directory to save the index in. Defaults to `SEMANTIC_INDEX_PATH`
+                                or `data/semantic_index`.
+        - n_lists, nprobe (int, optional): See `IVFIndex`.
+        - max_features (int, optional): Vocabulary size of the TF-IDF model, which bounds the memory used
+                                        by the precomputed vocabulary embeddings. Default is 50000.
+
+        Returns:
+        - SemanticIndex: The saved index.
+        """
+        path = path or os.environ.get("SEMANTIC_INDEX_PATH", DEFAULT_SEMANTIC_INDEX_PATH)
+
+        vectorizer = TfidfVectorizer(max_features=max_features)
+        vectorizer.fit(clean_texts([content for _, content in corpus.iter_passages()]))
+
+        index = cls(path, model, vectorizer, IVFIndex(model.vector_size, n_lists, nprobe))
+        index.sync(corpus)
+        index.save()
+        return index
+
+    def embed_sentences(self, text):
+        """
+        Embed each sentence of a text.
+
+        Parameters:
+        - text (str): The raw text.
+
+        Returns:
+        - ndarray: One TF-IDF weighted embedding per sentence that has at least one known word.
+        """
+        clean_sentences = [sentence for sentence in clean_texts(segment_text_by_sentences(text)) if sentence]
+        if not clean_sentences:
+            return np.empty((0, self.model.vector_size), dtype=np.float32)
+
+        vectors = tfidf_weighted_embeddings(self.vectorizer.transform(clean_sentences), self.vectorizer, self.embeddings)
+        return vectors[np.any(vectors != 0, axis=1)]
+
+    def sync(self, corpus):
+        """
+        Incrementally index the corpus passages added since the last sync.
+
+        Parameters:
+        - corpus (CorpusIndex): The corpus the index was built from.
+
+        Returns:
+        - int: Number of passages indexed.
+        """
+        with self._lock:
+            indexed = 0
+            for passage_id, content in corpus.iter_passages(self.last_passage_id):
+                vectors = self.embed_sentences(content)
+                self.ann.add([passage_id] * len(vectors), vectors)
+                self.last_passage_id = passage_id
+                indexed += 1
+
+            self.unsaved += indexed
+            return indexed
+
+    def search(self, text, top_k=10, nprobe=None):
+        """
+        Find the corpus passages semantically closest to a text.
+
+        Parameters:
+        - text (str): The raw query text, e.g. a paragraph being checked.
+        - top_k (int, optional): Number of passages to return. Default is 10.
+        - nprobe (int, optional): Lists scanned per sentence, the recall versus latency knob of `IVFIndex`.
+
+        Returns:
+        - list of tuple: (passage id, best cosine similarity of any of its sentences with a sentence of
+                         the text), most similar first.
+        """
+        scores = defaultdict(float)
+        for vector in self.embed_sentences(text):
+            for passage_id, score in self.ann.search(vector, top_k, nprobe):
+                scores[passage_id] = max(scores[passage_id], score)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def save(self):
+        """
+        Save the index in its directory.
+
+        Several processes may save the same directory, so saves are serialized by a lock file. Each file is
+        written under a temporary name and renamed into place, so `load` never reads a half-written file.
+        `meta.json` is replaced last, and never claims passages that the saved index does not hold.
+        """
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, ".lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._replace("ann.npz", self.ann.save)
+                self._replace("vectorizer.pkl", lambda path: _write_bytes(path, pickle.dumps(self.vectorizer)))
+                self._replace("meta.json", lambda path: _write_bytes(path, json.dumps({"last_passage_id": self.last_passage_id}).encode()))
+            self.unsaved = 0
+
+    def _replace(self, file_name, write):
+        # write(path) writes the file at the given path
+        path = os.path.join(self.path, file_name)
+        temp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, model):
+        """
+        Load an index saved by `save`.
+
+        Parameters:
+        - path (str): The index directory.
+        - model: The word embedding model the index was built with.
+        """
+        with open(os.path.join(path, "vectorizer.pkl"), "rb") as f:
+            vectorizer = pickle.load(f)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        return cls(path, model, vectorizer, IVFIndex.load(os.path.join(path, "ann.npz")), meta["last_passage_id"])
+
+
+def load_semantic_index(model, path=None):
+    """
+    Load the process wide semantic index if it has been built.
+
+    Environment Variables:
+    - SEMANTIC_INDEX_PATH: Directory of the index. Defaults to `data/semantic_index`.
+
+    Parameters:
+    - model: The word embedding model the index was built with.
+    - path (str, optional): Overrides SEMANTIC_INDEX_PATH.
+
+    Returns:
+    - SemanticIndex: The index, or None if it has not been built.
+    """
+    global _semantic_index
+
+    path = path or os.environ.get("SEMANTIC_INDEX_PATH", DEFAULT_SEMANTIC_INDEX_PATH)
+    if os.path.exists(os.path.join(path, "meta.json")):
+        _semantic_index = SemanticIndex.load(path, model)
+    return _semantic_index
+
+
+def get_semantic_index():
+    """
+    Returns:
+    - SemanticIndex: The index loaded by `load_semantic_index`, or None.
+    """
+    return _semantic_index
+
+
+def sync_semantic_index(corpus):
+    """
+    Index the passages newly added to the corpus, if a semantic index is loaded, and save the index once
+    `SEMANTIC_INDEX_SAVE_EVERY` (default 1000) passages have been indexed since the last save.
+
+    Called after every ingestion, and before every search so that a worker process picks up the
+    passages ingested by other workers. When the index is up to date this costs one indexed query.
+
+    Parameters:
+    - corpus (CorpusIndex): The corpus the index was built from.
+    """
+    if _semantic_index is None or corpus.max_passage_id() <= _semantic_index.last_passage_id:
+        return
+
+    _semantic_index.sync(corpus)
+    if _semantic_index.unsaved >= int(os.environ.get("SEMANTIC_INDEX_SAVE_EVERY", 1000)):
+        _semantic_index.save()
+
+
+if __name__ == "__main__":
+    from components.Corpus import get_corpus
+    from components.WordVectors import load_word_vectors
+
+    parser = argparse.ArgumentParser(description="Build the semantic index over the local corpus.")
+    parser.add_argument("--lists", type=int, default=256, help="number of inverted lists")
+    parser.add_argument("--nprobe", type=int, default=8, help="default lists scanned per query")
+    args = parser.parse_args()
+
+    index = SemanticIndex.build(get_corpus(), load_word_vectors(), n_lists=args.lists, nprobe=args.nprobe)
+    print(f"Indexed {len(index.ann)} sentences up to passage {index.last_passage_id} in {index.path}")
@@ -1,9 +1,12 @@
+from .Metrics import stage
 from .PreProcess_Text import  preprocess_text
+from .WordVectors import lookup_embeddings
 from collections import Counter
 from math import sqrt
-import np
+import numpy as np
+from scipy.sparse import diags
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
 
 
@@ -60,29 +63,76 @@ def tokens_to_vector_with_tfidf(tokens, model, tfidf_vectorizer):
     vector_size = model.vector_size
     text_vector = np.zeros(vector_size)
 
-    # Transform the list of tokens to a single string
-    tokens_list = tokens.split()
-    text = ' '.join(tokens_list)
-    
     # Compute tf-idf values
-    tfidf_values = tfidf_vectorizer.transform([text]).toarray()[0]
+    tokens_list = tokens.split()
+    tfidf_values = tfidf_vectorizer.transform([' '.join(tokens_list)])
 
-    # Get the mapping of token to its index
-    feature_names = tfidf_vectorizer.get_feature_names_out()
+    # Map each token to its tf-idf column through the vocabulary dict
+    vocabulary = tfidf_vectorizer.vocabulary_
     total_tfidf = 0
 
-    feature_names_list = feature_names.tolist()
-
     for token in tokens_list:
-        if token in model and token in feature_names:
-            index = feature_names_list.index(token)
-            text_vector += model[token] * tfidf_values[index]
-            total_tfidf += tfidf_values[index]
+        index = vocabulary.get(token)
+        if index is not None and token in model:
+            text_vector += model[token] * tfidf_values[0, index]
+            total_tfidf += tfidf_values[0, index]
 
     if total_tfidf == 0:
         return np.zeros(vector_size)
     else:
         return text_vector / total_tfidf
+
+def vocabulary_embeddings(vectorizer, model):
+    """
+    Precomputes the embedding of every term of a fitted TF-IDF vocabulary.
+
+    Parameters:
+    - vectorizer (TfidfVectorizer): A fitted vectorizer.
+    - model: Word embedding model providing vector representations.
+
+    Returns:
+    - ndarray: Matrix whose row i is the embedding of the vectorizer's column i (zeros if the term is
+               not in the model).
+    """
+    return lookup_embeddings(model, vectorizer.get_feature_names_out().tolist())
+
+def tfidf_weighted_embeddings(tfidf_vectors, vectorizer, embeddings):
+    """
+    Computes TF-IDF weighted document embeddings for a batch of documents in one sparse x dense product.
+
+    Matches `tokens_to_vector_with_tfidf`, which adds a token's vector weighted by its tf-idf once per
+    occurrence, i.e. count * tfidf. As tfidf = count * idf / norm, that weight is tfidf**2 / idf up to a
+    per-document factor, which does not change cosine similarities.
+
+    Parameters:
+    - tfidf_vectors (sparse matrix): TF-IDF rows from `vectorizer`.
+    - vectorizer (TfidfVectorizer): The fitted vectorizer.
+    - embeddings (ndarray): Output of `vocabulary_embeddings` for the same vectorizer.
+
+    Returns:
+    - ndarray: One (unnormalized) embedding per document.
+    """
+    weights = tfidf_vectors.multiply(tfidf_vectors) @ diags(1.0 / vectorizer.idf_)
+    return np.asarray(weights @ embeddings)
+
+def embedding_similarity_matrix(input_vectors, target_vectors, vectorizer, model):
+    """
+    Computes the cosine similarity of the TF-IDF weighted embeddings of every input with every target.
+
+    Parameters:
+    - input_vectors, target_vectors (sparse matrix): TF-IDF rows, as returned by `fit_tfidf`.
+    - vectorizer (TfidfVectorizer): The fitted vectorizer.
+    - model: Word embedding model providing vector representations.
+
+    Returns:
+    - ndarray: Dense matrix of shape (number of inputs, number of targets). Documents without any
+               known word get a similarity of 0.
+    """
+    with stage("word2vec_scoring"):
+        embeddings = vocabulary_embeddings(vectorizer, model)
+        inputs = normalize(tfidf_weighted_embeddings(input_vectors, vectorizer, embeddings))
+        targets = normalize(tfidf_weighted_embeddings(target_vectors, vectorizer, embeddings))
+        return inputs @ targets.T
     
 def segment_by_fixed_length(text, token_length=20):
     """
@@ -254,77 +304,161 @@ def build_corpus(input_text, target_texts, notJSON=False):
         corpus.append(target_text["content"][0] if not notJSON else target_text)
     return corpus
 
-def TFID(input_text, target_texts, notJSON = False):
+def target_contents(target_texts, notJSON=False):
     """
-    Computes the TF-IDF cosine similarity between an input text and a list of target texts.
+    Extracts the text of each target.
 
     Parameters:
-    - input_text (str): The main text to compare against target texts.
-    - target_texts (list): A list of texts or JSON-like objects to compare against the input text.
+    - target_texts (list): A list of texts or JSON-like objects with a "content" key.
+    - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise as JSON-like objects.
+
+    Returns:
+    - list: The target texts as plain strings.
+    """
+    return [text["content"][0] if not notJSON else text for text in target_texts]
+
+def fit_tfidf(input_texts, target_texts, notJSON=False):
+    """
+    Fits a single TF-IDF model over a batch of input texts together with all target texts.
+
+    Parameters:
+    - input_texts (list): The input texts (e.g. all cleaned sentences of a paragraph or document).
+    - target_texts (list): A list of texts or JSON-like objects to compare against the input texts.
     - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise, as JSON-like objects.
 
     Returns:
-    - average_similarity (float): The average cosine similarity across all comparisons.
-    - max_similarity (float): The highest cosine similarity from the comparisons.
-    - individual_similarity (list): A list of dictionaries detailing similarities for each pair.
-    - sorted_similarity (list): A sorted version of individual_similarity in descending order.
+    - vectorizer (TfidfVectorizer): The fitted vectorizer.
+    - input_vectors (sparse matrix): One L2-normalized TF-IDF row per input text.
+    - target_vectors (sparse matrix): One L2-normalized TF-IDF row per target text.
+    """
+    input_texts = list(input_texts)
 
+    with stage("vectorizer_fit"):
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(input_texts + target_contents(target_texts, notJSON))
 
-    Note:
-    If target_texts contain JSON-like objects, they are expected to have "content", "link", and "title" keys.
+    return vectorizer, tfidf_matrix[:len(input_texts)], tfidf_matrix[len(input_texts):]
+
+def tfidf_similarity_matrix(input_vectors, target_vectors):
+    """
+    Computes the cosine similarity of every input row with every target row in one sparse product.
+
+    Parameters:
+    - input_vectors, target_vectors (sparse matrix): L2-normalized TF-IDF rows, as returned by `fit_tfidf`.
+
+    Returns:
+    - ndarray: Dense matrix of shape (number of inputs, number of targets).
+    """
+    # TfidfVectorizer normalizes every row, so the dot product already is the cosine similarity
+    with stage("tfidf_scoring"):
+        return (input_vectors @ target_vectors.T).toarray()
+
+def summarize_similarities(similarities, target_texts, notJSON=False, segment_index=0):
+    """
+    Builds the per-input similarity summary from one row of a similarity matrix.
+
+    Parameters:
+    - similarities (ndarray): Similarity of the input with each target text.
+    - target_texts (list): The target texts the similarities were computed against.
+    - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise, as JSON-like objects.
+    - segment_index (int, optional): Index of the input in its batch.
+
+    Returns:
+    - average_similarity (float): The average cosine similarity across all targets.
+    - max_similarity (float): The highest cosine similarity across all targets.
+    - individual_similarity (list): A list of dictionaries detailing the similarity with each target.
+    - sorted_similarity (list): A sorted version of individual_similarity in descending order.
     """
-        
     num_targets = len(target_texts)
-    total_similarity = 0.0
-    max_similarity = 0.0
     individual_similarity = []
 
-    input_segments = [input_text]
+    for j, current_similarity in enumerate(similarities):
+        individual_similarity.append({
+            'segment_index': segment_index,
+            'link_index': j,
+            'similarity': float(current_similarity),
+            'link': target_texts[j]["link"] if not notJSON else "",
+            'title': target_texts[j]["title"] if not notJSON else "",
+        })
+
+    average_similarity = float(np.sum(similarities)) / num_targets if num_targets > 0 else 0
+    max_similarity = max(0.0, float(np.max(similarities))) if num_targets > 0 else 0.0
 
-    # Prepare the corpus for TF-IDF Vectorizer
-    corpus = input_segments + [text["content"][0] if not notJSON else text for text in target_texts]
+    sorted_similarity = sorted(individual_similarity, key=lambda x: x['similarity'], reverse=True)
 
-    # Create and fit the TF-IDF model
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform(corpus)
+    return average_similarity, max_similarity, individual_similarity, sorted_similarity
 
-    # Assuming your input_segments and target_texts are of considerable length, 
-    # we need to slice the matrix to get vectors for segments and target_texts
-    segment_vectors = tfidf_matrix[:len(input_segments)]
-    target_vectors = tfidf_matrix[len(input_segments):]
+def summarize_top_similarities(similarities, target_texts, segment_index=0, top_n=10):
+    """
+    Like `summarize_similarities`, but only builds the entries of the `top_n` most similar targets, for
+    rows against a large candidate pool.
 
-    for i, segment_vector in enumerate(segment_vectors):
+    Parameters:
+    - similarities (ndarray): Similarity of the input with each target text.
+    - target_texts (list): JSON-like target objects with "link" and "title" keys.
+    - segment_index (int, optional): Index of the input in its batch.
+    - top_n (int, optional): Number of targets to report. Default is 10.
 
-        for j, target_vector in enumerate(target_vectors):
+    Returns:
+    - average_similarity (float): The average cosine similarity across all targets.
+    - max_similarity (float): The highest cosine similarity across all targets.
+    - sorted_similarity (list): The top_n most similar targets in descending order, shaped like the
+                                entries of `summarize_similarities`.
+    """
+    num_targets = len(target_texts)
+    if num_targets == 0:
+        return 0, 0.0, []
 
-            current_similarity = cosine_similarity(segment_vector, target_vector)[0][0]
-            
-            total_similarity += current_similarity
-            individual_similarity.append({
-                'segment_index': i,
-                'link_index': j,
-                'similarity': current_similarity,
-                'link': target_texts[j]["link"] if not notJSON else "",
-                'title': target_texts[j]["title"] if not notJSON else "",
-            })
+    top_n = min(top_n, num_targets)
+    top = np.argpartition(-similarities, top_n - 1)[:top_n]
+    top = top[np.argsort(-similarities[top], kind='stable')]
 
-            max_similarity = max(max_similarity, current_similarity)
+    sorted_similarity = [{
+        'segment_index': segment_index,
+        'link_index': int(j),
+        'similarity': float(similarities[j]),
+        'link': target_texts[j]["link"],
+        'title': target_texts[j]["title"],
+    } for j in top]
 
-    average_similarity = total_similarity / (num_targets * len(input_segments)) if num_targets > 0 else 0
+    return float(np.sum(similarities)) / num_targets, max(0.0, float(np.max(similarities))), sorted_similarity
 
-    sorted_similarity = sorted(individual_similarity, key=lambda x: x['similarity'], reverse=True)
+def TFID_batch(input_texts, target_texts, notJSON = False):
+    """
+    Computes the TF-IDF cosine similarity of every input text with every target text.
 
-    return average_similarity, max_similarity, individual_similarity, sorted_similarity
+    One TF-IDF model is fitted over all input texts and targets, and the full input x target similarity
+    matrix comes from a single sparse matrix product.
 
-def calculate_cosine_similarity_model(input_text, target_texts, model, notJSON = False):
+    Parameters:
+    - input_texts (list): The texts to compare against target texts, e.g. the cleaned sentences of a paragraph.
+    - target_texts (list): A list of texts or JSON-like objects to compare against the input texts.
+    - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise, as JSON-like objects.
+
+    Returns:
+    - list: One (average_similarity, max_similarity, individual_similarity, sorted_similarity) tuple per
+            input text, as returned by `TFID`.
+
+    Note:
+    If target_texts contain JSON-like objects, they are expected to have "content", "link", and "title" keys.
     """
-    Computes the cosine similarity between an input text and target texts using a given model and TF-IDF weighting.
+    input_texts = list(input_texts)
+    if not input_texts:
+        return []
+
+    _, input_vectors, target_vectors = fit_tfidf(input_texts, target_texts, notJSON)
+    similarities = tfidf_similarity_matrix(input_vectors, target_vectors)
+
+    return [summarize_similarities(row, target_texts, notJSON, i) for i, row in enumerate(similarities)]
+
+def TFID(input_text, target_texts, notJSON = False):
+    """
+    Computes the TF-IDF cosine similarity between an input text and a list of target texts.
 
     Parameters:
     - input_text (str): The main text to compare against target texts.
     - target_texts (list): A list of texts or JSON-like objects to compare against the input text.
-    - model (Model): The word embedding model used for vector representations.
-    - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise, as JSON-like objects with "content", "link", and "title" keys.
+    - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise, as JSON-like objects.
 
     Returns:
     - average_similarity (float): The average cosine similarity across all comparisons.
@@ -335,42 +469,59 @@ def calculate_cosine_similarity_model(input_text, target_texts, model, notJSON =
 
     Note:
     If target_texts contain JSON-like objects, they are expected to have "content", "link", and "title" keys.
+    To score several input texts against the same targets use `TFID_batch`.
     """
         
-    num_targets = len(target_texts)
-    total_similarity = 0.0
-    max_similarity = 0.0
-    individual_similarity = []
+    return TFID_batch([input_text], target_texts, notJSON)[0]
 
+def calculate_cosine_similarity_model_batch(input_texts, target_texts, model, notJSON = False):
+    """
+    Computes the TF-IDF weighted embedding cosine similarity of every input text with every target text.
 
-    input_segments = [input_text]
+    One TF-IDF model is fitted over the whole batch, the vocabulary embeddings are gathered once and
+    all document vectors come from sparse x dense products, so the batch is scored in a handful of
+    BLAS calls.
 
-    corpus = build_corpus(input_text, target_texts, notJSON)
+    Parameters:
+    - input_texts (list): The texts to compare against target texts, e.g. the cleaned sentences of a paragraph.
+    - target_texts (list): A list of texts or JSON-like objects to compare against the input texts.
+    - model (Model): The word embedding model used for vector representations.
+    - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise, as JSON-like objects with "content", "link", and "title" keys.
 
-    tfidf_vectorizer = TfidfVectorizer()
-    tfidf_vectorizer.fit_transform(corpus)
+    Returns:
+    - list: One (average_similarity, max_similarity, individual_similarity, sorted_similarity) tuple per
+            input text, as returned by `calculate_cosine_similarity_model`.
+    """
+    input_texts = list(input_texts)
+    if not input_texts:
+        return []
 
-    for i, segment in enumerate(input_segments):
-        vector1 = tokens_to_vector_with_tfidf(segment, model, tfidf_vectorizer)
+    vectorizer, input_vectors, target_vectors = fit_tfidf(input_texts, target_texts, notJSON)
+    similarities = embedding_similarity_matrix(input_vectors, target_vectors, vectorizer, model)
 
-        for j, target_text in enumerate(target_texts):
-            vector2 = tokens_to_vector_with_tfidf(target_text["content"][0] if not notJSON else target_text, model, tfidf_vectorizer)   
+    return [summarize_similarities(row, target_texts, notJSON, i) for i, row in enumerate(similarities)]
 
-            current_similarity = cosine_similarity_continuous(vector1, vector2)
-            total_similarity += current_similarity
-            individual_similarity.append({
-                        'segment_index': i,
-                        'link_index': j,
-                        'similarity': current_similarity,
-                        'link': target_texts[j]["link"] if not notJSON else "",
-                        'title': target_texts[j]["title"] if not notJSON else "",
-                    })
-            
-            max_similarity = max(max_similarity, current_similarity)
+def calculate_cosine_similarity_model(input_text, target_texts, model, notJSON = False):
+    """
+    Computes the cosine similarity between an input text and target texts using a given model and TF-IDF weighting.
 
-    average_similarity = total_similarity / (num_targets * len(input_segments)) if num_targets > 0 else 0
+    Parameters:
+    - input_text (str): The main text to compare against target texts.
+    - target_texts (list): A list of texts or JSON-like objects to compare against the input text.
+    - model (Model): The word embedding model used for vector representations.
+    - notJSON (bool, optional): If True, treats target_texts as plain texts; otherwise, as JSON-like objects with "content", "link", and "title" keys.
 
-    sorted_similarity = sorted(individual_similarity, key=lambda x: x['similarity'], reverse=True)
+    Returns:
+    - average_similarity (float): The average cosine similarity across all comparisons.
+    - max_similarity (float): The highest cosine similarity from the comparisons.
+    - individual_similarity (list): A list of dictionaries detailing similarities for each pair.
+    - sorted_similarity (list): A sorted version of individual_similarity in descending order.
 
-    return average_similarity, max_similarity, individual_similarity, sorted_similarity
+
+    Note:
+    If target_texts contain JSON-like objects, they are expected to have "content", "link", and "title" keys.
+    To score several input texts against the same targets use `calculate_cosine_similarity_model_batch`.
+    """
+        
+    return calculate_cosine_similarity_model_batch([input_text], target_texts, model, notJSON)[0]
 
@@ -0,0 +1,237 @@
+import os
+import gzip
+import glob
+import logging
+import argparse
+
+from bs4 import BeautifulSoup
+
+from components.DownloadContent import extract_paragraph_text
+
+
+MAX_HEADER_LINE = 64 * 1024
+SKIP_CHUNK = 1024 * 1024
+
+
+def open_warc(path):
+    """
+    Open a WARC file for streaming, decompressing `.gz` files on the fly.
+
+    Common Crawl archives are made of one gzip member per record. The gzip reader decompresses them one
+    buffer at a time, across member boundaries, so the archive is never decompressed as a whole.
+
+    Parameters:
+    - path (str): A `.warc.gz` or `.warc` file.
+
+    Returns:
+    - file object: Binary stream of the uncompressed WARC records.
+    """
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _skip(stream, length):
+    while length > 0:
+        chunk = stream.read(min(length, SKIP_CHUNK))
+        if not chunk:
+            return
+        length -= len(chunk)
+
+
+def iter_warc_records(stream, max_content_bytes=5 * 1024 * 1024):
+    """
+    Read the records of an uncompressed WARC stream one at a time.
+
+    Only one record block is held in memory at a time. Blocks larger than `max_content_bytes` are
+    skipped without being read into memory, and their record is yielded with `content` set to None.
+
+    Parameters:
+    - stream (file object): Binary stream positioned at the start of a record, e.g. from `open_warc`.
+    - max_content_bytes (int, optional): Largest block read into memory. Default is 5 MiB.
+
+    Yields:
+    - dict: {'type': <WARC-Type>, 'target_uri': <WARC-Target-URI>, 'headers': <lowercased WARC headers>,
+             'content': <block bytes, None if skipped>}
+
+    Raises:
+    - ValueError: If the stream is not a WARC file.
+    """
+    while True:
+        line = stream.readline(MAX_HEADER_LINE)
+        if not line:
+            return
+        if not line.strip():  # Blank lines between records
+            continue
+        if not line.startswith(b"WARC/"):
+            raise ValueError(f"Not a WARC record: {line[:50]!r}")
+
+        headers = {}
+        while True:
+            line = stream.readline(MAX_HEADER_LINE)
+            if not line.strip():
+                break
+            name, _, value = line.decode("utf-8", "replace").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > max_content_bytes:
+            _skip(stream, length)
+            content = None
+        else:
+            content = stream.read(length)
+
+        yield {
+            'type': headers.get("warc-type"),
+            'target_uri': headers.get("warc-target-uri"),
+            'headers': headers,
+            'content': content
+        }
+
+
+def parse_http_response(content):
+    """
+    Split the block of a WARC response record into the HTTP status, headers and body.
+
+    Parameters:
+    - content (bytes): The record block.
+
+    Returns:
+    - tuple: (status code, dict of lowercased headers, body bytes), or None if the block is not an HTTP response.
+    """
+    head, separator, body = content.partition(b"\r\n\r\n")
+    if not separator:
+        head, separator, body = content.partition(b"\n\n")
+
+    lines = head.decode("iso-8859-1").splitlines()
+    if not lines or not lines[0].startswith("HTTP/"):
+        return None
+
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        return None
+
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    return status, headers, body
+
+
+def extract_record_text(record):
+    """
+    Extract the title and paragraph text of an HTML page captured in a WARC response record, the same
+    way `get_text_from_link` extracts them from a live page.
+
+    Parameters:
+    - record (dict): A record from `iter_warc_records`.
+
+    Returns:
+    - tuple: (title, text), or None if the record is not a successful HTML response.
+    """
+    if record['type'] != "response" or not record['content']:
+        return None
+
+    response = parse_http_response(record['content'])
+    if response is None:
+        return None
+
+    status, headers, body = response
+    content_type = headers.get("content-type", "")
+    if status != 200 or "html" not in content_type.lower():
+        return None
+
+    # Use the declared charset if any, otherwise let BeautifulSoup detect it
+    charset = None
+    if "charset=" in content_type.lower():
+        charset = content_type.lower().split("charset=", 1)[1].split(";")[0].strip().strip('"\'') or None
+
+    soup = BeautifulSoup(body, 'html.parser', from_encoding=charset)
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    return title, extract_paragraph_text(soup)
+
+
+def ingest_warc(path, corpus, source="commoncrawl", max_content_bytes=None):
+    """
+    Stream a WARC file into the local corpus.
+
+    Each HTML page of the archive is reduced to its paragraph text (see `extract_record_text`) and added
+    with `CorpusIndex.add_document`. That call normalizes the text with `clean_texts` and skips pages
+    already in the corpus, which are counted as 'duplicates'. Records are processed one at a time, so memory use does not depend on the
+    size of the archive.
+
+    Parameters:
+    - path (str): A `.warc.gz` or `.warc` file.
+    - corpus (CorpusIndex): The corpus to add the pages to.
+    - source (str, optional): Kind of document recorded in the corpus. Default is "commoncrawl".
+    - max_content_bytes (int, optional): Largest record read, `WARC_MAX_RECORD_BYTES`. Defaults to 5 MiB.
+
+    Returns:
+    - dict: Number of 'records' read, pages added as 'documents', pages already in the corpus as
+            'duplicates', and 'skipped' records (not HTML, no paragraph text, or too large).
+    """
+    max_content_bytes = max_content_bytes or int(os.environ.get("WARC_MAX_RECORD_BYTES", 5 * 1024 * 1024))
+    stats = {'records': 0, 'documents': 0, 'duplicates': 0, 'skipped': 0}
+
+    with open_warc(path) as stream:
+        for record in iter_warc_records(stream, max_content_bytes):
+            stats['records'] += 1
+            extracted = extract_record_text(record)
+            if not extracted or not extracted[1].strip():
+                stats['skipped'] += 1
+                continue
+
+            title, text = extracted
+            _, created = corpus.add_document(text, title=title, link=record['target_uri'] or "", source=source)
+            stats['documents' if created else 'duplicates'] += 1
+
+    return stats
+
+
+def ingest_warc_files(paths, corpus, source="commoncrawl"):
+    """
+    Stream several WARC files into the local corpus. Files that fail to read are logged and skipped.
+
+    Parameters:
+    - paths (list of str): WARC files, or directories whose `.warc.gz` and `.warc` files are read.
+    - corpus (CorpusIndex): The corpus to add the pages to.
+    - source (str, optional): Kind of document recorded in the corpus. Default is "commoncrawl".
+
+    Returns:
+    - dict: Totals of the `ingest_warc` counts, plus the number of 'files' read and 'errors'.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.warc.gz")) + glob.glob(os.path.join(path, "*.warc"))))
+        else:
+            files.append(path)
+
+    totals = {'files': 0, 'records': 0, 'documents': 0, 'duplicates': 0, 'skipped': 0, 'errors': 0}
+    for path in files:
+        try:
+            stats = ingest_warc(path, corpus, source)
+        except (OSError, EOFError, ValueError) as e:
+            logging.error(f"Failed to read {path}. Reason: {str(e)}")
+            totals['errors'] += 1
+            continue
+
+        totals['files'] += 1
+        for key, value in stats.items():
+            totals[key] += value
+
+    return totals
+
+
+if __name__ == "__main__":
+    from components.Corpus import get_corpus
+
+    parser = argparse.ArgumentParser(description="Add the pages of WARC files to the local corpus.")
+    parser.add_argument("paths", nargs="+", help="WARC files, or directories such as a /download-text download")
+    parser.add_argument("--source", default="commoncrawl", help="kind of document recorded in the corpus")
+    args = parser.parse_args()
+
+    totals = ingest_warc_files(args.paths, get_corpus(), args.source)
+    print(f"Added {totals['documents']} pages from {totals['records']} records of {totals['files']} files "
+          f"({totals['duplicates']} pages already in the corpus, {totals['skipped']} records skipped, "
+          f"{totals['errors']} files failed)")
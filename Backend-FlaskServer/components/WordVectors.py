@@ -0,0 +1,291 @@
+import os
+import glob
+import json
+import shutil
+import argparse
+import logging
+
+import numpy as np
+from gensim.models import KeyedVectors
+
+
+DEFAULT_MODEL_NAME = "word2vec-google-news-300"
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+VECTOR_FORMATS = ("float32", "float16", "int8")
+
+
+def default_word_vectors_path(name=DEFAULT_MODEL_NAME, vector_format="float32"):
+    """
+    Build the path of the native on-disk copy of a gensim-downloader model.
+
+    Parameters:
+    - name (str, optional): Name of the model in the gensim-downloader catalogue.
+    - vector_format (str, optional): "float32" for the full converted model, "float16" or "int8" for a
+                                     pruned table built by `build_pruned_vectors`.
+
+    Returns:
+    - str: Path of the `.kv` file (or pruned table directory), inside the `WORD_VECTORS_DIR` directory
+           (defaults to `Backend-FlaskServer/models`).
+    """
+    model_dir = os.environ.get("WORD_VECTORS_DIR", DEFAULT_MODEL_DIR)
+    if vector_format == "float32":
+        return os.path.join(model_dir, f"{name}.kv")
+    return os.path.join(model_dir, f"{name}.{vector_format}")
+
+
+def convert_word_vectors(name=DEFAULT_MODEL_NAME, out_path=None):
+    """
+    One-time conversion of a gensim-downloader model into gensim's native KeyedVectors format.
+
+    `api.load` parses the original archive into private process memory, which is slow and cannot be shared.
+    The native format stores the vector matrix as a separate `.npy` file next to the `.kv` file, which
+    `load_word_vectors` can then memory-map.
+
+    Parameters:
+    - name (str, optional): Name of the model in the gensim-downloader catalogue.
+    - out_path (str, optional): Destination `.kv` file. Defaults to `default_word_vectors_path(name)`.
+
+    Returns:
+    - str: Path of the written `.kv` file.
+    """
+    import gensim.downloader as api
+
+    out_path = out_path or default_word_vectors_path(name)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+
+    logging.info(f"Converting {name} to {out_path}")
+    word_vectors = api.load(name)
+
+    # Write to a temporary name first so a crashed conversion never leaves a half written model behind
+    tmp_path = out_path + ".tmp"
+    word_vectors.save(tmp_path, sep_limit=0)
+    for tmp_file in glob.glob(glob.escape(tmp_path) + "*"):
+        os.replace(tmp_file, out_path + tmp_file[len(tmp_path):])
+
+    return out_path
+
+
+class QuantizedKeyedVectors:
+    """
+    Read-only word vectors stored as float16, or int8 with one float32 scale per row.
+
+    Supports the subset of the gensim KeyedVectors interface the similarity code relies on: `vector_size`,
+    `key_to_index`, `index_to_key`, `token in model` and `model[token]`. Rows are dequantized to float32
+    on lookup, so the table itself stays memory-mapped at its compact size.
+    """
+
+    def __init__(self, vectors, scales, index_to_key):
+        self.vectors = vectors
+        self.scales = scales
+        self.index_to_key = index_to_key
+        self.key_to_index = {key: index for index, key in enumerate(index_to_key)}
+        self.vector_size = vectors.shape[1]
+
+    def __len__(self):
+        return len(self.index_to_key)
+
+    def __contains__(self, key):
+        return key in self.key_to_index
+
+    def __getitem__(self, key):
+        return self.get_rows([self.key_to_index[key]])[0]
+
+    def get_rows(self, indices):
+        """
+        Dequantize the given rows.
+
+        Parameters:
+        - indices (list of int): Row indices into the table.
+
+        Returns:
+        - ndarray: float32 matrix of shape (len(indices), vector_size).
+        """
+        rows = np.asarray(self.vectors[indices], dtype=np.float32)
+        if self.scales is not None:
+            rows *= self.scales[indices][:, None]
+        return rows
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a table written by `build_pruned_vectors`, memory-mapping the vectors and scales.
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "keys.txt"), encoding="utf-8") as f:
+            index_to_key = f.read().split("\n")[:meta["count"]]
+
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode='r')
+        scales = np.load(os.path.join(path, "scales.npy"), mmap_mode='r') if meta["dtype"] == "int8" else None
+        return cls(vectors, scales, index_to_key)
+
+
+def is_reachable_key(key, normalize):
+    """
+    Check whether a vocabulary key can ever be looked up by the similarity code.
+
+    The scorers only see text that went through `clean_text`, so a key survives only if normalizing it
+    gives back the key itself (lowercase, no punctuation, not a stopword, already lemmatized).
+    """
+    return bool(key) and normalize(key) == key
+
+
+def build_pruned_vectors(word_vectors, out_path, vector_format="float16", max_words=None, batch_size=100000):
+    """
+    Build a vocabulary-pruned, quantized copy of a word vector model.
+
+    Only keys reachable after `clean_text` normalization are kept. word2vec keys are stored most frequent
+    first, so `max_words` keeps the most frequent reachable keys. Vectors are stored as float16, or as int8
+    with a per-row scale of max(|row|) / 127.
+
+    Parameters:
+    - word_vectors (KeyedVectors): Full model to prune, typically from `load_word_vectors`.
+    - out_path (str): Destination directory.
+    - vector_format (str, optional): "float16" or "int8". Default is "float16".
+    - max_words (int, optional): Keep at most this many keys. Default keeps all reachable keys.
+    - batch_size (int, optional): Number of rows converted at a time, bounding peak memory.
+
+    Returns:
+    - str: The destination directory.
+    """
+    from components.PreProcess_Text import clean_text
+
+    if vector_format not in ("float16", "int8"):
+        raise ValueError(f"Unsupported vector format {vector_format}")
+
+    indices = []
+    for index, key in enumerate(word_vectors.index_to_key):
+        if is_reachable_key(key, clean_text):
+            indices.append(index)
+            if max_words and len(indices) >= max_words:
+                break
+
+    # Build in a temporary directory first so a crashed build never leaves a half written table behind
+    tmp_path = out_path.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    shape = (len(indices), word_vectors.vector_size)
+    vectors = np.lib.format.open_memmap(os.path.join(tmp_path, "vectors.npy"), mode='w+',
+                                        dtype=np.float16 if vector_format == "float16" else np.int8, shape=shape)
+    scales = np.zeros(len(indices), dtype=np.float32)
+
+    for start in range(0, len(indices), batch_size):
+        batch = np.asarray(word_vectors.vectors[indices[start:start + batch_size]], dtype=np.float32)
+        if vector_format == "float16":
+            vectors[start:start + len(batch)] = batch.astype(np.float16)
+        else:
+            batch_scales = np.abs(batch).max(axis=1) / 127.0
+            batch_scales[batch_scales == 0] = 1.0
+            vectors[start:start + len(batch)] = np.rint(batch / batch_scales[:, None]).astype(np.int8)
+            scales[start:start + len(batch)] = batch_scales
+    vectors.flush()
+    del vectors
+
+    if vector_format == "int8":
+        np.save(os.path.join(tmp_path, "scales.npy"), scales)
+    with open(os.path.join(tmp_path, "keys.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(word_vectors.index_to_key[index] for index in indices))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"dtype": vector_format, "count": len(indices), "vector_size": shape[1]}, f)
+
+    # A directory cannot be renamed over a non-empty one, so a table being rebuilt is removed first
+    if os.path.isdir(out_path):
+        shutil.rmtree(out_path)
+    os.replace(tmp_path, out_path)
+
+    return out_path
+
+
+def lookup_embeddings(model, keys):
+    """
+    Gather the vectors of a list of keys into one dense matrix.
+
+    Rows are fetched in a single fancy-indexing call on the (memory-mapped) vector table instead of one
+    lookup per key. Keys missing from the model get a zero row.
+
+    Parameters:
+    - model (KeyedVectors or QuantizedKeyedVectors): The word vectors.
+    - keys (list of str): Keys to look up, e.g. the vocabulary of a fitted TF-IDF vectorizer.
+
+    Returns:
+    - ndarray: float32 matrix of shape (len(keys), model.vector_size).
+    """
+    embeddings = np.zeros((len(keys), model.vector_size), dtype=np.float32)
+
+    key_to_index = model.key_to_index
+    positions = []
+    indices = []
+    for position, key in enumerate(keys):
+        index = key_to_index.get(key)
+        if index is not None:
+            positions.append(position)
+            indices.append(index)
+
+    if indices:
+        if isinstance(model, QuantizedKeyedVectors):
+            embeddings[positions] = model.get_rows(indices)
+        else:
+            embeddings[positions] = model.vectors[indices]
+
+    return embeddings
+
+
+def load_word_vectors(path=None, name=None, vector_format=None):
+    """
+    Open the word vectors with memory mapping.
+
+    The vector matrix is mapped read-only, so startup only reads the vocabulary and every worker process
+    on the node shares a single copy of the vectors through the page cache. If the converted file does
+    not exist yet it is created with `convert_word_vectors` (and `build_pruned_vectors`) first.
+
+    Parameters:
+    - path (str, optional): `.kv` file or pruned table directory to open. Defaults to the `WORD_VECTORS_PATH`
+                            environment variable, or `default_word_vectors_path(name, vector_format)`.
+    - name (str, optional): gensim-downloader model used for the conversion. Defaults to the
+                            `WORD_VECTORS_NAME` environment variable, or word2vec-google-news-300.
+    - vector_format (str, optional): "float32" (full model), "float16" or "int8" (pruned table). Defaults to
+                                     the `WORD_VECTORS_FORMAT` environment variable, or "float32".
+                                     `WORD_VECTORS_MAX_WORDS` caps the size of a pruned table built on demand.
+
+    Returns:
+    - KeyedVectors or QuantizedKeyedVectors: The memory-mapped word vectors.
+    """
+    name = name or os.environ.get("WORD_VECTORS_NAME", DEFAULT_MODEL_NAME)
+    vector_format = vector_format or os.environ.get("WORD_VECTORS_FORMAT", "float32")
+    if vector_format not in VECTOR_FORMATS:
+        raise ValueError(f"Unsupported vector format {vector_format}")
+    path = path or os.environ.get("WORD_VECTORS_PATH") or default_word_vectors_path(name, vector_format)
+
+    # A directory without meta.json is left over from a build that crashed before `os.replace`
+    if vector_format != "float32" and (not os.path.exists(path) or
+                                       (os.path.isdir(path) and not os.path.exists(os.path.join(path, "meta.json")))):
+        max_words = int(os.environ.get("WORD_VECTORS_MAX_WORDS", 0)) or None
+        build_pruned_vectors(load_word_vectors(name=name, vector_format="float32",
+                                               path=default_word_vectors_path(name)),
+                             path, vector_format, max_words)
+
+    if os.path.isdir(path):
+        return QuantizedKeyedVectors.load(path)
+
+    if not os.path.exists(path):
+        convert_word_vectors(name, path)
+
+    return KeyedVectors.load(path, mmap='r')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a gensim-downloader model into a memory-mappable file.")
+    parser.add_argument("--name", default=DEFAULT_MODEL_NAME, help="gensim-downloader model name")
+    parser.add_argument("--out", default=None, help="destination .kv file or pruned table directory")
+    parser.add_argument("--format", default="float32", choices=VECTOR_FORMATS,
+                        help="float32 keeps the full model, float16/int8 build a pruned quantized table")
+    parser.add_argument("--max-words", type=int, default=None, help="keep at most this many keys in a pruned table")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.format == "float32":
+        print(f"Word vectors saved to {convert_word_vectors(args.name, args.out)}")
+    else:
+        full_vectors = load_word_vectors(name=args.name, vector_format="float32", path=default_word_vectors_path(args.name))
+        out_path = args.out or default_word_vectors_path(args.name, args.format)
+        print(f"Pruned word vectors saved to {build_pruned_vectors(full_vectors, out_path, args.format, args.max_words)}")
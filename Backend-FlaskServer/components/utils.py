@@ -1,6 +1,22 @@
-from components.PreProcess_Text import extract_keywords, segment_text_by_sentences, clean_texts
-from components.SearchWeb import query_clean_results
-from components.Similarity import calculate_cosine_similarity_model, TFID
+import os
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import vstack
+from sklearn.preprocessing import normalize
+
+from components.CandidateStore import CandidateStore
+from components.Corpus import get_corpus
+from components.Metrics import CHECKS_TOTAL, ESCALATIONS_TOTAL, stage
+from components.PreProcess_Text import extract_keywords, segment_text_by_sentences, clean_texts, split_into_segments
+from components.ResultStore import get_result_store
+from components.SearchWeb import query_clean_results, search_cache_key
+from components.SemanticIndex import get_semantic_index, sync_semantic_index
+from components.Similarity import (embedding_similarity_matrix, fit_tfidf, summarize_similarities,
+                                   summarize_top_similarities, tfidf_similarity_matrix,
+                                   tfidf_weighted_embeddings, vocabulary_embeddings)
 
 
 def check_request_data(data, required_fields):
@@ -44,16 +60,110 @@ def extract_keywords_from_text(data):
     return {"results": results}
 
 
-def process_paragraph(paragraph, global_search_data=None, word_vectors=None):
+def candidate_sources():
+    """
+    Where candidate sources for a paragraph come from.
+
+    Environment Variables:
+    - CANDIDATE_SOURCES: Comma separated list of "web" (Google CSE), "corpus" (local `CorpusIndex` of
+                         previous submissions and ingested texts) and "semantic" (nearest corpus passages in
+                         the `SemanticIndex`, for paraphrases). Defaults to "web".
+
+    Returns:
+    - set: The enabled sources.
+    """
+    return {source.strip() for source in os.environ.get("CANDIDATE_SOURCES", "web").split(",") if source.strip()}
+
+
+def find_candidates(paragraph, keywords, web_results=None, exclude_document_ids=()):
+    """
+    Collects the candidate source texts a paragraph is compared against.
+
+    Parameters:
+    - paragraph (str): The paragraph being checked.
+    - keywords (list): Keyword n-grams extracted from the paragraph, used as the web search query.
+    - web_results (list, optional): Web results already fetched for the keywords, used instead of searching.
+    - exclude_document_ids (iterable of int, optional): Corpus documents never returned as candidates, see
+                                                        `submission_document_ids`.
+
+    Returns:
+    - list of dict: Candidates with 'content', 'link' and 'title' keys; web results first, then the
+                    `CORPUS_TOP_K` (default 10) best corpus passages, then the `SEMANTIC_TOP_K` (default 10)
+                    semantically nearest corpus passages not already found (`SEMANTIC_NPROBE` overrides
+                    the index's recall/latency setting).
+    """
+    sources = candidate_sources()
+    candidates = []
+
+    if 'web' in sources:
+        if web_results is None:
+            with stage("search"):
+                web_results = query_clean_results(keywords)
+        candidates.extend(web_results)
+    if 'corpus' in sources:
+        with stage("corpus_search"):
+            candidates.extend(get_corpus().search(paragraph, top_k=int(os.environ.get("CORPUS_TOP_K", 10)),
+                                                  exclude_document_ids=exclude_document_ids))
+
+    semantic_index = get_semantic_index()
+    if 'semantic' in sources and semantic_index is not None:
+        with stage("semantic_search"):
+            # Catch up with passages ingested by other worker processes
+            sync_semantic_index(get_corpus())
+            nprobe = int(os.environ.get("SEMANTIC_NPROBE", 0)) or None
+            hits = dict(semantic_index.search(paragraph, top_k=int(os.environ.get("SEMANTIC_TOP_K", 10)), nprobe=nprobe))
+            found = {candidate['passage_id'] for candidate in candidates if 'passage_id' in candidate}
+            for passage in get_corpus().get_passages([passage_id for passage_id in hits if passage_id not in found]):
+                if passage['document_id'] not in exclude_document_ids:
+                    candidates.append({**passage, 'score': hits[passage['passage_id']]})
+
+    return candidates
+
+
+def build_paragraph_candidates(paragraph_data):
+    """
+    Cleans a paragraph and its search results and fits the TF-IDF model used to score them.
+
+    Parameters:
+    - paragraph_data (dict): Paragraph data with the 'paragraph' text and its 'search_results'.
+
+    Returns:
+    - dict: Candidate entry as stored in a `CandidateStore`.
+    """
+    with stage("clean_texts"):
+        paragraph_sentences = segment_text_by_sentences(paragraph_data['paragraph'])
+        clean_paragraphs = clean_texts(paragraph_sentences)
+        clean_search_data = [{'content': clean_texts([item['content']]), **{k: v for k, v in item.items() if k != 'content'}} for item in paragraph_data['search_results']]
+
+    vectorizer, input_vectors, target_vectors = fit_tfidf(clean_paragraphs, clean_search_data)
+
+    return {
+        'paragraph_data': paragraph_data,
+        'clean_sentences': clean_paragraphs,
+        'clean_search_data': clean_search_data,
+        'vectorizer': vectorizer,
+        'input_vectors': input_vectors,
+        'target_vectors': target_vectors
+    }
+
+
+def process_paragraph(paragraph, global_search_data=None, word_vectors=None, candidate_store=None, paragraph_index=None,
+                      exclude_document_ids=()):
     """
     Processes a given paragraph: extracts keywords, queries results based on these keywords, 
     segments the paragraph by sentences, and computes cosine similarity between the paragraph 
-    and search results using either word vectors or TF-IDF.
+    and search results using either word vectors or TF-IDF. Search results come from the web
+    and/or the local corpus, see `find_candidates`.
     
     Parameters:
     - paragraph (str): Text paragraph to process.
     - global_search_data (dict, optional): Precomputed search data to use, if available.
     - word_vectors (model, optional): Pre-trained word vectors, if available.
+    - candidate_store (CandidateStore, optional): Request-scoped store of first pass results. If it already
+                                                  holds this paragraph, its keywords, search results and fitted
+                                                  TF-IDF model are reused; otherwise they are added to it.
+    - paragraph_index (int, optional): Position of the paragraph, used as the candidate_store key.
+    - exclude_document_ids (iterable of int, optional): Corpus documents left out of the candidates.
 
     Returns:
     - tuple: Contains processed paragraph data, average similarity, maximum similarity, and 
@@ -63,38 +173,48 @@ def process_paragraph(paragraph, global_search_data=None, word_vectors=None):
     all_sorted_similarities = []
     sentence_similarities = []
 
-    keyword_data = extract_keywords_from_text({"text": paragraph})
-    if 'error' in keyword_data:
-        return {"error": keyword_data}
-    
-    search_data = query_clean_results(keyword_data['results']) if not global_search_data else global_search_data
-    if 'error' in search_data:
-        raise Exception(search_data['error'])
-
-    paragraph_data = {
-        'paragraph': paragraph,
-        'keywords': keyword_data['results'],
-        'search_results': search_data
-    }
+    candidates = candidate_store.get(paragraph_index) if candidate_store is not None else None
 
-    if search_data:
-        paragraph_sentences = segment_text_by_sentences(paragraph)
-        clean_paragraphs = clean_texts(paragraph_sentences)
-        clean_search_data = [{'content': clean_texts([item['content']]), **{k: v for k, v in item.items() if k != 'content'}} for item in search_data]
+    if candidates:
+        # Everything up to the fitted TF-IDF model is reused from the first pass
+        paragraph_data = dict(candidates['paragraph_data'])
+    else:
+        with stage("keywords"):
+            keyword_data = extract_keywords_from_text({"text": paragraph})
+        if 'error' in keyword_data:
+            return {"error": keyword_data}
+        
+        search_data = find_candidates(paragraph, keyword_data['results'], exclude_document_ids=exclude_document_ids) if not global_search_data else global_search_data
+        if 'error' in search_data:
+            raise Exception(search_data['error'])
+
+        paragraph_data = {
+            'paragraph': paragraph,
+            'keywords': keyword_data['results'],
+            'search_results': search_data
+        }
+
+        if search_data:
+            candidates = build_paragraph_candidates(paragraph_data)
+            if candidate_store is not None:
+                candidate_store.put(paragraph_index, candidates)
+
+    if candidates:
+        clean_paragraphs = candidates['clean_sentences']
+        clean_search_data = candidates['clean_search_data']
 
         current_paragraph_similarity = 0
         current_paragraph_similarity_max = 0
 
-        print("Paragraph sentences", clean_paragraphs)
+        # All sentences of the paragraph are scored against the search results in one batch
+        if word_vectors:
+            similarities = embedding_similarity_matrix(candidates['input_vectors'], candidates['target_vectors'], candidates['vectorizer'], word_vectors)
+        else:
+            similarities = tfidf_similarity_matrix(candidates['input_vectors'], candidates['target_vectors'])
 
-        for clean_paragraph in clean_paragraphs:
-            if word_vectors:
-                average_similarity, max_similarity, individual_similarity, sorted_similarity = calculate_cosine_similarity_model(clean_paragraph, clean_search_data, word_vectors)
-                all_sorted_similarities.extend(sorted_similarity)
-
-            else:
-                average_similarity, max_similarity, individual_similarity, sorted_similarity = TFID(clean_paragraph, clean_search_data)
-                all_sorted_similarities.extend(sorted_similarity)
+        for sentence_index, clean_paragraph in enumerate(clean_paragraphs):
+            average_similarity, max_similarity, individual_similarity, sorted_similarity = summarize_similarities(similarities[sentence_index], clean_search_data, False, sentence_index)
+            all_sorted_similarities.extend(sorted_similarity)
 
             cosine_data = {
                 'sentence': clean_paragraph,
@@ -107,63 +227,489 @@ def process_paragraph(paragraph, global_search_data=None, word_vectors=None):
             current_paragraph_similarity_max = max(max_similarity, current_paragraph_similarity_max)
             current_paragraph_similarity += average_similarity
 
-        print("Length of paragraph similarities in paragraph proccess is", len(sentence_similarities))
-
         current_paragraph_similarity /= len(clean_paragraphs)
         #current_paragraph_similarity_max /= len(clean_paragraphs)
     return paragraph_data, current_paragraph_similarity, current_paragraph_similarity_max, all_sorted_similarities, sentence_similarities
 
 
-def process_all_paragraphs(paragraphs, use_model=False, word_vectors=None, input_search_data=None):
+def paragraph_workers(num_paragraphs):
+    """
+    Number of threads used to process paragraphs concurrently.
+
+    Environment Variables:
+    - PARAGRAPH_WORKERS: Upper bound on concurrent paragraphs per request. Defaults to 3.
+
+    Parameters:
+    - num_paragraphs (int): Number of paragraphs to process.
+
+    Returns:
+    - int: The number of worker threads, at least 1.
+    """
+    return max(1, min(int(os.environ.get("PARAGRAPH_WORKERS", 3)), num_paragraphs))
+
+
+def iter_paragraph_results(paragraphs, use_model=False, word_vectors=None, input_search_data=None, candidate_store=None,
+                           exclude_document_ids=()):
+    """
+    Runs `process_paragraph` on every paragraph concurrently and yields the outcomes in paragraph order.
+
+    The per-paragraph pipelines (keyword extraction, web search, scoring) are independent, so they are
+    submitted to a bounded thread pool (see `paragraph_workers`). Each outcome is yielded as soon as it and
+    all the paragraphs before it are done.
+
+    Parameters:
+    - paragraphs (list): List of text paragraphs to process.
+    - use_model, word_vectors, input_search_data, candidate_store, exclude_document_ids: See `process_all_paragraphs`.
+
+    Yields:
+    - tuple: (index, result, error) where result is the tuple returned by `process_paragraph`, or None
+             if processing raised, in which case error holds the exception.
+    """
+    def run(index, paragraph):
+        if use_model:
+            return process_paragraph(paragraph, input_search_data, word_vectors, candidate_store, index, exclude_document_ids)
+        return process_paragraph(paragraph, candidate_store=candidate_store, paragraph_index=index, exclude_document_ids=exclude_document_ids)
+
+    if not paragraphs:
+        return
+
+    with ThreadPoolExecutor(max_workers=paragraph_workers(len(paragraphs))) as executor:
+        # Each paragraph runs in a copy of the caller's context, so its stage timings go to the caller's request
+        futures = [executor.submit(contextvars.copy_context().run, run, index, paragraph) for index, paragraph in enumerate(paragraphs)]
+
+        try:
+            for index, future in enumerate(futures):
+                try:
+                    yield index, future.result(), None
+                except Exception as e:
+                    yield index, None, e
+        finally:
+            # A consumer that stops early (e.g. a disconnected streaming client) skips the pending paragraphs
+            for future in futures:
+                future.cancel()
+
+
+def new_paragraph_totals():
+    """
+    Returns:
+    - dict: Empty running totals of a pass over the paragraphs, filled by `add_paragraph_result`.
+    """
+    return {
+        'processed_data': [],
+        'errors': [],
+        'all_sorted_similarities': [],
+        'sentence_similarities': [],
+        'max_similarity': 0,
+        'total_similarities': 0,
+        'paragraphs_processed': 0,
+        'global_search_data': []
+    }
+
+
+def add_paragraph_result(totals, index, result, error, use_model=False):
+    """
+    Adds the outcome of one paragraph, as yielded by `iter_paragraph_results`, to the running totals of a pass.
+
+    Parameters:
+    - totals (dict): Running totals from `new_paragraph_totals`.
+    - index (int): Position of the paragraph.
+    - result (tuple): Result of `process_paragraph`, or None on error.
+    - error (Exception): The error raised while processing the paragraph, if any.
+    - use_model (bool, optional): Whether this is the word vector pass (the TF-IDF pass records its search results).
+
+    Returns:
+    - dict: The error entry added to totals['errors'], or None if the paragraph was processed.
+    """
+    try:
+        if error:
+            raise error
+
+        paragraph_data, current_paragraph_similarity, current_paragraph_similarity_max, sorted_similarities, sentence_similarities = result
+        if not use_model:
+            totals['global_search_data'] = paragraph_data['search_results']
+        totals['all_sorted_similarities'].extend(sorted_similarities)
+        totals['sentence_similarities'].extend(sentence_similarities)
+
+        totals['total_similarities'] += current_paragraph_similarity
+        totals['max_similarity'] = max(totals['max_similarity'], current_paragraph_similarity_max)
+        totals['paragraphs_processed'] += 1
+
+        totals['processed_data'].append(paragraph_data)
+    except Exception as e:
+        error_entry = {"paragraph_index": index, "error_message": str(e)}
+        totals['errors'].append(error_entry)
+        return error_entry
+
+    return None
+
+
+def process_all_paragraphs(paragraphs, use_model=False, word_vectors=None, input_search_data=None, candidate_store=None,
+                           exclude_document_ids=()):
     """
     Processes a list of paragraphs to extract keywords, compute cosine similarities, and capture any errors.
     Can utilize a provided word vector model or default to TF-IDF for similarity calculations.
+    Paragraphs are processed concurrently, results are aggregated in paragraph order.
 
     Parameters:
     - paragraphs (list): List of text paragraphs to process.
     - use_model (bool, optional): Flag to determine if word vectors should be used for similarity calculation.
     - word_vectors (model, optional): Pre-trained word vectors, if available.
     - input_search_data (dict, optional): Precomputed search data, if available.
+    - candidate_store (CandidateStore, optional): Request-scoped store shared by the TF-IDF pass and the
+                                                  word2vec escalation pass, see `process_paragraph`.
+    - exclude_document_ids (iterable of int, optional): Corpus documents left out of the candidates, see
+                                                        `submission_document_ids`.
 
     Returns:
     - tuple: Contains processed data for each paragraph, maximum similarity across all paragraphs, total 
              similarities, number of paragraphs processed, a sorted list of similarities, global search data, 
              overall entence similarities, and any errors encountered during processing.
     """
-        
-    processed_data = []
-    errors = []
-    all_sorted_similarities = []
-    sentence_similarities_overall = []
-    max_similarity_overall = 0
-    total_similarities = 0
-    total_paragraphs_processed = 0
-    global_search_data = []
+    totals = new_paragraph_totals()
 
-    for index, paragraph in enumerate(paragraphs):
-        try:
-            if use_model:
-                paragraph_data, current_paragraph_similarity, current_paragraph_similarity_max, sorted_similarities, sentence_similarities = process_paragraph(paragraph, input_search_data, word_vectors)
-                all_sorted_similarities.extend(sorted_similarities)
-                sentence_similarities_overall.extend(sentence_similarities)
+    for index, result, error in iter_paragraph_results(paragraphs, use_model, word_vectors, input_search_data, candidate_store, exclude_document_ids):
+        add_paragraph_result(totals, index, result, error, use_model)
+
+    return totals['processed_data'], totals['max_similarity'], totals['total_similarities'], totals['paragraphs_processed'], totals['all_sorted_similarities'], totals['global_search_data'], totals['sentence_similarities'], totals['errors']
+
+
+def top_similar_links(sorted_similarities, n=5):
+    """
+    Picks the most similar search results, one per link.
+
+    Parameters:
+    - sorted_similarities (list of dict): Similarity entries with 'similarity' and 'link' keys.
+    - n (int, optional): Number of links to keep. Default is 5.
+
+    Returns:
+    - list of dict: The best entry of each of the n most similar links, most similar first.
+    """
+    seen_links = set()
+    top_links = []
+
+    for item in sorted(sorted_similarities, key=lambda x: x['similarity'], reverse=True):
+        if item['link'] not in seen_links:
+            top_links.append(item)
+            seen_links.add(item['link'])
+        if len(top_links) == n:
+            break
+
+    return top_links
+
+
+def iter_plagiarism_check(paragraphs, word_vectors=None, candidate_store=None, threshold=0.3, exclude_document_ids=()):
+    """
+    Runs the two stage check behind `/find_plagiarism` and yields its records as they become available.
+
+    Every paragraph is scored with TF-IDF first. If any paragraph exceeds `threshold`, all paragraphs are
+    re-scored with the word vectors, reusing the first pass candidates. Each paragraph record is yielded
+    as soon as it and the paragraphs before it are scored, so callers can stream them.
+
+    Parameters:
+    - paragraphs (list): List of text paragraphs (segments) to check.
+    - word_vectors (model, optional): Pre-trained word vectors used by the escalation pass.
+    - candidate_store (CandidateStore, optional): Request-scoped store shared by both passes. A new one is
+                                                  used if not given.
+    - threshold (float, optional): TF-IDF similarity that triggers the word vector pass. Default is 0.3.
+    - exclude_document_ids (iterable of int, optional): Corpus documents left out of the candidates, see
+                                                        `submission_document_ids`.
+
+    Yields:
+    - dict: Records with a 'type' key:
+            {'type': 'paragraph', 'pass': 'tfidf' or 'word2vec', 'paragraph_index', 'paragraph',
+             'average_similarity', 'max_similarity', 'sentence_similarities'} per scored paragraph,
+            {'type': 'error', 'pass', 'paragraph_index', 'error_message'} per failed paragraph,
+            {'type': 'escalation', 'tfidf_max_similarity', 'threshold'} before the word vector pass, and
+            a final {'type': 'summary', 'results', 'similarity', 'max_similarity', 'average_similarity',
+            'SortedUrls', 'sentence_similarities', 'errors', 'escalated'} with the same content as the
+            non-streaming response.
+    """
+    if candidate_store is None:
+        candidate_store = CandidateStore()
+
+    CHECKS_TOTAL.inc()
+    passes = [('tfidf', False)]
+    totals = None
+    escalated = False
+
+    while passes:
+        pass_name, use_model = passes.pop(0)
+        input_search_data = totals['global_search_data'] if totals else None
+        totals = new_paragraph_totals()
+
+        for index, result, error in iter_paragraph_results(paragraphs, use_model, word_vectors, input_search_data, candidate_store, exclude_document_ids):
+            error_entry = add_paragraph_result(totals, index, result, error, use_model)
+            if error_entry:
+                yield {'type': 'error', 'pass': pass_name, **error_entry}
             else:
-                paragraph_data, current_paragraph_similarity, current_paragraph_similarity_max, sorted_similarities, sentence_similarities = process_paragraph(paragraph)
-                global_search_data = paragraph_data['search_results']
-                all_sorted_similarities.extend(sorted_similarities)
-                sentence_similarities_overall.extend(sentence_similarities)
+                paragraph_data, average_similarity, max_similarity, _, sentence_similarities = result
+                yield {
+                    'type': 'paragraph',
+                    'pass': pass_name,
+                    'paragraph_index': index,
+                    'paragraph': paragraph_data,
+                    'average_similarity': average_similarity,
+                    'max_similarity': max_similarity,
+                    'sentence_similarities': sentence_similarities
+                }
+
+        # If the TFIDF exceeds the threshold check with the word2vec model, reusing the first pass candidates
+        if not use_model and word_vectors is not None and totals['max_similarity'] > threshold:
+            escalated = True
+            ESCALATIONS_TOTAL.inc()
+            passes.append(('word2vec', True))
+            yield {'type': 'escalation', 'tfidf_max_similarity': totals['max_similarity'], 'threshold': threshold}
+
+    yield {
+        'type': 'summary',
+        'results': totals['processed_data'],
+        'similarity': totals['max_similarity'],
+        'max_similarity': totals['max_similarity'],
+        'average_similarity': totals['total_similarities'] / totals['paragraphs_processed'] if totals['paragraphs_processed'] else 0,
+        'SortedUrls': top_similar_links(totals['all_sorted_similarities']),
+        'sentence_similarities': totals['sentence_similarities'],
+        'errors': totals['errors'],
+        'escalated': escalated
+    }
+
+
+def store_submission(text, submitter=None, check_id=None):
+    """
+    Adds a checked text to the local corpus when `CORPUS_STORE_SUBMISSIONS` is set, so later checks can
+    catch student-to-student copying.
 
+    Parameters:
+    - text (str): The checked text.
+    - submitter (str, optional): Id of the student or client that submitted the text.
+    - check_id (str, optional): Id of the check the text was submitted with.
+    """
+    if os.environ.get("CORPUS_STORE_SUBMISSIONS", "").lower() in ("1", "true", "yes"):
+        get_corpus().add_submission(text, submitter, check_id)
+        sync_semantic_index(get_corpus())
 
 
-            total_similarities += current_paragraph_similarity
-            max_similarity_overall = max(max_similarity_overall, current_paragraph_similarity_max)
-            total_paragraphs_processed += 1
+def submission_document_ids(submitter=None, check_id=None):
+    """
+    Finds the copies stored by `store_submission` for the same submitter or the same check, so that a
+    student checking their text again is not reported as copying from themselves. Identical texts
+    submitted by anyone else are still matched.
 
-            processed_data.append(paragraph_data)
-        except Exception as e:
-            errors.append({"paragraph_index": index, "error_message": str(e)})
+    Parameters:
+    - submitter (str, optional): Id of the student or client submitting the text.
+    - check_id (str, optional): Id of the check, e.g. of a job run again.
 
-        print("Lengh of in loop sentence similarities ", len(sentence_similarities_overall))
+    Returns:
+    - list of int: Ids of the corpus submissions to leave out of the candidates.
+    """
+    if not {'corpus', 'semantic'} & set(candidate_sources()):
+        return []
+    return get_corpus().find_own_submissions(submitter, check_id)
 
-    print("Final Length of sentence similarities is", len(sentence_similarities_overall))
 
-    return processed_data, max_similarity_overall, total_similarities, total_paragraphs_processed, all_sorted_similarities, global_search_data, sentence_similarities_overall, errors
+def run_plagiarism_check(text, word_vectors=None, progress=None, check_id=None, submitter=None):
+    """
+    Runs a complete `/find_plagiarism` check: splits the text into segments, scores them (see
+    `iter_plagiarism_check`), stores the per-sentence results in the result store and the text in the corpus.
+
+    Parameters:
+    - text (str): The text to check.
+    - word_vectors (model, optional): Pre-trained word vectors used by the escalation pass.
+    - progress (callable, optional): Called as progress(done, total) after each segment is scored. total
+                                     counts the segments of every pass run so far, so it grows when the
+                                     check escalates to the word vector pass.
+    - check_id (str, optional): Id to store the results under. A new one is generated by default.
+    - submitter (str, optional): Id of the student or client submitting the text. Their own earlier
+                                 submissions are not reported as sources (see `submission_document_ids`).
+
+    Returns:
+    - dict: The `/find_plagiarism` response: 'check_id', 'results', 'similarity', 'max_similarity',
+            'SortedUrls' and, if any, 'errors'.
+    """
+    check_id = check_id or uuid.uuid4().hex
+    paragraphs = split_into_segments(text, 150, 3)
+    done = 0
+    total = len(paragraphs)
+    if progress:
+        progress(done, total)
+
+    for record in iter_plagiarism_check(paragraphs, word_vectors, exclude_document_ids=submission_document_ids(submitter, check_id)):
+        if record['type'] in ('paragraph', 'error'):
+            done += 1
+        elif record['type'] == 'escalation':
+            total += len(paragraphs)
+        if progress and record['type'] != 'summary':
+            progress(done, total)
+        summary = record
+
+    # Store the text passed in by the user and its results for /sentence_similarities and /your_text
+    check_id = get_result_store().put(text, summary['sentence_similarities'], check_id)
+
+    response_data = {"check_id": check_id, "results": summary['results'], "similarity": summary['max_similarity'], "max_similarity": summary['max_similarity'], "SortedUrls": summary['SortedUrls']}
+    if summary['errors']:
+        response_data['errors'] = summary['errors']
+
+    store_submission(text, submitter, check_id)
+
+    return response_data
+
+
+def run_batch_check(texts, word_vectors=None, threshold=0.3, top_matches=10, submitters=None):
+    """
+    Checks many documents at once, sharing the work between them.
+
+    Identical segments are processed once and identical keyword queries are searched once. All candidates
+    found for the batch form one shared pool, and a single TF-IDF model is fitted over every sentence of
+    the batch and the pool, so each document is scored against every source found for any document of the
+    batch. The sentences of the other documents of the batch are in the pool too, linked as
+    `batch://<document index>`, so documents copying each other are matched. A document whose TF-IDF
+    similarity exceeds `threshold` is re-scored with the word vectors, whose pool embeddings are also
+    computed once.
+
+    Parameters:
+    - texts (list of str): The documents to check.
+    - word_vectors (model, optional): Pre-trained word vectors used for escalated documents.
+    - threshold (float, optional): TF-IDF similarity that triggers the word vector scoring. Default is 0.3.
+    - top_matches (int, optional): Most similar pool entries reported per sentence. Default is 10.
+    - submitters (list of str, optional): Id of the submitter of each document, see `run_plagiarism_check`.
+
+    Returns:
+    - dict: {'results': [per document: {'check_id', 'similarity', 'max_similarity', 'average_similarity',
+             'SortedUrls', 'escalated', 'errors' (only if any)}],
+             'stats': {'documents', 'unique_segments', 'queries', 'candidates'}}
+            The per-sentence results of each document are in the result store under its check_id, and the
+            documents are added to the corpus like single checks (see `store_submission`).
+    """
+    documents = [split_into_segments(text, 150, 3) for text in texts]
+    unique_paragraphs = list(dict.fromkeys(paragraph for paragraphs in documents for paragraph in paragraphs))
+    paragraph_errors = {}
+
+    # The submitter's own earlier copies of each document are left out of its candidates (see
+    # `submission_document_ids`); a segment shared by several documents is searched without the copies of any of them
+    submitters = submitters or [None] * len(texts)
+    document_exclusions = [set(submission_document_ids(submitter)) for submitter in submitters]
+    paragraph_exclusions = {}
+    for paragraphs, excluded in zip(documents, document_exclusions):
+        for paragraph in paragraphs:
+            paragraph_exclusions.setdefault(paragraph, set()).update(excluded)
+
+    def extract(paragraph):
+        try:
+            with stage("keywords"):
+                return extract_keywords(paragraph)
+        except Exception as e:
+            paragraph_errors[paragraph] = str(e)
+            return []
+
+    def search(keywords):
+        try:
+            with stage("search"):
+                return query_clean_results(keywords)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=paragraph_workers(len(unique_paragraphs))) as executor:
+        # Contexts are copied here, in the caller, so the stage timings go to the caller's request
+        keywords = dict(zip(unique_paragraphs, [future.result() for future in
+                                                [executor.submit(contextvars.copy_context().run, extract, paragraph) for paragraph in unique_paragraphs]]))
+
+        # Paragraphs with the same keyword set share one search
+        queries = {}
+        if 'web' in candidate_sources():
+            queries = {search_cache_key(paragraph_keywords): paragraph_keywords for paragraph_keywords in keywords.values() if paragraph_keywords}
+        web_results = dict(zip(queries, [future.result() for future in
+                                         [executor.submit(contextvars.copy_context().run, search, query) for query in queries.values()]]))
+
+    pool = {}
+    for paragraph in unique_paragraphs:
+        results = web_results.get(search_cache_key(keywords[paragraph]), [])
+        if isinstance(results, Exception):
+            paragraph_errors[paragraph] = str(results)
+            results = []
+        try:
+            for candidate in find_candidates(paragraph, keywords[paragraph], results, paragraph_exclusions[paragraph]):
+                pool.setdefault((candidate['link'], candidate['content']), candidate)
+        except Exception as e:
+            paragraph_errors[paragraph] = str(e)
+
+    pool = list(pool.values())
+    clean_pool = [{'content': [content], **{k: v for k, v in item.items() if k != 'content'}}
+                  for item, content in zip(pool, clean_texts([item['content'] for item in pool]))]
+
+    document_sentences = [clean_texts([sentence for paragraph in paragraphs for sentence in segment_text_by_sentences(paragraph)])
+                          for paragraphs in documents]
+    all_sentences = [sentence for sentences in document_sentences for sentence in sentences]
+
+    # The sentences of the batch documents are pool entries too, so documents copying each other are matched
+    clean_pool += [{'content': [sentence], 'link': f"batch://{document_index}", 'title': f"Batch document {document_index}",
+                    'batch_document': document_index}
+                   for document_index, sentences in enumerate(document_sentences) for sentence in sentences]
+
+    results = []
+    if all_sentences:
+        vectorizer, input_vectors, target_vectors = fit_tfidf(all_sentences, clean_pool[:len(pool)])
+        target_vectors = vstack([target_vectors, input_vectors]).tocsr()
+    pool_embeddings = None
+
+    start = 0
+    for document_index, (text, submitter, paragraphs, sentences, excluded) in enumerate(zip(texts, submitters, documents, document_sentences, document_exclusions)):
+        rows = slice(start, start + len(sentences))
+        start += len(sentences)
+
+        # The document's own sentences, and its submitter's earlier copies found through another document's segments
+        columns = np.array([column for column, item in enumerate(clean_pool)
+                            if item.get('batch_document') != document_index and item.get('document_id') not in excluded], dtype=int)
+        document_pool = [clean_pool[column] for column in columns]
+
+        errors = [{"paragraph_index": index, "error_message": paragraph_errors[paragraph]}
+                  for index, paragraph in enumerate(paragraphs) if paragraph in paragraph_errors]
+        similarities = None
+        escalated = False
+        if document_pool and sentences:
+            similarities = tfidf_similarity_matrix(input_vectors[rows], target_vectors)[:, columns]
+            if word_vectors is not None and similarities.max() > threshold:
+                if pool_embeddings is None:
+                    embeddings = vocabulary_embeddings(vectorizer, word_vectors)
+                    pool_embeddings = normalize(tfidf_weighted_embeddings(target_vectors, vectorizer, embeddings))
+                similarities = (normalize(tfidf_weighted_embeddings(input_vectors[rows], vectorizer, embeddings)) @ pool_embeddings.T)[:, columns]
+                escalated = True
+
+        sentence_similarities = []
+        all_sorted_similarities = []
+        total_similarities = 0
+        max_similarity = 0
+        for sentence_index, sentence in enumerate(sentences if similarities is not None else []):
+            average_similarity, sentence_max, sorted_similarity = summarize_top_similarities(similarities[sentence_index], document_pool, sentence_index, top_matches)
+            sentence_similarities.append({
+                'sentence': sentence,
+                'average_similarity': average_similarity,
+                'max_similarity': sentence_max,
+                'sorted_similarity': sorted_similarity
+            })
+            all_sorted_similarities.extend(sorted_similarity)
+            total_similarities += average_similarity
+            max_similarity = max(max_similarity, sentence_max)
+
+        check_id = get_result_store().put(text, sentence_similarities)
+        document_result = {
+            'check_id': check_id,
+            'similarity': max_similarity,
+            'max_similarity': max_similarity,
+            'average_similarity': total_similarities / len(sentence_similarities) if sentence_similarities else 0,
+            'SortedUrls': top_similar_links(all_sorted_similarities),
+            'escalated': escalated
+        }
+        if errors:
+            document_result['errors'] = errors
+        results.append(document_result)
+
+        store_submission(text, submitter, check_id)
+
+    return {
+        'results': results,
+        'stats': {
+            'documents': len(texts),
+            'unique_segments': len(unique_paragraphs),
+            'queries': len(queries),
+            'candidates': len(pool)
+        }
+    }
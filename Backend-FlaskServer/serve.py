@@ -0,0 +1,158 @@
+"""
+Production entry point: loads the models once, then serves the Flask app from pre-forked worker processes.
+
+The master process imports the app (which downloads the NLTK data, builds the text normalizer and
+memory-maps the word vectors), warms it up with `warm_up` and opens the listening socket. It then forks
+the workers, which inherit the loaded objects copy-on-write and all accept connections on the shared
+socket, each with a threaded werkzeug server. `/ready` answers 200 in the workers from the start, since
+they are only forked once the app is warm. Workers that die are replaced; a worker dying within
+`SERVER_QUICK_EXIT_SECONDS` of its start is replaced after a growing delay, and the server gives up
+after `SERVER_MAX_QUICK_EXITS` such exits in a row (e.g. a bad deploy failing in every worker).
+
+Thread pools, HTTP sessions and SQLite connections are created lazily per process (they check
+`os.getpid()`), so nothing holding a thread or a file descriptor crosses the fork. With more than one
+worker, check results and background job snapshots are kept in SQLite (`RESULT_STORE_PATH`,
+`JOB_STORE_PATH`) so any worker can answer for them, and every worker writes its metrics to
+`METRICS_DIR` so that `/metrics` reports the totals of all the workers.
+
+Environment Variables:
+- SERVER_HOST: Interface to listen on. Defaults to 127.0.0.1.
+- SERVER_PORT: Port to listen on. Defaults to 5000.
+- SERVER_WORKERS: Number of worker processes. Defaults to the number of CPUs.
+- SERVER_BACKLOG: Listen backlog of the shared socket. Defaults to 128.
+- SERVER_QUICK_EXIT_SECONDS: A worker exiting sooner than this after its start counts as failing at startup.
+                             Defaults to 10.
+- SERVER_MAX_QUICK_EXITS: Consecutive quick exits after which the server stops. Defaults to 5.
+- METRICS_DIR: Directory of the per-worker metrics snapshots, emptied at startup. Defaults to `cache/metrics`.
+
+Usage:
+    cd Backend-FlaskServer && python serve.py
+"""
+import gc
+import os
+import sys
+import glob
+import time
+import signal
+import socket
+import logging
+
+from werkzeug.serving import make_server
+
+from components.DiskCache import default_cache_path
+from components.Metrics import mark_process_dead, start_metrics_writer
+
+
+def serve_worker(application, listener, host, port):
+    """
+    Worker process body: serve requests from the inherited listening socket until terminated.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    start_metrics_writer()
+    server = make_server(host, port, application, threaded=True, fd=listener.fileno())
+    server.serve_forever()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+
+    host = os.environ.get("SERVER_HOST", "127.0.0.1")
+    port = int(os.environ.get("SERVER_PORT", 5000))
+    workers = int(os.environ.get("SERVER_WORKERS", os.cpu_count() or 1))
+
+    if workers > 1:
+        os.environ.setdefault("RESULT_STORE_PATH", default_cache_path("results.sqlite3"))
+        os.environ.setdefault("JOB_STORE_PATH", default_cache_path("jobs.sqlite3"))
+        os.environ.setdefault("METRICS_DIR", default_cache_path("metrics"))
+        # Snapshots left by an earlier run would be added to the counters of this one
+        for path in glob.glob(os.path.join(os.environ["METRICS_DIR"], "metrics-*.json")):
+            os.remove(path)
+
+    # Everything loaded here is shared copy-on-write by the workers
+    import app as flask_app
+    flask_app.warm_up()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(int(os.environ.get("SERVER_BACKLOG", 128)))
+    listener.set_inheritable(True)
+
+    # Keep the garbage collector from touching (and so copying) the pages of the objects loaded so far
+    gc.freeze()
+
+    quick_exit_seconds = float(os.environ.get("SERVER_QUICK_EXIT_SECONDS", 10))
+    max_quick_exits = int(os.environ.get("SERVER_MAX_QUICK_EXITS", 5))
+
+    children = {}
+    stopping = False
+    quick_exits = 0
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                serve_worker(flask_app.app, listener, host, port)
+                status = 0
+            except BaseException:
+                logging.exception("Worker failed")
+            finally:
+                os._exit(status)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+    logging.info(f"Serving on http://{host}:{port} with {workers} workers")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        mark_process_dead(pid)
+        if stopping:
+            continue
+
+        if started is not None and time.monotonic() - started < quick_exit_seconds:
+            quick_exits += 1
+        else:
+            quick_exits = 0
+
+        if quick_exits >= max_quick_exits:
+            logging.error(f"Worker {pid} exited with status {status}, {quick_exits} workers in a row exited "
+                          f"within {quick_exit_seconds:g}s of starting, stopping the server")
+            stop(None, None)
+            continue
+
+        # Back off when workers keep failing at startup, instead of forking in a tight loop
+        delay = min(0.5 * 2 ** (quick_exits - 1), 30.0) if quick_exits else 0
+        logging.warning(f"Worker {pid} exited with status {status}, restarting it" + (f" in {delay:g}s" if delay else ""))
+        time.sleep(delay)
+        if not stopping:
+            spawn()
+
+    listener.close()
+    if quick_exits >= max_quick_exits:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
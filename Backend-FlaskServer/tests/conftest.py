@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the server's `components` package as app.py does, from Backend-FlaskServer/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
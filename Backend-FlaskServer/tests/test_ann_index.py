@@ -0,0 +1,56 @@
+import sys
+import threading
+
+import numpy as np
+
+from components.ANNIndex import IVFIndex
+
+
+def check_search_while_adding(seed):
+    rng = np.random.default_rng(seed)
+    dim, batches, batch_size = 16, 60, 10
+    vectors = rng.standard_normal((batches * batch_size, dim)).astype(np.float32)
+    index = IVFIndex(dim, n_lists=8, nprobe=8, train_size=300)
+
+    index.add(np.arange(batch_size), vectors[:batch_size])
+    done = threading.Event()
+    errors = []
+
+    def add():
+        try:
+            for batch in range(1, batches):
+                start = batch * batch_size
+                index.add(np.arange(start, start + batch_size), vectors[start:start + batch_size])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    writer = threading.Thread(target=add)
+    writer.start()
+    try:
+        while not done.is_set():
+            # nprobe == n_lists makes the search exact, so the first vector is always its own best match
+            results = index.search(vectors[0], k=1)
+            assert results and results[0][0] == 0
+    finally:
+        writer.join()
+
+    assert not errors
+    assert index.is_trained
+    assert len(index) == batches * batch_size
+    assert index.search(vectors[-1], k=1)[0][0] == batches * batch_size - 1
+
+
+def test_search_while_adding_and_training():
+    """
+    Searches running while another thread adds vectors, and trains the index on the way, must neither
+    fail nor miss the vectors added before them.
+    """
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads often to hit the window while the index is trained
+    try:
+        for seed in range(30):
+            check_search_while_adding(seed)
+    finally:
+        sys.setswitchinterval(switch_interval)
@@ -0,0 +1,33 @@
+import pytest
+
+import components.Corpus as Corpus
+from components.utils import run_batch_check
+
+
+ESSAY = "The industrial revolution transformed rural economies. Factories drew workers into growing cities."
+REORDERED_COPY = "Factories drew workers into growing cities. The industrial revolution transformed rural economies."
+OTHER_ESSAY = "Photosynthesis converts light energy into chemical energy. Plants store it in glucose molecules."
+
+
+@pytest.fixture(autouse=True)
+def corpus_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("CORPUS_PATH", str(tmp_path / "corpus.sqlite3"))
+    monkeypatch.setenv("CANDIDATE_SOURCES", "corpus")
+    monkeypatch.delenv("CORPUS_STORE_SUBMISSIONS", raising=False)
+    monkeypatch.setattr(Corpus, "_corpus", None)
+
+
+def test_documents_of_a_batch_are_compared_with_each_other():
+    results = run_batch_check([ESSAY, OTHER_ESSAY, REORDERED_COPY])['results']
+
+    assert results[0]['max_similarity'] == pytest.approx(1.0)
+    assert results[0]['SortedUrls'][0]['link'] == "batch://2"
+    assert results[2]['max_similarity'] == pytest.approx(1.0)
+    assert results[2]['SortedUrls'][0]['link'] == "batch://0"
+
+
+def test_document_is_not_compared_with_itself():
+    result = run_batch_check([ESSAY])['results'][0]
+
+    assert result['max_similarity'] == 0
+    assert result['SortedUrls'] == []
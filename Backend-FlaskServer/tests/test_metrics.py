@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from components import Metrics
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(Metrics, "_last_snapshot", None)
+    for metric in Metrics._metrics:
+        metric.reset()
+    return tmp_path
+
+
+def run_worker(checks, stage_seconds):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            Metrics.start_metrics_writer(interval=3600)
+            Metrics.CHECKS_TOTAL.inc(checks)
+            Metrics.STAGE_SECONDS.observe(stage_seconds, stage="search")
+            Metrics.write_metrics_snapshot()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    return pid
+
+
+def metric_value(text, name):
+    return [float(line.split()[-1]) for line in text.splitlines() if line.startswith(name + " ")]
+
+
+def test_metrics_of_all_worker_processes_are_merged(metrics_dir):
+    run_worker(2, 0.2)
+    run_worker(3, 0.02)
+    Metrics.CHECKS_TOTAL.inc()
+
+    text = Metrics.render_metrics()
+    assert metric_value(text, "plagiarism_checks_total") == [6]
+    assert metric_value(text, 'plagiarism_stage_seconds_count{stage="search"}') == [2]
+    assert metric_value(text, 'plagiarism_stage_seconds_bucket{stage="search",le="0.025"}') == [1]
+
+
+def test_counters_of_exited_workers_are_kept(metrics_dir):
+    pid = run_worker(4, 0.2)
+    Metrics.mark_process_dead(pid)
+    run_worker(1, 0.2)
+
+    assert metric_value(Metrics.render_metrics(), "plagiarism_checks_total") == [5]
@@ -0,0 +1,40 @@
+import pytest
+
+import components.Corpus as Corpus
+from components.utils import run_plagiarism_check
+
+
+ESSAY = "The industrial revolution transformed rural economies into urban manufacturing centres within a generation."
+OTHER_ESSAY = "Photosynthesis converts light energy into chemical energy stored in the bonds of glucose molecules."
+
+
+@pytest.fixture(autouse=True)
+def corpus_only(tmp_path, monkeypatch):
+    monkeypatch.setenv("CORPUS_PATH", str(tmp_path / "corpus.sqlite3"))
+    monkeypatch.setenv("CANDIDATE_SOURCES", "corpus")
+    monkeypatch.setenv("CORPUS_STORE_SUBMISSIONS", "1")
+    monkeypatch.setattr(Corpus, "_corpus", None)
+
+
+def test_identical_submission_from_another_submitter_is_reported():
+    first = run_plagiarism_check(ESSAY, submitter="student-a")
+    assert first['max_similarity'] == 0
+
+    second = run_plagiarism_check(ESSAY, submitter="student-b")
+    assert second['max_similarity'] == pytest.approx(1.0)
+    assert second['SortedUrls'][0]['link'].startswith("corpus://submission/")
+
+
+def test_own_resubmission_is_not_reported():
+    run_plagiarism_check(OTHER_ESSAY, submitter="student-c")
+
+    again = run_plagiarism_check(OTHER_ESSAY, submitter="student-c")
+    assert again['max_similarity'] == 0
+
+
+def test_shared_copy_is_reported_to_its_first_submitter():
+    run_plagiarism_check(ESSAY, submitter="student-a")
+    run_plagiarism_check(ESSAY, submitter="student-b")
+
+    again = run_plagiarism_check(ESSAY, submitter="student-a")
+    assert again['max_similarity'] == pytest.approx(1.0)
@@ -0,0 +1,77 @@
+import gzip
+import io
+
+from components.WarcReader import ingest_warc, iter_warc_records, parse_http_response
+
+
+def warc_record(uri, block, record_type="response"):
+    headers = (f"WARC/1.0\r\nWARC-Type: {record_type}\r\nWARC-Target-URI: {uri}\r\n"
+               f"Content-Length: {len(block)}\r\n\r\n").encode()
+    return headers + block + b"\r\n\r\n"
+
+
+def html_response(body, separator=b"\r\n\r\n"):
+    return b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8" + separator + body
+
+
+def write_warc(path, records):
+    # One gzip member per record, as in Common Crawl archives
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(gzip.compress(record))
+
+
+def test_records_are_read_across_gzip_members(tmp_path):
+    path = tmp_path / "pages.warc.gz"
+    write_warc(path, [warc_record(f"http://example.com/{i}", html_response(b"<p>Page %d</p>" % i)) for i in range(3)])
+
+    with gzip.open(path, "rb") as stream:
+        records = list(iter_warc_records(stream))
+
+    assert [record['target_uri'] for record in records] == [f"http://example.com/{i}" for i in range(3)]
+    assert records[2]['content'].endswith(b"<p>Page 2</p>")
+
+
+def test_oversized_block_is_skipped():
+    stream = io.BytesIO(warc_record("http://example.com/big", b"x" * 1000) +
+                        warc_record("http://example.com/small", b"y" * 10))
+
+    big, small = iter_warc_records(stream, max_content_bytes=100)
+
+    assert big['content'] is None
+    assert big['headers']['content-length'] == "1000"
+    assert small['content'] == b"y" * 10
+
+
+def test_http_response_with_bare_newlines():
+    status, headers, body = parse_http_response(b"HTTP/1.1 404 Not Found\nContent-Type: text/html\n\n<p>Missing</p>")
+
+    assert status == 404
+    assert headers == {'content-type': "text/html"}
+    assert body == b"<p>Missing</p>"
+
+
+def test_not_an_http_response():
+    assert parse_http_response(b"GET / HTTP/1.1\r\nHost: example.com\r\n\r\n") is None
+
+
+class FakeCorpus:
+    def __init__(self):
+        self.texts = []
+
+    def add_document(self, text, title="", link="", source="source"):
+        if text in self.texts:
+            return self.texts.index(text) + 1, False
+        self.texts.append(text)
+        return len(self.texts), True
+
+
+def test_duplicate_pages_are_counted_separately(tmp_path):
+    path = tmp_path / "pages.warc.gz"
+    page = html_response(b"<html><title>T</title><p>Same paragraph text.</p></html>")
+    write_warc(path, [warc_record("http://example.com/a", page), warc_record("http://example.com/b", page),
+                      warc_record("http://example.com/c", b"", record_type="request")])
+
+    stats = ingest_warc(str(path), FakeCorpus())
+
+    assert stats == {'records': 3, 'documents': 1, 'duplicates': 1, 'skipped': 1}
@@ -10,6 +10,7 @@ function App() {
     let [isPopoutVisible, setPopoutVisible] = useState(false);
     let [isSettingsVisible, setSettingsVisible] = useState(false);
     let [lastUpdated, setLastUpdated] = useState(Date.now());
+    let [checkId, setCheckId] = useState(null);
 
     const [searchText, setSearch] = useState(true);
     const [distanceThreshold, setDistanceThreshold] = useState(1000);
@@ -25,7 +26,7 @@ function App() {
             </div>
             <div className='container-fluid mt-5'>
                 <div className={`col-12`}>
-                    <TextSimilarityChecker searchText={searchText} algorithim={algorithim} setLastUpdated={setLastUpdated} isHeatMapEnabled={isHeatmapEnabled} granularity={granularity} distanceThreshold={distanceThreshold}/>
+                    <TextSimilarityChecker searchText={searchText} algorithim={algorithim} setLastUpdated={setLastUpdated} setCheckId={setCheckId} isHeatMapEnabled={isHeatmapEnabled} granularity={granularity} distanceThreshold={distanceThreshold}/>
                     {/* Heatmap content */}
                     <div className={`col-${isPopoutVisible ? '4' : '0'} offcanvas-col`}>
                     <div className={`offcanvas offcanvas-end ${isPopoutVisible ? 'show' : ''}`} tabIndex="-1" id="offcanvasExample">
@@ -35,7 +36,7 @@ function App() {
                         </div>
                         <div className="offcanvas-body">
                             {isHeatmapEnabled ? 
-                            <GradientHighlightedText lastUpdated={lastUpdated} granularity={granularity} algorithm={algorithim}/> : 
+                            <GradientHighlightedText lastUpdated={lastUpdated} granularity={granularity} algorithm={algorithim} checkId={checkId}/> : 
                             <div>
                                 <h1>HeatMap is not enabled!</h1>
                                 <span>Please enable it in </span>
@@ -54,22 +54,24 @@ function mapValueToGradient(value, min, max) {
     return `rgb(${red}, ${green}, ${blue})`;
 }
 
-function GradientHighlightedText({ lastUpdated, activeMap, algorithm, granularity }) {
+function GradientHighlightedText({ lastUpdated, activeMap, algorithm, granularity, checkId }) {
     const [table, setTable] = useState(null);
     const [yourText, setYourText] = useState(null);
 
     useEffect(() => {
         if (!lastUpdated) return;
+        // The Flask server keeps per-sentence results only for the check it returned an id for
+        if (algorithm !== "LeviathanDistance" && !checkId) return;
     
         console.log("Using effect");
     
         const getData = async () => {
             try {
-                const tableData = await fetchTable(algorithm);
+                const tableData = await fetchTable(algorithm, checkId);
                 console.log("Distance table is ", tableData);
                 setTable(tableData);
     
-                const textData = await fetchYourText(algorithm);
+                const textData = await fetchYourText(algorithm, checkId);
                 console.log("Your text is ", textData);
                 setYourText(textData);
     
@@ -86,7 +88,7 @@ function GradientHighlightedText({ lastUpdated, activeMap, algorithm, granularit
             setTable(null);
             setYourText(null);
         };
-    }, [lastUpdated, algorithm]);    
+    }, [lastUpdated, algorithm, checkId]);    
     
     if (!table || !yourText) return null; // Don't render anything if table is null
     
@@ -75,13 +75,13 @@ export const checkSimilarity = (text1, text2, distanceThreshold, searchWeb, algo
     });
 };
 
-export const fetchTable = async ( algorithm ) => {
+export const fetchTable = async ( algorithm, checkId ) => {
     let requestURL = '';
 
     if (algorithm === "LeviathanDistance") 
         requestURL = "http://localhost:3001/chunks"
     else 
-        requestURL = "http://127.0.0.1:5000/sentence_similarities"
+        requestURL = `http://127.0.0.1:5000/sentence_similarities?check_id=${encodeURIComponent(checkId)}`
 
     const response = await fetch(`${requestURL}`, {
         method: "GET",
@@ -112,13 +112,13 @@ export const fetchTable = async ( algorithm ) => {
     return returnData;
 };
 
-export const fetchYourText = async ( algorithm ) => {
+export const fetchYourText = async ( algorithm, checkId ) => {
     let requestURL = '';
 
     if (algorithm === "LeviathanDistance") 
         requestURL = "http://localhost:3001/yourtext"
     else 
-        requestURL = "http://127.0.0.1:5000/your_text"
+        requestURL = `http://127.0.0.1:5000/your_text?check_id=${encodeURIComponent(checkId)}`
 
 
     const response = await fetch(`${requestURL}`, {
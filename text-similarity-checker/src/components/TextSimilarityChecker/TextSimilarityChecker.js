@@ -4,7 +4,7 @@ import LinkList from './../LinkList.js';
 
 import styles from './TextSimilarityChecker.module.css';
 
-function TextSimilarityChecker( {searchText, algorithim, setLastUpdated, isHeatMapEnabled, granularity, distanceThreshold}  ) {
+function TextSimilarityChecker( {searchText, algorithim, setLastUpdated, setCheckId, isHeatMapEnabled, granularity, distanceThreshold}  ) {
     const [text1, setText1] = useState('');
     const [text2, setText2] = useState('');
     const [similarity, setSimilarity] = useState(null);
@@ -28,6 +28,7 @@ function TextSimilarityChecker( {searchText, algorithim, setLastUpdated, isHeatM
             clearTimeout(delayHandler);
             console.log("Response is", data)
             console.log("Data similarity is", data.similarity * 100);
+            setCheckId(data.check_id || null);
             setLastUpdated(Date.now());
             setSimilarity(Math.round(data.similarity * 100));
             setLinks(data.SortedUrls)